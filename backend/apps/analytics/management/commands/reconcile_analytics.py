@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.rollups import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount the fleet analytics rollups from Vessel and VesselPosition and fix any drift'
+
+    def handle(self, *args, **options):
+        stats = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {stats['rows']} rollups, corrected a drift of {stats['drift']}"))
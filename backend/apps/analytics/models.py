@@ -0,0 +1,13 @@
+from django.db import models
+
+class FleetRollup(models.Model):
+    """One precomputed fleet counter, e.g. ('status', 'in_port') -> 42 (see rollups.py)."""
+    dimension = models.CharField(max_length=30)
+    key = models.CharField(max_length=50)
+    count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='unique_fleet_rollup'),
+        ]
@@ -0,0 +1,186 @@
+"""
+Precomputed fleet counters for the dashboard.
+
+FleetRollup holds one row per (dimension, key):
+
+    vessel_type, flag, status  vessels by their current value
+    speed                      vessels by the SPEED_BUCKETS bucket of last_speed
+    position_speed             stored positions by reported speed bucket
+
+Writers never recount: ingestion and Vessel save/delete signals turn each
+change into +/- deltas, applied with one upsert that adds to the stored
+counts. Paths that skip signals (bulk_create, queryset.update, retention
+deleting positions) make the counters drift, so reconcile() recounts
+everything with GROUP BY queries on a schedule and corrects the rows.
+Reading the rollups is a scan of a table with a few hundred rows at most,
+however large the fleet or its history.
+"""
+from collections import Counter
+from contextlib import nullcontext
+
+from django.db import DEFAULT_DB_ALIAS, connection, router, transaction
+from django.db.models import Case, CharField, Count, Value, When
+from django.utils import timezone
+
+from apps.vessels.models import Vessel, VesselPosition
+from config.routers import read_replica
+
+from .models import FleetRollup
+
+VESSEL_DIMENSIONS = ('vessel_type', 'flag', 'status')
+# Upper bounds (exclusive) of the speed buckets in knots; the last bucket is open.
+SPEED_BUCKETS = (1, 3, 6, 10, 14, 18, 22, 26, 30)
+UNKNOWN = 'unknown'
+
+
+def _bucket_labels():
+    labels, lower = [], 0
+    for upper in SPEED_BUCKETS:
+        labels.append(f'{lower}-{upper}')
+        lower = upper
+    return labels + [f'{lower}+']
+
+
+SPEED_LABELS = _bucket_labels()
+
+
+def speed_bucket(speed):
+    if speed is None:
+        return UNKNOWN
+    speed = float(speed)
+    for upper, label in zip(SPEED_BUCKETS, SPEED_LABELS):
+        if speed < upper:
+            return label
+    return SPEED_LABELS[-1]
+
+
+def vessel_keys(vessel_type, flag, status, speed):
+    """The (dimension, key) counters one vessel contributes to."""
+    return [
+        ('vessel_type', vessel_type),
+        ('flag', flag),
+        ('status', status),
+        ('speed', speed_bucket(speed)),
+    ]
+
+
+def apply(deltas):
+    """Add a {(dimension, key): delta} mapping to the stored counters."""
+    rows = [(dimension, key, delta) for (dimension, key), delta in deltas.items() if delta]
+    if not rows:
+        return
+    now = timezone.now()
+    quote = connection.ops.quote_name
+    table, count, updated = quote(FleetRollup._meta.db_table), quote('count'), quote('updated_at')
+    unique = f"{quote('dimension')}, {quote('key')}"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} ({unique}, {count}, {updated}) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT ({unique}) DO UPDATE SET {count} = {table}.{count} + excluded.{count}, '
+            f'{updated} = excluded.{updated}',
+            [(dimension, key, delta, now) for dimension, key, delta in rows],
+        )
+
+
+def vessel_changed(before, after):
+    """Apply the deltas of one vessel moving from `before` to `after` (vessel_keys() lists or None)."""
+    deltas = Counter()
+    for key in before or ():
+        deltas[key] -= 1
+    for key in after or ():
+        deltas[key] += 1
+    apply(deltas)
+
+
+def record_ingest(vessels, previous, positions):
+    """Apply the deltas of one ingest chunk (see vessels.signals.positions_ingested)."""
+    deltas = Counter()
+    for vessel in vessels:
+        before = previous.get(vessel.pk)
+        if before is None:
+            continue
+        if before.status != vessel.status:
+            deltas[('status', before.status)] -= 1
+            deltas[('status', vessel.status)] += 1
+        old_bucket, new_bucket = speed_bucket(before.speed), speed_bucket(vessel.last_speed)
+        if old_bucket != new_bucket:
+            deltas[('speed', old_bucket)] -= 1
+            deltas[('speed', new_bucket)] += 1
+    for position in positions:
+        deltas[('position_speed', speed_bucket(position.speed))] += 1
+    apply(deltas)
+
+
+def _speed_case(field):
+    whens = [When(**{f'{field}__isnull': True}, then=Value(UNKNOWN))]
+    for upper, label in zip(SPEED_BUCKETS, SPEED_LABELS):
+        whens.append(When(**{f'{field}__lt': upper}, then=Value(label)))
+    return Case(*whens, default=Value(SPEED_LABELS[-1]), output_field=CharField())
+
+
+def vessel_position_keys(vessel_id):
+    """{('position_speed', bucket): n} for the stored positions of one vessel."""
+    rows = (
+        VesselPosition.objects.filter(vessel_id=vessel_id).order_by()
+        .annotate(bucket=_speed_case('speed')).values_list('bucket').annotate(n=Count('id'))
+    )
+    return Counter({('position_speed', bucket): count for bucket, count in rows})
+
+
+def _counts(alias):
+    counts = {}
+    for dimension in VESSEL_DIMENSIONS:
+        for key, count in Vessel.objects.using(alias).order_by().values_list(dimension).annotate(n=Count('id')):
+            counts[(dimension, key)] = count
+    for dimension, model, field in (('speed', Vessel, 'last_speed'), ('position_speed', VesselPosition, 'speed')):
+        rows = model.objects.using(alias).order_by().annotate(bucket=_speed_case(field)).values_list('bucket').annotate(n=Count('id'))
+        for key, count in rows:
+            counts[(dimension, key)] = count
+    return counts
+
+
+def reconcile():
+    """
+    Recount every rollup from the source tables and correct the stored
+    counters; returns {'rows': ..., 'drift': sum of absolute corrections}.
+
+    The recount reads the stored rows and the source tables in one read
+    transaction (on the replica when there is one), without the write lock:
+    a GROUP BY over the whole position history would otherwise stall ingest.
+    Corrections are then added as deltas, so increments committed while it
+    ran are kept.
+    """
+    with read_replica():
+        alias = router.db_for_read(FleetRollup)
+    # On the primary, a transaction would take the write lock (IMMEDIATE mode).
+    reading = transaction.atomic(using=alias) if alias != DEFAULT_DB_ALIAS else nullcontext()
+    with reading:
+        stored = dict(
+            ((dimension, key), count)
+            for dimension, key, count in FleetRollup.objects.using(alias).values_list('dimension', 'key', 'count')
+        )
+        counts = _counts(alias)
+    deltas = {key: counts.get(key, 0) - stored.get(key, 0) for key in set(stored) | set(counts)}
+    apply(deltas)
+    # Keys nobody holds any more (a flag no vessel flies) are dropped.
+    FleetRollup.objects.filter(count=0).delete()
+    return {'rows': len(counts), 'drift': sum(abs(delta) for delta in deltas.values())}
+
+
+def snapshot():
+    """{dimension: {key: count}} of all stored rollups, plus when they last changed."""
+    if not FleetRollup.objects.exists():
+        # Never reconciled yet, e.g. right after the table was created.
+        reconcile()
+    result = {dimension: {} for dimension in (*VESSEL_DIMENSIONS, 'speed', 'position_speed')}
+    updated = None
+    for dimension, key, count, updated_at in FleetRollup.objects.values_list('dimension', 'key', 'count', 'updated_at'):
+        if count:
+            result.setdefault(dimension, {})[key] = count
+        updated = updated_at if updated is None else max(updated, updated_at)
+    for dimension in ('speed', 'position_speed'):
+        result[dimension] = {
+            label: result[dimension].get(label, 0) for label in [*SPEED_LABELS, UNKNOWN]
+        }
+    result['updated_at'] = updated
+    return result
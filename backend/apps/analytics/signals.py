@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.vessels.models import Vessel
+from apps.vessels.signals import positions_ingested
+
+from . import rollups
+
+ROLLUP_FIELDS = ('vessel_type', 'flag', 'status', 'last_speed')
+
+
+@receiver(positions_ingested)
+def count_ingested_positions(sender, positions, vessels, previous, **kwargs):
+    rollups.record_ingest(vessels, previous, positions)
+
+
+@receiver(pre_save, sender=Vessel)
+def remember_rollup_keys(sender, instance, raw=False, **kwargs):
+    before = None
+    if instance.pk is not None and not raw:
+        before = Vessel.objects.filter(pk=instance.pk).values_list(*ROLLUP_FIELDS).first()
+    instance._rollup_before = rollups.vessel_keys(*before) if before else None
+
+
+@receiver(post_save, sender=Vessel)
+def count_saved_vessel(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    after = rollups.vessel_keys(*(getattr(instance, name) for name in ROLLUP_FIELDS))
+    rollups.vessel_changed(getattr(instance, '_rollup_before', None), after)
+
+
+@receiver(pre_delete, sender=Vessel)
+def remember_deleted_positions(sender, instance, **kwargs):
+    # Its positions go with it by cascade, without signals of their own.
+    instance._rollup_positions = rollups.vessel_position_keys(instance.pk)
+
+
+@receiver(post_delete, sender=Vessel)
+def count_deleted_vessel(sender, instance, **kwargs):
+    rollups.vessel_changed(rollups.vessel_keys(*(getattr(instance, name) for name in ROLLUP_FIELDS)), None)
+    positions = getattr(instance, '_rollup_positions', None)
+    if positions:
+        rollups.apply({key: -count for key, count in positions.items()})
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .rollups import reconcile
+
+
+@shared_task
+def reconcile_rollups():
+    """Periodic entry point scheduled by django_celery_beat."""
+    return reconcile()
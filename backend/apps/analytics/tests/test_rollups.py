@@ -0,0 +1,25 @@
+from django.test import TestCase
+
+from apps.analytics import rollups
+from apps.analytics.models import FleetRollup
+from apps.vessels.models import Vessel
+
+
+class ReconcileTests(TestCase):
+    def setUp(self):
+        for index, flag in enumerate(('PA', 'PA', 'LR')):
+            Vessel.objects.create(name=f'V{index}', imo=9_100_000 + index, mmsi=210_000_000 + index, vessel_type='bulk', flag=flag)
+
+    def flags(self):
+        return dict(FleetRollup.objects.filter(dimension='flag').values_list('key', 'count'))
+
+    def test_drift_is_corrected_and_empty_keys_dropped(self):
+        rollups.reconcile()
+        self.assertEqual(self.flags(), {'PA': 2, 'LR': 1})
+
+        # Paths that skip signals leave the counters behind.
+        Vessel.objects.filter(flag='LR').update(flag='MH')
+        FleetRollup.objects.create(dimension='flag', key='KY', count=4)
+        stats = rollups.reconcile()
+        self.assertEqual(stats['drift'], 1 + 1 + 4)
+        self.assertEqual(self.flags(), {'PA': 2, 'MH': 1})
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import FleetAnalyticsView
+
+urlpatterns = [
+    path('fleet/', FleetAnalyticsView.as_view(), name='analytics-fleet'),
+]
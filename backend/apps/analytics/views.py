@@ -0,0 +1,13 @@
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .rollups import SPEED_BUCKETS, snapshot
+
+
+class FleetAnalyticsView(APIView):
+    """Fleet counts by vessel_type, flag and status and speed histograms, precomputed (see rollups.py)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({**snapshot(), 'speed_buckets_kn': list(SPEED_BUCKETS)})
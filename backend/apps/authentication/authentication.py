@@ -0,0 +1,109 @@
+"""
+JWT authentication that resolves users from an in-process cache.
+
+simplejwt's JWTAuthentication loads the User row on every request. Here
+users are loaded once together with their UserProfile (request.user.role is
+the profile role, or None) and kept in a bounded LRU for
+AUTH_USER_CACHE_TTL seconds. Saving or deleting a User or UserProfile
+invalidates the entry in this process (see signals.py). Other processes
+pick the change up only when their entry expires: for up to
+AUTH_USER_CACHE_TTL seconds they still accept a deactivated user, a token
+revoked by a password change and the old role. The TTL is kept short for
+that reason; a hit rate worth having only needs it to span a client's
+burst of requests.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+DEFAULT_TTL = 10
+DEFAULT_MAX_SIZE = 10_000
+
+
+class UserCache:
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """The cached User for user_id (with .role set), loading it on a miss; None if it does not exist."""
+        user_id = User._meta.pk.to_python(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+            generation = self._generation
+
+        user = User.objects.select_related('userprofile').filter(pk=user_id).first()
+        if user is None:
+            return None
+        profile = getattr(user, 'userprofile', None)
+        user.role = profile.role if profile else None
+
+        ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', DEFAULT_TTL)
+        max_size = getattr(settings, 'AUTH_USER_CACHE_SIZE', DEFAULT_MAX_SIZE)
+        with self._lock:
+            # Skip storing a row that an invalidation may have made stale mid-load.
+            if generation == self._generation:
+                self._entries[user_id] = (now + ttl, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+user_cache = UserCache()
+
+
+def request_copy(user):
+    """
+    A copy of a cached User for one request. copy.copy() alone would share
+    the cached UserProfile instance, so that is copied too.
+    """
+    clone = copy.copy(user)
+    profile = clone._state.fields_cache.get('userprofile')
+    if profile is not None:
+        profile = copy.copy(profile)
+        profile.user = clone
+        clone._state.fields_cache['userprofile'] = profile
+    return clone
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as exc:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from exc
+
+        user = user_cache.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        # Each request gets its own copy, so a view mutating request.user cannot touch the cache.
+        return request_copy(user)
@@ -0,0 +1,12 @@
+"""
+OpenAPI description of CachedJWTAuthentication.
+
+drf_spectacular only recognises simplejwt's own JWTAuthentication, so
+without this the schema has no securitySchemes. Imported from
+AuthenticationConfig.ready() when drf_spectacular is installed.
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = 'apps.authentication.authentication.CachedJWTAuthentication'
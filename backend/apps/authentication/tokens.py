@@ -0,0 +1,15 @@
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+
+class UsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Login serializer whose tokens also carry the username, which the
+    frontend shows from the decoded token. Refreshed access tokens inherit it
+    from the refresh token.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.get_username()
+        return token
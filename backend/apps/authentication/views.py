@@ -2,7 +2,6 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.contrib.auth.models import User
 from .serializers import UserRegistrationSerializer, UserProfileSerializer
 from .models import UserProfile
 
@@ -33,25 +32,17 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get', 'put'])
     def me(self, request):
         """Get or update current user's profile"""
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-        except UserProfile.DoesNotExist:
-            profile = UserProfile.objects.create(user=request.user)
-            
+        profile, _ = UserProfile.objects.select_related('user').get_or_create(user=request.user)
+
         if request.method == 'GET':
             serializer = self.get_serializer(profile)
             return Response(serializer.data)
         
         elif request.method == 'PUT':
+            # first_name/last_name are written to the User by the serializer, whose
+            # save() also invalidates the cached identity.
             serializer = self.get_serializer(profile, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
-                # Update User model fields too
-                user_data = {}
-                if 'first_name' in request.data: user_data['first_name'] = request.data['first_name']
-                if 'last_name' in request.data: user_data['last_name'] = request.data['last_name']
-                if user_data:
-                    User.objects.filter(id=request.user.id).update(**user_data)
-                    
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,127 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# Each probe runs in a fresh interpreter and prints its own timings as JSON.
+# The first request goes to an unrouted path, which loads the whole URLconf
+# (every view module) without touching the database.
+PROBE_PATH = '/api/startup-probe/'
+
+WSGI_PROBE = f'''
+import json, sys, time
+started = time.perf_counter()
+from config.wsgi import application
+loaded = time.perf_counter()
+environ = {{
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': {PROBE_PATH!r}, 'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80', 'wsgi.url_scheme': 'http', 'wsgi.input': sys.stdin.buffer, 'wsgi.errors': sys.stderr,
+}}
+b''.join(application(environ, lambda status, headers, exc_info=None: None))
+print(json.dumps({{'import_ms': (loaded - started) * 1000, 'first_request_ms': (time.perf_counter() - loaded) * 1000,
+                  'modules': len(sys.modules)}}))
+'''
+
+ASGI_PROBE = f'''
+import asyncio, json, sys, time
+started = time.perf_counter()
+from config.asgi import application
+loaded = time.perf_counter()
+scope = {{
+    'type': 'http', 'asgi': {{'version': '3.0'}}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+    'path': {PROBE_PATH!r}, 'raw_path': {PROBE_PATH!r}.encode(), 'query_string': b'', 'headers': [],
+    'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+}}
+
+messages = [{{'type': 'http.request', 'body': b'', 'more_body': False}}]
+
+async def receive():
+    # The body once, then nothing until the handler stops listening for a disconnect.
+    if messages:
+        return messages.pop()
+    await asyncio.Event().wait()
+
+async def send(message):
+    pass
+
+asyncio.run(application(scope, receive, send))
+print(json.dumps({{'import_ms': (loaded - started) * 1000, 'first_request_ms': (time.perf_counter() - loaded) * 1000,
+                  'modules': len(sys.modules)}}))
+'''
+
+ENTRY_POINTS = ('manage.py', 'wsgi', 'asgi')
+
+
+def _summary(samples):
+    values = np.array(samples)
+    return {'p50_ms': round(float(np.percentile(values, 50)), 1), 'min_ms': round(float(values.min()), 1)}
+
+
+class Command(BaseCommand):
+    help = (
+        'Time cold starts of manage.py, the WSGI and the ASGI application (import plus a first request) '
+        'under each settings profile, every run in a fresh interpreter.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', default=['config.settings', 'config.settings_api'],
+            help='DJANGO_SETTINGS_MODULE values to compare',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Cold starts per entry point and profile')
+        parser.add_argument(
+            '--output', default=str(settings.BASE_DIR / 'benchmarks' / 'startup.jsonl'),
+        )
+
+    def handle(self, *args, **options):
+        record = {'recorded_at': timezone.now().isoformat(), 'repeat': options['repeat'], 'profiles': {}}
+        for profile in options['profiles']:
+            results = record['profiles'][profile] = {}
+            for entry in ENTRY_POINTS:
+                runs = [self._run(entry, profile) for _ in range(options['repeat'])]
+                result = results[entry] = {'total': _summary([run['total_ms'] for run in runs])}
+                if entry != 'manage.py':
+                    result['import'] = _summary([run['import_ms'] for run in runs])
+                    result['first_request'] = _summary([run['first_request_ms'] for run in runs])
+                    result['modules'] = runs[-1]['modules']
+                self.stdout.write(self._line(profile, entry, result))
+
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with output.open('a', encoding='utf-8') as fh:
+            fh.write(json.dumps(record) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Appended results to {output}'))
+
+    @staticmethod
+    def _line(profile, entry, result):
+        line = f"{profile:<22} {entry:<10} total p50 {result['total']['p50_ms']:8.1f} ms"
+        if 'import' in result:
+            line += (
+                f"   import {result['import']['p50_ms']:7.1f} ms   first request "
+                f"{result['first_request']['p50_ms']:7.1f} ms   {result['modules']} modules"
+            )
+        return line
+
+    @staticmethod
+    def _run(entry, profile):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': profile}
+        if entry == 'manage.py':
+            # `check` sets Django up and loads the URLconf through the URL checks.
+            command = [sys.executable, 'manage.py', 'check']
+        else:
+            command = [sys.executable, '-c', WSGI_PROBE if entry == 'wsgi' else ASGI_PROBE]
+        started = time.perf_counter()
+        completed = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        total_ms = (time.perf_counter() - started) * 1000
+        if entry == 'manage.py':
+            return {'total_ms': total_ms}
+        return {**json.loads(completed.stdout.strip().splitlines()[-1]), 'total_ms': total_ms}
@@ -0,0 +1,104 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .registry import QUERY_BUCKETS, registry, sampled
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def normalize_sql(sql):
+    """Collapse IN lists and inlined numbers (LIMIT/OFFSET) so repeats of one query compare equal."""
+    return _NUMBER.sub('?', _IN_LIST.sub('IN (...)', sql))
+
+
+class QueryRecorder:
+    """connection.execute_wrapper that counts and times queries, grouped by SQL shape."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.selects = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            if sql.lstrip()[:6].upper() == 'SELECT':
+                self.selects[normalize_sql(sql)] += 1
+
+    def repeated(self, threshold):
+        """(sql, executions) of SELECTs run at least `threshold` times: likely N+1 loops."""
+        return [(sql, count) for sql, count in self.selects.most_common() if count >= threshold]
+
+
+@contextmanager
+def recording(recorder):
+    """Run `recorder` around every query on this thread's connections."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+class QueryMetricsMiddleware:
+    """
+    Records wall time, DB time and query count per view, and flags requests
+    that repeat one SELECT shape N+1 style. Streaming responses are measured
+    until their body has been sent, queries run while it is produced
+    included. A sampled-out request costs one settings lookup (and a
+    random() call when 0 < rate < 1).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+        if response.streaming and not getattr(response, 'is_async', False):
+            # Exports run their queries while the body is sent, after this returns.
+            response.streaming_content = self._stream(response.streaming_content, request, recorder, started)
+        else:
+            self._record(request, recorder, started)
+        return response
+
+    def _stream(self, content, request, recorder, started):
+        try:
+            with recording(recorder):
+                yield from content
+        finally:
+            self._record(request, recorder, started)
+
+    def _record(self, request, recorder, started):
+        wall_ms = (time.perf_counter() - started) * 1000.0
+        match = request.resolver_match
+        labels = {'view': match.view_name if match else 'unresolved', 'method': request.method}
+        registry.observe('http_request_duration_ms', wall_ms, **labels)
+        registry.observe('http_request_db_ms', recorder.seconds * 1000.0, **labels)
+        registry.observe('http_request_queries', recorder.count, buckets=QUERY_BUCKETS, **labels)
+        threshold = getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+        repeated = recorder.repeated(threshold)
+        if repeated:
+            registry.increment('http_request_n_plus_one_total', **labels)
+            registry.recent_n_plus_one.append({
+                **labels,
+                'at': timezone.now().isoformat(),
+                'queries': [{'sql': sql, 'executions': count} for sql, count in repeated],
+            })
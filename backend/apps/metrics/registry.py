@@ -0,0 +1,145 @@
+"""
+In-process request and timer metrics.
+
+Histograms and counters are keyed by metric name and labels and rendered in
+the Prometheus text format by views.metrics. Values live in this process
+only, so each worker is scraped separately. Nothing is recorded while
+METRICS_SAMPLE_RATE is 0, and only that fraction of requests and timed
+blocks otherwise: the rest get a shared no-op context manager from timer()
+and go straight through the middleware.
+"""
+import bisect
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+DURATION_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+RECENT_N_PLUS_ONE = 50
+
+
+def sample_rate():
+    return getattr(settings, 'METRICS_SAMPLE_RATE', 0.0)
+
+
+def sampled():
+    """Whether to record this request or timed block, drawn at METRICS_SAMPLE_RATE."""
+    rate = sample_rate()
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self.recent_n_plus_one = deque(maxlen=RECENT_N_PLUS_ONE)
+
+    def observe(self, metric, value, buckets=DURATION_BUCKETS_MS, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, metric, amount=1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(
+                (key, list(value.buckets), list(value.counts), value.sum, value.count)
+                for key, value in self._histograms.items()
+            )
+            counters = sorted(self._counters.items())
+        lines = []
+        seen = set()
+        for (name, labels), buckets, counts, total, count in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_label_text(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_label_text(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_label_text(labels)} {count}')
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{_label_text(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Timer:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        registry.observe('timer_duration_ms', (time.perf_counter() - self.started) * 1000.0, name=self.name)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """`with timer('ingest.tick'):` records into timer_duration_ms{name=...}, sampled like requests."""
+    if not sampled():
+        return _NULL_TIMER
+    return _Timer(name)
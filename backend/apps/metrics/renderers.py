@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from .registry import timer
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that records its render time as timer_duration_ms{name="render.json"}."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timer('render.json'):
+            return super().render(data, accepted_media_type, renderer_context)
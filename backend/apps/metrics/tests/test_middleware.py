@@ -0,0 +1,42 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from apps.metrics import middleware, registry as metrics
+
+
+def streaming_view(request):
+    def rows():
+        for _ in range(3):
+            yield f'{User.objects.count()}\n'
+    return StreamingHttpResponse(rows())
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0)
+class QueryMetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        self.registry = metrics.Registry()
+        patcher = mock.patch.object(middleware, 'registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queries(self):
+        (_, histogram), = [
+            item for item in self.registry._histograms.items() if item[0][0] == 'http_request_queries'
+        ]
+        return histogram.count, histogram.sum
+
+    def test_streaming_body_queries_are_counted_once_it_is_sent(self):
+        response = middleware.QueryMetricsMiddleware(streaming_view)(RequestFactory().get('/export/'))
+        self.assertEqual(self.registry._histograms, {})
+        self.assertEqual(b''.join(response.streaming_content), b'0\n0\n0\n')
+        self.assertEqual(self.queries(), (1, 3))
+
+
+class TimerSamplingTests(TestCase):
+    def test_timer_is_sampled_per_call(self):
+        with override_settings(METRICS_SAMPLE_RATE=0.5), mock.patch.object(metrics.random, 'random', side_effect=[0.9, 0.1]):
+            self.assertIs(metrics.timer('skipped'), metrics._NULL_TIMER)
+            self.assertIsInstance(metrics.timer('kept'), metrics._Timer)
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import metrics, n_plus_one
+
+urlpatterns = [
+    path('', metrics, name='metrics'),
+    path('n-plus-one/', n_plus_one, name='metrics-n-plus-one'),
+]
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+
+from .registry import registry
+
+
+def _staff(request):
+    """Whether the request carries API credentials (a JWT) of a staff user."""
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(request)
+        except APIException:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+def _authorized(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    return _staff(request)
+
+
+def metrics(request):
+    """Prometheus scrape target; requires `Authorization: Bearer <METRICS_TOKEN>` or a staff user's JWT."""
+    if not _authorized(request):
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def n_plus_one(request):
+    """The most recent requests flagged for repeated SELECTs, with the offending SQL; same access as metrics."""
+    if not _authorized(request):
+        return HttpResponse(status=401)
+    return JsonResponse({'results': list(reversed(registry.recent_n_plus_one))})
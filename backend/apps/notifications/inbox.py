@@ -0,0 +1,141 @@
+"""
+Notification delivery and the per-user inbox.
+
+Every write goes through here so that UnreadCounter stays equal to the
+user's unread rows: deliver() adds to it with one upsert for the whole
+batch, and mark_read()/delete() subtract what their single set-based
+UPDATE or DELETE changed, inside the same transaction. unread_count() reads
+the counter through the Django cache, which a user's writes invalidate once
+they commit (earlier, a concurrent read could cache the old count again);
+with a per-process cache other processes see deliveries once their entry
+expires (NOTIFICATION_UNREAD_CACHE_TTL).
+
+Listing is keyset-paginated on (created_at, id), over the
+(user, -created_at, -id) index or, for unread only, the
+(user, is_read, -created_at, -id) one. Read notifications are deleted once
+they have been read for NOTIFICATION_READ_RETENTION.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.vessels.history import decode_cursor, encode_cursor
+
+from .models import Notification, UnreadCounter
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_CACHE_TTL = 30
+DEFAULT_READ_RETENTION = timedelta(days=30)
+EXPIRE_BATCH_SIZE = 10_000
+
+
+def _cache_key(user_id):
+    return f'notifications-unread:{user_id}'
+
+
+def _invalidate(user_ids):
+    """Drop the users' cached counts when the current transaction commits."""
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _add_unread(deltas):
+    """Add {user_id: delta} to the users' counters."""
+    rows = [(user_id, delta) for user_id, delta in deltas.items() if delta]
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table, user, unread = quote(UnreadCounter._meta.db_table), quote('user_id'), quote('unread')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} ({user}, {unread}) VALUES (%s, %s) '
+            f'ON CONFLICT ({user}) DO UPDATE SET {unread} = {table}.{unread} + excluded.{unread}',
+            rows,
+        )
+    _invalidate([user_id for user_id, _ in rows])
+
+
+def deliver(notifications):
+    """Store unsaved Notifications and count them as unread; returns how many."""
+    if not notifications:
+        return 0
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        _add_unread(Counter(notification.user_id for notification in notifications if not notification.is_read))
+    return len(notifications)
+
+
+def unread_count(user_id):
+    count = cache.get(_cache_key(user_id))
+    if count is None:
+        count = UnreadCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).first()
+        if count is None:
+            # No counter yet: nothing was delivered through deliver() to this user.
+            count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+            UnreadCounter.objects.get_or_create(user_id=user_id, defaults={'unread': count})
+        cache.set(_cache_key(user_id), count, getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TTL', DEFAULT_CACHE_TTL))
+    return count
+
+
+def _selection(user_id, ids=None):
+    notifications = Notification.objects.filter(user_id=user_id)
+    return notifications if ids is None else notifications.filter(pk__in=ids)
+
+
+def mark_read(user_id, ids=None):
+    """Mark the given notifications (all when ids is None) read; returns how many changed."""
+    with transaction.atomic():
+        changed = _selection(user_id, ids).filter(is_read=False).update(is_read=True, read_at=timezone.now())
+        if changed:
+            UnreadCounter.objects.filter(user_id=user_id).update(unread=F('unread') - changed)
+            _invalidate([user_id])
+    return changed
+
+
+def delete(user_id, ids=None, read_only=False):
+    """Delete the given notifications (all, or all read, when ids is None); returns how many."""
+    selection = _selection(user_id, ids)
+    if read_only:
+        selection = selection.filter(is_read=True)
+    with transaction.atomic():
+        unread = 0 if read_only else selection.filter(is_read=False).count()
+        deleted = selection.delete()[0]
+        if unread:
+            UnreadCounter.objects.filter(user_id=user_id).update(unread=F('unread') - unread)
+            _invalidate([user_id])
+    return deleted
+
+
+def inbox_page(user_id, unread_only=False, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of a user's notifications, newest first, and the cursor of the next page (or None)."""
+    notifications = Notification.objects.filter(user_id=user_id)
+    if unread_only:
+        # `is_read = false` rather than `NOT is_read`, which SQLite cannot match against the index.
+        notifications = notifications.filter(is_read__in=[False])
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        notifications = notifications.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+    page = list(notifications.order_by('-created_at', '-id')[:limit + 1])
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].pk)
+    return page, next_cursor
+
+
+def expire_read(now=None, batch_size=EXPIRE_BATCH_SIZE):
+    """Delete notifications read longer ago than NOTIFICATION_READ_RETENTION; returns how many."""
+    cutoff = (now or timezone.now()) - getattr(settings, 'NOTIFICATION_READ_RETENTION', DEFAULT_READ_RETENTION)
+    expired = Notification.objects.filter(is_read=True, read_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Notification.objects.filter(pk__in=ids).delete()[0]
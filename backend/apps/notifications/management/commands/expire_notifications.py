@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from apps.notifications.inbox import expire_read
+
+
+class Command(BaseCommand):
+    help = 'Delete notifications that were read longer ago than NOTIFICATION_READ_RETENTION'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'Deleted {expire_read()} expired notifications'))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """Stamp already-read notifications and count every user's unread ones."""
+    Notification = apps.get_model('notifications', 'Notification')
+    UnreadCounter = apps.get_model('notifications', 'UnreadCounter')
+    Notification.objects.filter(is_read=True, read_at__isnull=True).update(read_at=models.F('created_at'))
+    unread = (
+        Notification.objects.filter(is_read=False).order_by()
+        .values_list('user_id').annotate(count=models.Count('id'))
+    )
+    UnreadCounter.objects.bulk_create([UnreadCounter(user_id=user_id, unread=count) for user_id, count in unread])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at'], name='notificatio_user_id_f2ad08_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['is_read', 'read_at'], name='notificatio_is_read_3beb85_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -6,3 +6,17 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Inbox pages, all or unread only, in their (created_at, id) keyset order.
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['user', 'is_read', '-created_at', '-id']),
+            models.Index(fields=['is_read', 'read_at']),
+        ]
+
+class UnreadCounter(models.Model):
+    """A user's unread notification count, kept in step by inbox.py instead of counted."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    unread = models.BigIntegerField(default=0)
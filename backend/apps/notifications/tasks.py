@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .inbox import expire_read
+
+
+@shared_task
+def expire_read_notifications():
+    """Periodic entry point scheduled by django_celery_beat."""
+    return expire_read()
@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.notifications import inbox
+from apps.notifications.models import Notification, UnreadCounter
+
+
+class InboxCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create(username='reader')
+        self.other = User.objects.create(username='other')
+
+    def deliver(self, user, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            inbox.deliver([Notification(user=user, message=f'#{index}') for index in range(count)])
+        return list(Notification.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+
+    def assertUnread(self, user, expected):
+        self.assertEqual(inbox.unread_count(user.pk), expected)
+        # The counter is kept, not recounted: it has to agree with the rows.
+        self.assertEqual(Notification.objects.filter(user=user, is_read=False).count(), expected)
+
+    def test_counter_follows_deliveries_reads_and_deletes(self):
+        ids = self.deliver(self.user, 5)
+        self.deliver(self.other, 2)
+        self.assertUnread(self.user, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(inbox.mark_read(self.user.pk, ids[:2]), 2)
+            # Already read: nothing changes twice.
+            self.assertEqual(inbox.mark_read(self.user.pk, ids[:1]), 0)
+        self.assertUnread(self.user, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(inbox.delete(self.user.pk, ids[1:3]), 2)
+        self.assertUnread(self.user, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(inbox.delete(self.user.pk, read_only=True), 1)
+            self.assertEqual(inbox.mark_read(self.user.pk), 2)
+        self.assertUnread(self.user, 0)
+        self.assertUnread(self.other, 2)
+
+    def test_cached_count_is_dropped_once_the_write_commits(self):
+        self.deliver(self.user, 1)
+        self.assertUnread(self.user, 1)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            inbox.deliver([Notification(user=self.user, message='late')])
+        self.assertEqual(inbox.unread_count(self.user.pk), 1)
+        for callback in callbacks:
+            callback()
+        self.assertUnread(self.user, 2)
+
+    def test_missing_counter_is_seeded_from_the_rows(self):
+        Notification.objects.bulk_create([Notification(user=self.user, message='direct') for _ in range(3)])
+        self.assertUnread(self.user, 3)
+        self.assertEqual(UnreadCounter.objects.get(user=self.user).unread, 3)
+
+    def test_inbox_pages_by_keyset(self):
+        ids = self.deliver(self.user, 5)
+        inbox.mark_read(self.user.pk, ids[-1:])
+        seen, cursor = [], None
+        while True:
+            page, cursor = inbox.inbox_page(self.user.pk, cursor=cursor, limit=2)
+            seen += [notification.pk for notification in page]
+            if cursor is None:
+                break
+        self.assertEqual(seen, ids[::-1])
+
+        unread, cursor = inbox.inbox_page(self.user.pk, unread_only=True, limit=10)
+        self.assertEqual([notification.pk for notification in unread], ids[-2::-1])
+        self.assertIsNone(cursor)
@@ -0,0 +1,70 @@
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
+from . import inbox
+from .serializers import NotificationSerializer
+
+
+def _ids(data):
+    """The `ids` list of a bulk request, or None when `all` is set instead."""
+    if data.get('all') is True:
+        return None
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("Give a non-empty 'ids' list or 'all': true")
+    return [int(value) for value in ids]
+
+
+class NotificationViewSet(viewsets.ViewSet):
+    """The requesting user's inbox."""
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """Notifications, newest first, keyset-paged with ?cursor=; ?unread=1 for unread only"""
+        params = request.query_params
+        try:
+            limit = min(int(params.get('limit', inbox.DEFAULT_PAGE_SIZE)), inbox.MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError('limit must be positive')
+            page, next_cursor = inbox.inbox_page(
+                request.user.pk, params.get('unread') in ('1', 'true'), params.get('cursor'), limit,
+            )
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({
+            'next': next_url,
+            'unread': inbox.unread_count(request.user.pk),
+            'results': NotificationSerializer(page, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Unread badge count, served from the maintained counter"""
+        return Response({'unread': inbox.unread_count(request.user.pk)})
+
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        """Mark {'ids': [...]} or {'all': true} read in one UPDATE"""
+        try:
+            ids = _ids(request.data)
+        except (TypeError, ValueError) as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        updated = inbox.mark_read(request.user.pk, ids)
+        return Response({'updated': updated, 'unread': inbox.unread_count(request.user.pk)})
+
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """Delete {'ids': [...]}, {'all': true} or {'read': true} (every read one) in one DELETE"""
+        read_only = request.data.get('read') is True
+        try:
+            ids = None if read_only else _ids(request.data)
+        except (TypeError, ValueError) as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        deleted = inbox.delete(request.user.pk, ids, read_only=read_only)
+        return Response({'deleted': deleted, 'unread': inbox.unread_count(request.user.pk)})
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Port',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('code', models.CharField(max_length=50)),
+                ('country', models.CharField(max_length=255)),
+                ('location_lat', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('location_lon', models.DecimalField(decimal_places=6, max_digits=9)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SafetyEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('accident', 'Accident'), ('piracy', 'Piracy'), ('weather', 'Weather')], max_length=50)),
+                ('description', models.TextField()),
+                ('timestamp', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('location_lat', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('location_lon', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('radius_nm', models.FloatField(blank=True, help_text='Area affected around the location, in nautical miles', null=True)),
+            ],
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
+from django.utils import timezone
 
 class SafetyEvent(models.Model):
     TYPE_CHOICES = (('accident', 'Accident'), ('piracy', 'Piracy'), ('weather', 'Weather'))
     event_type = models.CharField(max_length=50, choices=TYPE_CHOICES)
     description = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    location_lat = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    location_lon = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    radius_nm = models.FloatField(blank=True, null=True, help_text="Area affected around the location, in nautical miles")
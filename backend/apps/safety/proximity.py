@@ -0,0 +1,90 @@
+"""
+Space-time correlation between SafetyEvents and vessel tracks, answered
+from the PositionCell index (apps.vessels.spacetime).
+
+An event covers the circle of its radius_nm (SAFETY_EVENT_RADIUS_NM when
+unset) around its location, during SAFETY_EVENT_WINDOW either side of its
+timestamp unless the caller gives a window.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+
+from apps.vessels import spacetime
+
+DEFAULT_RADIUS_NM = 10.0
+DEFAULT_WINDOW = timedelta(hours=6)
+
+
+def event_radius(event, radius_nm=None):
+    return radius_nm or event.radius_nm or getattr(settings, 'SAFETY_EVENT_RADIUS_NM', DEFAULT_RADIUS_NM)
+
+
+def event_window(event, start=None, end=None):
+    window = getattr(settings, 'SAFETY_EVENT_WINDOW', DEFAULT_WINDOW)
+    return start or event.timestamp - window, end or event.timestamp + window
+
+
+def vessels_near_event(event, radius_nm=None, start=None, end=None):
+    """
+    [{'vessel_id', 'distance_nm', 'timestamp', 'first_seen', 'last_seen'}]
+    for vessels that came within the event's radius during its window,
+    closest first.
+    """
+    radius_nm = event_radius(event, radius_nm)
+    start, end = event_window(event, start, end)
+    lat, lon = float(event.location_lat), float(event.location_lon)
+    candidates = spacetime.vessels_in_cells(spacetime.cover(lat, lon, radius_nm), start, end)
+    found = spacetime.closest_approaches(candidates, lat, lon, radius_nm, start, end)
+    return sorted(
+        ({'vessel_id': vessel_id, **approach} for vessel_id, approach in found.items()),
+        key=lambda row: row['distance_nm'],
+    )
+
+
+def events_near_track(events, vessel_id, start, end, radius_nm=None):
+    """
+    [(event, approach)] for the located `events` the vessel passed within
+    range of while [start, end] overlapped their window, in event time
+    order; `approach` as in vessels_near_event.
+
+    The vessel's own cells for the track are read once; only events whose
+    covering cells share a cell and hour with them are checked exactly.
+    """
+    if end is None or start is None or end < start:
+        return []
+    track = spacetime.vessel_cells(vessel_id, start, end)
+    if not track:
+        return []
+    by_bucket = {}
+    for cell, bucket in track:
+        by_bucket.setdefault(bucket, set()).add(cell)
+
+    window = getattr(settings, 'SAFETY_EVENT_WINDOW', DEFAULT_WINDOW)
+    candidates = events.filter(
+        location_lat__isnull=False,
+        location_lon__isnull=False,
+        timestamp__gte=start - window,
+        timestamp__lte=end + window,
+    ).order_by('timestamp')
+
+    matches = []
+    for event in candidates:
+        radius = event_radius(event, radius_nm)
+        event_start, event_end = event_window(event)
+        overlap_start, overlap_end = max(start, event_start), min(end, event_end)
+        lat, lon = float(event.location_lat), float(event.location_lon)
+        covering = spacetime.cover(lat, lon, radius)
+        # All covering cells share one precision, so compare the track's cell prefixes.
+        length, covering = len(covering[0]), set(covering)
+        first_bucket = spacetime.bucket_start(overlap_start)
+        if not any(
+            cell[:length] in covering
+            for bucket, cells in by_bucket.items() if first_bucket <= bucket <= overlap_end
+            for cell in cells
+        ):
+            continue
+        approach = spacetime.closest_approaches([vessel_id], lat, lon, radius, overlap_start, overlap_end)
+        if vessel_id in approach:
+            matches.append((event, approach[vessel_id]))
+    return matches
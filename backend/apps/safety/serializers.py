@@ -0,0 +1,18 @@
+from rest_framework import serializers
+from .models import SafetyEvent
+
+class SafetyEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SafetyEvent
+        fields = ['id', 'event_type', 'description', 'timestamp', 'location_lat', 'location_lon', 'radius_nm']
+
+    def validate(self, attrs):
+        lat = attrs.get('location_lat', getattr(self.instance, 'location_lat', None))
+        lon = attrs.get('location_lon', getattr(self.instance, 'location_lon', None))
+        if (lat is None) != (lon is None):
+            raise serializers.ValidationError('location_lat and location_lon must be given together')
+        if lat is not None and not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise serializers.ValidationError('Location is out of range')
+        if attrs.get('radius_nm') is not None and attrs['radius_nm'] <= 0:
+            raise serializers.ValidationError({'radius_nm': 'Must be positive'})
+        return attrs
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import SafetyEventViewSet
+
+router = DefaultRouter()
+router.register(r'events', SafetyEventViewSet, basename='safety-events')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
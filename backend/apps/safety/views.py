@@ -0,0 +1,100 @@
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from config.routers import replica_reads
+from apps.vessels.history import parse_time
+from apps.vessels.models import Vessel
+from apps.voyages.models import Voyage
+from .models import SafetyEvent
+from .proximity import event_radius, event_window, events_near_track, vessels_near_event
+from .serializers import SafetyEventSerializer
+
+
+def _radius(params):
+    if not params.get('radius_nm'):
+        return None
+    radius = float(params['radius_nm'])
+    if radius <= 0:
+        raise ValueError('radius_nm must be positive')
+    return radius
+
+
+def _approach(approach):
+    return {
+        'distance_nm': round(approach['distance_nm'], 2),
+        'timestamp': approach['timestamp'],
+        'first_seen': approach['first_seen'],
+        'last_seen': approach['last_seen'],
+    }
+
+
+class SafetyEventViewSet(viewsets.ModelViewSet):
+    queryset = SafetyEvent.objects.all().order_by('-timestamp')
+    serializer_class = SafetyEventSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = SafetyEvent.objects.all().order_by('-timestamp')
+        event_type = self.request.query_params.get('type', None)
+        if event_type:
+            queryset = queryset.filter(event_type=event_type)
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    @replica_reads
+    def vessels(self, request, pk=None):
+        """Vessels that came within the event's radius during its window, closest first.
+
+        ?radius_nm= and ?from=&to= override the event's own radius and window.
+        """
+        event = self.get_object()
+        if event.location_lat is None or event.location_lon is None:
+            return Response({'detail': 'Event has no location'}, status=status.HTTP_400_BAD_REQUEST)
+        params = request.query_params
+        try:
+            radius = _radius(params)
+            start, end = event_window(event, parse_time(params.get('from')), parse_time(params.get('to')))
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        found = vessels_near_event(event, radius, start, end)
+        vessels = Vessel.objects.in_bulk([row['vessel_id'] for row in found])
+        return Response({
+            'radius_nm': event_radius(event, radius),
+            'from': start,
+            'to': end,
+            'results': [
+                {'id': row['vessel_id'], 'name': vessels[row['vessel_id']].name,
+                 'mmsi': vessels[row['vessel_id']].mmsi, **_approach(row)}
+                for row in found if row['vessel_id'] in vessels
+            ],
+        })
+
+    @action(detail=False, methods=['get'])
+    @replica_reads
+    def near_voyage(self, request):
+        """Events the vessel of ?voyage=<id> passed near between departure and arrival"""
+        params = request.query_params
+        voyage_id = params.get('voyage', '')
+        voyage = Voyage.objects.filter(pk=voyage_id).first() if voyage_id.isdigit() else None
+        if voyage is None:
+            return Response({'detail': 'Unknown voyage'}, status=status.HTTP_404_NOT_FOUND)
+        if voyage.vessel_id is None:
+            return Response({'detail': 'Voyage is not linked to a vessel'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            radius = _radius(params)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = events_near_track(
+            self.get_queryset(), voyage.vessel_id, voyage.departure, voyage.arrival or timezone.now(), radius,
+        )
+        return Response({
+            'vessel': voyage.vessel_id,
+            'results': [
+                {'event': SafetyEventSerializer(event).data, **_approach(approach)}
+                for event, approach in matches
+            ],
+        })
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.metrics.registry import timer
+from apps.notifications.inbox import deliver
+from apps.notifications.models import Notification
+
+from .bulk import update_rows
+from .geo import haversine_nm, heading_delta
+from .models import VesselAlert
+
+DEFAULT_THRESHOLDS = {
+    'position_change': 1.0,   # nautical miles
+    'speed_change': 3.0,      # knots
+    'heading_change': 30.0,   # degrees
+}
+DEFAULT_BUDGET_MS = 50
+# Rules are reloaded at least this often so subscriptions made in another
+# process are picked up; changes in this process invalidate immediately.
+RULE_INDEX_TTL = 60
+BUDGET_CHECK_EVERY = 64
+
+# What a subscription compares against; the attributes match ingestion.VesselState.
+Baseline = namedtuple('Baseline', 'lat lon speed heading status')
+BASELINE_FIELDS = ['baseline_lat', 'baseline_lon', 'baseline_speed', 'baseline_heading', 'baseline_status']
+
+
+def current_baseline(vessel):
+    return Baseline(vessel.last_position_lat, vessel.last_position_lon, vessel.last_speed, vessel.last_heading,
+                    vessel.status)
+
+
+def _threshold(alert_type):
+    return getattr(settings, 'VESSEL_ALERT_THRESHOLDS', {}).get(alert_type, DEFAULT_THRESHOLDS[alert_type])
+
+
+def _position_change(vessel, previous):
+    if previous.lat is None or previous.lon is None:
+        return None
+    distance = haversine_nm(float(previous.lat), float(previous.lon), float(vessel.last_position_lat), float(vessel.last_position_lon))
+    if distance >= _threshold('position_change'):
+        return f'{vessel.name} moved {distance:.1f} nm'
+    return None
+
+
+def _speed_change(vessel, previous):
+    if previous.speed is None or vessel.last_speed is None:
+        return None
+    before, after = float(previous.speed), float(vessel.last_speed)
+    if abs(after - before) >= _threshold('speed_change'):
+        return f'{vessel.name} speed changed from {before:.1f} to {after:.1f} kn'
+    return None
+
+
+def _heading_change(vessel, previous):
+    if previous.heading is None or vessel.last_heading is None:
+        return None
+    if heading_delta(previous.heading, vessel.last_heading) >= _threshold('heading_change'):
+        return f'{vessel.name} heading changed from {float(previous.heading):.0f} to {float(vessel.last_heading):.0f} degrees'
+    return None
+
+
+def _status_change(vessel, previous):
+    if previous.status != vessel.status:
+        return f'{vessel.name} status changed from {previous.status} to {vessel.status}'
+    return None
+
+
+CHECKS = {
+    'position_change': _position_change,
+    'speed_change': _speed_change,
+    'heading_change': _heading_change,
+    'status_change': _status_change,
+}
+# The baseline attribute each check needs; without it the baseline is retaken.
+COMPARED = {
+    'position_change': 'lat',
+    'speed_change': 'speed',
+    'heading_change': 'heading',
+    'status_change': 'status',
+}
+
+
+class AlertEngine:
+    """
+    Evaluates VesselAlert subscriptions against ingested positions.
+
+    Active subscriptions are indexed in memory as
+    {vessel_id: {alert_type: [[alert_id, user_id, baseline], ...]}}, so each
+    ingested vessel costs one dict lookup and only its own subscriptions are
+    checked. Each subscription compares against its stored baseline (the
+    vessel's state when it subscribed or last fired), so drift spread over
+    many small fixes still fires; a firing alert moves its baseline to the
+    current state in the same transaction as its notifications. Evaluation
+    stops at the time budget; vessels not reached are carried over to the
+    next tick, coalesced to their latest state. port_arrival/port_departure
+    are event driven and arrive via fire_events().
+    """
+
+    def __init__(self, budget_ms=None):
+        self.budget_ms = budget_ms
+        self._rules = None
+        self._loaded_at = 0.0
+        self._backlog = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._rules = None
+
+    def rules(self):
+        rules = self._rules
+        if rules is None or time.monotonic() - self._loaded_at > RULE_INDEX_TTL:
+            rules = {}
+            active = VesselAlert.objects.filter(is_active=True).values_list(
+                'id', 'vessel_id', 'alert_type', 'user_id', *BASELINE_FIELDS,
+            )
+            for alert_id, vessel_id, alert_type, user_id, *baseline in active.iterator(chunk_size=5000):
+                subscription = [alert_id, user_id, Baseline(*baseline)]
+                rules.setdefault(vessel_id, {}).setdefault(alert_type, []).append(subscription)
+            self._rules = rules
+            self._loaded_at = time.monotonic()
+        return rules
+
+    def evaluate(self, vessels):
+        """Check ingested vessels against their subscriptions; returns notifications written."""
+        with timer('alerts.evaluate'):
+            return self._evaluate(vessels)
+
+    def _evaluate(self, vessels):
+        rules = self.rules()
+        budget_ms = self.budget_ms or getattr(settings, 'VESSEL_ALERT_BUDGET_MS', DEFAULT_BUDGET_MS)
+        deadline = time.perf_counter() + budget_ms / 1000.0
+
+        with self._lock:
+            work = self._backlog
+            self._backlog = {}
+        for vessel in vessels:
+            if vessel.pk in rules:
+                work[vessel.pk] = vessel
+
+        notifications, rebased = [], []
+        items = list(work.items())
+        for index, (vessel_id, vessel) in enumerate(items):
+            if index % BUDGET_CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                with self._lock:
+                    for late_id, late in items[index:]:
+                        self._backlog.setdefault(late_id, late)
+                break
+            state = None
+            for alert_type, subscriptions in rules.get(vessel_id, {}).items():
+                check = CHECKS.get(alert_type)
+                if check is None:
+                    continue
+                for subscription in subscriptions:
+                    alert_id, user_id, baseline = subscription
+                    if getattr(baseline, COMPARED[alert_type]) is None:
+                        # Subscribed before the vessel reported this: compare from here on.
+                        state = state or current_baseline(vessel)
+                        if getattr(state, COMPARED[alert_type]) is not None:
+                            subscription[2] = state
+                            rebased.append([*state, alert_id])
+                        continue
+                    message = check(vessel, baseline)
+                    if message:
+                        notifications.append(Notification(user_id=user_id, message=message))
+                        state = state or current_baseline(vessel)
+                        subscription[2] = state
+                        rebased.append([*state, alert_id])
+
+        if not rebased:
+            return deliver(notifications)
+        with transaction.atomic():
+            update_rows(VesselAlert, BASELINE_FIELDS, rebased)
+            return deliver(notifications)
+
+    def fire_events(self, events):
+        """Notify subscribers of discrete (vessel_id, alert_type, message) events."""
+        rules = self.rules()
+        notifications = [
+            Notification(user_id=user_id, message=message)
+            for vessel_id, alert_type, message in events
+            for user_id in rules.get(vessel_id, {}).get(alert_type, ())
+        ]
+        return deliver(notifications)
+
+
+engine = AlertEngine()
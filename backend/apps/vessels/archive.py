@@ -0,0 +1,280 @@
+"""
+Columnar cold storage for VesselPosition history.
+
+Each segment is a directory holding one .npy file per column, sorted by
+(vessel_id, timestamp, id) and opened with mmap_mode='r', so reading one
+vessel's slice touches only the pages for that vessel. Coordinates are
+stored as int32 fixed point (degrees * 1e7), speed and heading as uint16
+hundredths with NULL_U16 for missing values, timestamps as int64 epoch
+microseconds. Segment names carry their time and id range:
+
+    <min_ts_us>-<max_ts_us>-<first_id>-<last_id>
+
+Each segment also holds vessels.npy, one (vessel_id, first row, end row,
+min_ts, max_ts) row per vessel in it. Readers keep these in memory, so a
+history page opens only the segments holding that vessel in the range, and
+only as many of them, newest first, as the page needs.
+"""
+import os
+import shutil
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+COORD_SCALE = 10_000_000
+VALUE_SCALE = 100
+NULL_U16 = np.iinfo(np.uint16).max
+COLUMNS = ('vessel_id', 'timestamp', 'id', 'lat', 'lon', 'speed', 'heading')
+VESSEL_INDEX = 'vessels.npy'
+# {segment path: vessel index}, for the segments this process has read.
+_indexes = {}
+
+
+def archive_dir():
+    return Path(getattr(settings, 'POSITION_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive'))
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_micros(value):
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def _scaled_u16(values):
+    values = np.asarray(values, dtype=float)
+    scaled = np.clip(np.rint(np.nan_to_num(values, nan=0.0) * VALUE_SCALE), 0, NULL_U16 - 1).astype(np.uint16)
+    scaled[np.isnan(values)] = NULL_U16
+    return scaled
+
+
+def write_segment(columns):
+    """
+    Write one segment from a dict of equal-length numpy columns
+    (vessel_id, timestamp, id, lat, lon in degrees, speed, heading with NaN
+    for missing). Returns the segment path. The directory is renamed into
+    place only once complete, so readers never see a partial segment.
+    """
+    order = np.lexsort((columns['id'], columns['timestamp'], columns['vessel_id']))
+    data = {
+        'vessel_id': columns['vessel_id'][order].astype(np.int64),
+        'timestamp': columns['timestamp'][order].astype(np.int64),
+        'id': columns['id'][order].astype(np.int64),
+        'lat': np.rint(columns['lat'][order] * COORD_SCALE).astype(np.int32),
+        'lon': np.rint(columns['lon'][order] * COORD_SCALE).astype(np.int32),
+        'speed': _scaled_u16(columns['speed'][order]),
+        'heading': _scaled_u16(columns['heading'][order]),
+    }
+    name = '{}-{}-{}-{}'.format(
+        data['timestamp'].min(), data['timestamp'].max(), data['id'].min(), data['id'].max()
+    )
+    root = archive_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    staging = root / f'.{name}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    for column, values in data.items():
+        np.save(staging / f'{column}.npy', values)
+    np.save(staging / VESSEL_INDEX, _build_index(data['vessel_id'], data['timestamp']))
+    final = root / name
+    shutil.rmtree(final, ignore_errors=True)
+    os.rename(staging, final)
+    return final
+
+
+def segments():
+    """(min_ts, max_ts, first_id, last_id, path) for every complete segment."""
+    root = archive_dir()
+    if not root.is_dir():
+        return []
+    found = []
+    for entry in root.iterdir():
+        if entry.name.startswith('.') or not entry.is_dir():
+            continue
+        try:
+            min_ts, max_ts, first_id, last_id = (int(part) for part in entry.name.split('-'))
+        except ValueError:
+            continue
+        found.append((min_ts, max_ts, first_id, last_id, entry))
+    return found
+
+
+def newest_timestamp():
+    found = segments()
+    return from_micros(max(segment[1] for segment in found)) if found else None
+
+
+def remove_segment(path):
+    _indexes.pop(path, None)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _load(path):
+    return {column: np.load(path / f'{column}.npy', mmap_mode='r') for column in COLUMNS}
+
+
+def _build_index(vessel_ids, timestamps):
+    vessel_ids = np.asarray(vessel_ids)
+    if not len(vessel_ids):
+        return np.zeros((0, 5), dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, vessel_ids[1:] != vessel_ids[:-1]])
+    stops = np.r_[starts[1:], len(vessel_ids)]
+    timestamps = np.asarray(timestamps)
+    # Rows are sorted by timestamp within each vessel.
+    return np.column_stack([vessel_ids[starts], starts, stops, timestamps[starts], timestamps[stops - 1]]).astype(np.int64)
+
+
+def _vessel_index(path):
+    index = _indexes.get(path)
+    if index is None:
+        try:
+            index = np.load(path / VESSEL_INDEX)
+        except FileNotFoundError:
+            # Segments written before the index existed.
+            index = _build_index(
+                np.load(path / 'vessel_id.npy', mmap_mode='r'), np.load(path / 'timestamp.npy', mmap_mode='r'),
+            )
+        _indexes[path] = index
+    return index
+
+
+def _vessel_entry(path, vessel_id):
+    """(first row, end row, min_ts, max_ts) of the vessel in a segment, or None."""
+    index = _vessel_index(path)
+    position = int(np.searchsorted(index[:, 0], vessel_id))
+    if position == len(index) or index[position, 0] != vessel_id:
+        return None
+    return tuple(int(value) for value in index[position, 1:])
+
+
+def _time_slice(data, lo, hi, start_us, end_us):
+    """Index range within rows [lo, hi) of one vessel with start_us <= timestamp <= end_us."""
+    timestamps = data['timestamp'][lo:hi]
+    first = int(np.searchsorted(timestamps, start_us, side='left')) if start_us is not None else 0
+    last = int(np.searchsorted(timestamps, end_us, side='right')) if end_us is not None else hi - lo
+    return lo + first, lo + last
+
+
+def scan_positions(vessel_ids=None, start=None, end=None):
+    """
+    Archived positions of the given vessel ids (the whole fleet when None)
+    within [start, end]: one dict of decoded columns per segment, segments
+    in id order and each sorted by id. Coordinates, speed and heading are
+    floats (NaN for missing), timestamps epoch microseconds.
+    """
+    start_us = to_micros(start) if start else None
+    end_us = to_micros(end) if end else None
+    wanted = None if vessel_ids is None else np.unique(np.asarray(list(vessel_ids), dtype=np.int64))
+    for min_ts, max_ts, _, _, path in sorted(segments(), key=lambda segment: segment[2]):
+        if (start_us is not None and max_ts < start_us) or (end_us is not None and min_ts > end_us):
+            continue
+        if wanted is None:
+            data = _load(path)
+            rows = np.arange(len(data['id']))
+        else:
+            # Rows are grouped by vessel, so each wanted vessel is one slice of the index.
+            index = _vessel_index(path)
+            if not len(index):
+                continue
+            at = np.minimum(np.searchsorted(index[:, 0], wanted), len(index) - 1)
+            entries = index[at[index[at, 0] == wanted]]
+            if not len(entries):
+                continue
+            data = _load(path)
+            rows = np.concatenate([np.arange(lo, hi) for lo, hi in entries[:, 1:3].tolist()])
+        timestamps = np.asarray(data['timestamp'])[rows]
+        mask = np.ones(len(rows), dtype=bool)
+        if start_us is not None:
+            mask &= timestamps >= start_us
+        if end_us is not None:
+            mask &= timestamps <= end_us
+        rows = rows[mask]
+        if not len(rows):
+            continue
+        rows = rows[np.argsort(np.asarray(data['id'])[rows], kind='stable')]
+        columns = {column: np.asarray(data[column])[rows] for column in ('vessel_id', 'timestamp', 'id')}
+        columns['lat'] = np.asarray(data['lat'])[rows] / COORD_SCALE
+        columns['lon'] = np.asarray(data['lon'])[rows] / COORD_SCALE
+        for column in ('speed', 'heading'):
+            raw = np.asarray(data[column])[rows]
+            columns[column] = np.where(raw == NULL_U16, np.nan, raw / VALUE_SCALE)
+        yield columns
+
+
+def read_positions(vessel_id, start=None, end=None, before=None, limit=None):
+    """
+    Archived positions of one vessel, newest first, as
+    (id, lat, lon, speed, heading, timestamp) tuples like the history
+    endpoint's values_list rows. `before` is an exclusive (timestamp, id)
+    keyset bound.
+    """
+    start_us = to_micros(start) if start else None
+    end_us = to_micros(end) if end else None
+    before_us = to_micros(before[0]) if before else None
+    upper_us = end_us if before_us is None else before_us if end_us is None else min(end_us, before_us)
+
+    candidates = []
+    for min_ts, max_ts, _, _, path in segments():
+        if start_us is not None and max_ts < start_us:
+            continue
+        if upper_us is not None and min_ts > upper_us:
+            continue
+        entry = _vessel_entry(path, vessel_id)
+        if entry is None:
+            continue
+        lo, hi, vessel_min, vessel_max = entry
+        if (start_us is not None and vessel_max < start_us) or (upper_us is not None and vessel_min > upper_us):
+            continue
+        candidates.append((min(vessel_max, upper_us) if upper_us is not None else vessel_max, lo, hi, path))
+    # Newest first: once `limit` rows are in hand, segments ending before the
+    # oldest of them cannot contribute.
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+    parts = []
+    threshold = None
+    for newest, lo, hi, path in candidates:
+        if threshold is not None and newest < threshold:
+            break
+        data = _load(path)
+        lo, hi = _time_slice(data, lo, hi, start_us, upper_us)
+        if hi <= lo:
+            continue
+        if before is not None:
+            # Rows sharing the cursor timestamp are only kept below the cursor id.
+            ties = lo + int(np.searchsorted(data['timestamp'][lo:hi], before_us, side='left'))
+            mask = np.asarray(data['id'][ties:hi]) < before[1]
+            parts.append({column: np.asarray(data[column][ties:hi])[mask] for column in COLUMNS})
+            hi = ties
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        parts.append({column: np.asarray(data[column][lo:hi]) for column in COLUMNS})
+        if limit is not None:
+            timestamps = np.concatenate([part['timestamp'] for part in parts])
+            if len(timestamps) >= limit:
+                threshold = int(np.partition(timestamps, len(timestamps) - limit)[len(timestamps) - limit])
+
+    if not parts:
+        return []
+    merged = {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+    order = np.lexsort((merged['id'], merged['timestamp']))[::-1]
+    if limit is not None:
+        order = order[:limit]
+
+    def value(raw):
+        return None if raw == NULL_U16 else int(raw) / VALUE_SCALE
+
+    return [(
+        int(merged['id'][i]),
+        int(merged['lat'][i]) / COORD_SCALE,
+        int(merged['lon'][i]) / COORD_SCALE,
+        value(merged['speed'][i]),
+        value(merged['heading'][i]),
+        from_micros(merged['timestamp'][i]),
+    ) for i in order]
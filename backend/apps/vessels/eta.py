@@ -0,0 +1,142 @@
+"""
+ETA for active VesselRoutes.
+
+update_etas() recomputes the fleet in one vectorized pass: great-circle
+distance from each vessel's last fix to its destination port, divided by a
+time-decayed average of its recently reported speeds. A route is only
+recomputed when its vessel has moved ETA_RECOMPUTE_NM since the estimate
+was made, the estimate is older than ETA_MAX_AGE or the route was edited.
+Results are stored on the route, so reading a route never computes anything.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from apps.ports.models import Port
+
+from .bulk import update_rows
+from .geo import haversine_nm_array
+from .geofence import port_radius_nm
+from .models import VesselPosition, VesselRoute
+
+DEFAULT_RECOMPUTE_NM = 1.0
+DEFAULT_MAX_AGE = timedelta(hours=1)
+SPEED_WINDOW = timedelta(hours=6)
+SPEED_HALF_LIFE_HOURS = 1.0
+# Below this a vessel is treated as stopped and keeps its last estimate.
+MIN_ETA_KNOTS = 0.5
+MAX_DURATION_HOURS = 999999.99
+SPEED_QUERY_CHUNK = 500
+ETA_FIELDS = ['eta', 'expected_duration', 'eta_lat', 'eta_lon', 'eta_computed_at']
+
+
+def _port_locations():
+    """{NAME or CODE (upper case): (lat, lon)}; names win over codes."""
+    locations = {}
+    ports = list(Port.objects.values_list('name', 'code', 'location_lat', 'location_lon'))
+    for _, code, lat, lon in ports:
+        locations[code.strip().upper()] = (float(lat), float(lon))
+    for name, _, lat, lon in ports:
+        locations[name.strip().upper()] = (float(lat), float(lon))
+    return locations
+
+
+def smoothed_speeds(vessel_ids, now, fallback):
+    """
+    Exponentially time-weighted mean of each vessel's reported speeds over
+    SPEED_WINDOW (half-life SPEED_HALF_LIFE_HOURS); `fallback` where a vessel
+    has no recent speed.
+    """
+    vessel_ids = np.asarray(vessel_ids, dtype=np.int64)
+    order = np.argsort(vessel_ids)
+    sorted_ids = vessel_ids[order]
+    rows = []
+    for start in range(0, len(sorted_ids), SPEED_QUERY_CHUNK):
+        rows.extend(
+            VesselPosition.objects.filter(
+                vessel_id__in=sorted_ids[start:start + SPEED_QUERY_CHUNK].tolist(),
+                timestamp__gte=now - SPEED_WINDOW,
+                speed__isnull=False,
+            ).order_by().values_list('vessel_id', 'timestamp', 'speed')
+        )
+    result = np.asarray(fallback, dtype=float).copy()
+    if not rows:
+        return result
+
+    slots = order[np.searchsorted(sorted_ids, [row[0] for row in rows])]
+    age_hours = np.array([max((now - row[1]).total_seconds(), 0.0) for row in rows]) / 3600.0
+    speed = np.array([float(row[2]) for row in rows])
+    weight = 0.5 ** (age_hours / SPEED_HALF_LIFE_HOURS)
+    total_weight = np.bincount(slots, weights=weight, minlength=len(vessel_ids))
+    weighted = np.bincount(slots, weights=weight * speed, minlength=len(vessel_ids))
+    known = total_weight > 0
+    result[known] = weighted[known] / total_weight[known]
+    return result
+
+
+def update_etas(now=None, force=False):
+    """Recompute eta/expected_duration for active routes that need it."""
+    now = now or timezone.now()
+    stats = {'routes': 0, 'recomputed': 0, 'stopped': 0, 'unknown_port': 0}
+    rows = list(
+        VesselRoute.objects.filter(
+            status='active', vessel__last_position_lat__isnull=False, vessel__last_position_lon__isnull=False,
+        ).values_list(
+            'id', 'vessel_id', 'destination_port', 'departure_time', 'updated_at',
+            'eta_lat', 'eta_lon', 'eta_computed_at',
+            'vessel__last_position_lat', 'vessel__last_position_lon', 'vessel__last_speed',
+            'vessel__last_position_update',
+        )
+    )
+    stats['routes'] = len(rows)
+    if not rows:
+        return stats
+
+    ports = _port_locations()
+    destination = np.array([ports.get(row[2].strip().upper(), (np.nan, np.nan)) for row in rows], dtype=float)
+    lat = np.array([float(row[8]) for row in rows])
+    lon = np.array([float(row[9]) for row in rows])
+    base_lat = np.array([np.nan if row[5] is None else row[5] for row in rows], dtype=float)
+    base_lon = np.array([np.nan if row[6] is None else row[6] for row in rows], dtype=float)
+
+    max_age = getattr(settings, 'ETA_MAX_AGE', DEFAULT_MAX_AGE)
+    stale = np.array([row[7] is None or row[4] > row[7] or now - row[7] > max_age for row in rows])
+    # NaN (no baseline yet) compares False, so those routes are due as well.
+    moved = ~(haversine_nm_array(base_lat, base_lon, lat, lon) < getattr(settings, 'ETA_RECOMPUTE_NM', DEFAULT_RECOMPUTE_NM))
+    known = ~np.isnan(destination[:, 0])
+    stats['unknown_port'] = int((~known).sum())
+    due = np.flatnonzero(known & (stale | moved | force))
+    if not len(due):
+        return stats
+
+    last_speed = np.array([np.nan if rows[index][10] is None else float(rows[index][10]) for index in due])
+    speed = smoothed_speeds([rows[index][1] for index in due], now, fallback=last_speed)
+    distance = haversine_nm_array(lat[due], lon[due], destination[due, 0], destination[due, 1])
+    arrived = distance <= port_radius_nm()
+    hours = np.where(arrived, 0.0, distance / np.where(speed >= MIN_ETA_KNOTS, speed, np.nan))
+
+    updated = []
+    for position, index in enumerate(due.tolist()):
+        if np.isnan(hours[position]):
+            stats['stopped'] += 1
+            continue
+        row = rows[index]
+        fix_time = row[11] or now
+        eta = fix_time + timedelta(hours=float(hours[position]))
+        duration = (eta - (row[3] or now)).total_seconds() / 3600.0
+        updated.append((
+            eta,
+            Decimal(f'{min(max(duration, 0.0), MAX_DURATION_HOURS):.2f}'),
+            float(lat[index]),
+            float(lon[index]),
+            now,
+            row[0],
+        ))
+    # updated_at is left alone, so a later edit of the route still marks it stale.
+    update_rows(VesselRoute, ETA_FIELDS, updated)
+    stats['recomputed'] = len(updated)
+    return stats
+
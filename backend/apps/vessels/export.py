@@ -0,0 +1,154 @@
+"""
+Streaming bulk export of position history.
+
+Rows are read as tuples with a chunked iterator (a server-side cursor where
+the backend has one) and written out EXPORT_CHUNK_SIZE rows at a time, so
+neither the queryset nor the rendered body is ever held in memory as a
+whole: the cost of an export is one chunk of rows plus one chunk of text,
+whatever its length. With gzip the compressor runs over the same chunks.
+Positions already moved to the archive by the retention job are read from
+its segments first, one segment at a time, then the hot table follows.
+"""
+import csv
+import io
+import json
+import math
+import zlib
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from . import archive
+from .history import format_time
+from .models import Vessel, VesselPosition
+
+DEFAULT_CHUNK_SIZE = 5000
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+COLUMNS = ['vessel_id', 'mmsi', 'timestamp', 'latitude', 'longitude', 'speed', 'heading']
+QUERY_COLUMNS = ['vessel_id', 'vessel__mmsi', 'timestamp', 'latitude', 'longitude', 'speed', 'heading']
+# gzip container rather than a raw zlib stream.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+@dataclass
+class PositionExport:
+    """What an export covers: `positions` in the hot table plus the archived range."""
+    positions: QuerySet
+    vessels: QuerySet = None
+    start: datetime = None
+    end: datetime = None
+
+    def using(self, alias):
+        vessels = None if self.vessels is None else self.vessels.using(alias)
+        return replace(self, positions=self.positions.using(alias), vessels=vessels)
+
+    def chunks(self, chunk_size):
+        yield from self._archived_chunks(chunk_size)
+        yield from _chunked(self.positions, chunk_size)
+
+    def _archived_chunks(self, chunk_size):
+        if not archive.segments():
+            return
+        vessels = self.vessels if self.vessels is not None else Vessel.objects.using(self.positions.db)
+        mmsis = dict(vessels.values_list('id', 'mmsi'))
+        vessel_ids = None if self.vessels is None else list(mmsis)
+        for columns in archive.scan_positions(vessel_ids, self.start, self.end):
+            rows = [
+                (vessel_id, mmsis[vessel_id], archive.from_micros(timestamp), lat, lon, _nan(speed), _nan(heading))
+                for vessel_id, timestamp, lat, lon, speed, heading in zip(*(
+                    columns[name].tolist() for name in ('vessel_id', 'timestamp', 'lat', 'lon', 'speed', 'heading')
+                ))
+                # Archived rows of vessels deleted since, like their hot rows, are gone.
+                if vessel_id in mmsis
+            ]
+            for start in range(0, len(rows), chunk_size):
+                yield rows[start:start + chunk_size]
+
+
+def export_positions(vessel_ids=None, vessels=None, start=None, end=None):
+    """
+    Positions of the given vessel ids (or the vessels of a Vessel queryset,
+    or the whole fleet) within [start, end]: archived ones first, then the
+    hot table in id order.
+    """
+    positions = VesselPosition.objects.all()
+    if vessel_ids is not None:
+        positions = positions.filter(vessel_id__in=vessel_ids)
+        vessels = Vessel.objects.filter(pk__in=vessel_ids)
+    elif vessels is not None:
+        positions = positions.filter(vessel__in=vessels)
+    if start is not None:
+        positions = positions.filter(timestamp__gte=start)
+    if end is not None:
+        positions = positions.filter(timestamp__lte=end)
+    return PositionExport(positions.order_by('id'), vessels, start, end)
+
+
+def _nan(value):
+    return None if math.isnan(value) else value
+
+
+def _csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    for chunk in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (vessel_id, mmsi, format_time(timestamp), latitude, longitude, speed, heading)
+            for vessel_id, mmsi, timestamp, latitude, longitude, speed, heading in chunk
+        )
+        yield buffer.getvalue()
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+def _ndjson_chunks(rows):
+    for chunk in rows:
+        yield ''.join(
+            json.dumps({
+                'vessel_id': vessel_id,
+                'mmsi': mmsi,
+                'timestamp': format_time(timestamp),
+                'latitude': float(latitude),
+                'longitude': float(longitude),
+                'speed': _number(speed),
+                'heading': _number(heading),
+            }, separators=(',', ':')) + '\n'
+            for vessel_id, mmsi, timestamp, latitude, longitude, speed, heading in chunk
+        )
+
+
+def _chunked(queryset, chunk_size):
+    chunk = []
+    for row in queryset.values_list(*QUERY_COLUMNS).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_export(export, export_format='csv', compress=False, chunk_size=None):
+    """Yield a PositionExport as encoded byte chunks."""
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    render = _csv_chunks if export_format == 'csv' else _ndjson_chunks
+    compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS) if compress else None
+    for text in render(export.chunks(chunk_size)):
+        data = text.encode('utf-8')
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
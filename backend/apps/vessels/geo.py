@@ -0,0 +1,29 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def haversine_nm(lat1, lon1, lat2, lon2):
+    """Great-circle distance in nautical miles between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlam = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_nm_array(lat1, lon1, lat2, lon2):
+    """Vectorized haversine_nm over broadcastable arrays of degrees."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlam = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def heading_delta(a, b):
+    """Smallest absolute difference between two headings in degrees."""
+    delta = abs(float(a) - float(b)) % 360.0
+    return 360.0 - delta if delta > 180.0 else delta
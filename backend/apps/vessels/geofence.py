@@ -0,0 +1,174 @@
+"""
+Port geofencing for ingested positions.
+
+Ports are bucketed into a fixed lat/lon grid. A batch of vessels is grouped
+by grid cell and each group is compared, in one vectorized distance matrix,
+only against the ports in the cells its search radius can reach, so the
+cost grows with local port density rather than with the number of ports.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from apps.ports.models import Port
+
+from .geo import haversine_nm_array
+
+CELL_DEG = 0.5
+DEFAULT_PORT_RADIUS_NM = 3.0
+DEFAULT_ANCHORAGE_RADIUS_NM = 12.0
+STOPPED_KNOTS = 1.0
+INDEX_TTL = 300
+
+
+def port_radius_nm():
+    return getattr(settings, 'PORT_RADIUS_NM', DEFAULT_PORT_RADIUS_NM)
+
+
+def anchorage_radius_nm():
+    return getattr(settings, 'ANCHORAGE_RADIUS_NM', DEFAULT_ANCHORAGE_RADIUS_NM)
+
+
+class PortIndex:
+    def __init__(self, ports):
+        ids, names, lats, lons = zip(*ports) if ports else ((), (), (), ())
+        self.ids = np.array(ids, dtype=np.int64)
+        self.names = list(names)
+        self.lat = np.array(lats, dtype=float)
+        self.lon = np.array(lons, dtype=float)
+        self.columns = int(round(360 / CELL_DEG))
+        self.cells = {}
+        for index, key in enumerate(self._cell_keys(self.lat, self.lon).tolist()):
+            self.cells.setdefault(key, []).append(index)
+        self._neighbourhoods = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell_keys(self, lat, lon):
+        rows = np.floor((np.clip(lat, -90, 89.999999) + 90) / CELL_DEG).astype(np.int64)
+        cols = np.floor((np.mod(lon + 180, 360)) / CELL_DEG).astype(np.int64) % self.columns
+        return rows * self.columns + cols
+
+    def _neighbourhood(self, key, radius_nm):
+        """Indices of ports in every cell within radius_nm of cell `key`."""
+        cached = self._neighbourhoods.get((key, radius_nm))
+        if cached is not None:
+            return cached
+        row, col = divmod(key, self.columns)
+        radius_deg = radius_nm / 60.0
+        row_span = math.ceil(radius_deg / CELL_DEG)
+        edge_lat = min(89.9, max(abs(row * CELL_DEG - 90), abs((row + 1) * CELL_DEG - 90)) + radius_deg)
+        col_span = min(self.columns // 2, math.ceil(radius_deg / (CELL_DEG * math.cos(math.radians(edge_lat)))))
+        found = []
+        for r in range(row - row_span, row + row_span + 1):
+            for c in range(col - col_span, col + col_span + 1):
+                found.extend(self.cells.get(r * self.columns + c % self.columns, ()))
+        result = np.array(sorted(set(found)), dtype=np.int64)
+        self._neighbourhoods[(key, radius_nm)] = result
+        return result
+
+    def nearest(self, lat, lon, radius_nm):
+        """
+        For each point, the index of the nearest port within radius_nm
+        (-1 if none) and its distance in nautical miles (inf if none).
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        best = np.full(len(lat), -1, dtype=np.int64)
+        distance = np.full(len(lat), np.inf)
+        if not len(lat) or not len(self.ids):
+            return best, distance
+        keys = self._cell_keys(lat, lon)
+        order = np.argsort(keys, kind='stable')
+        unique, starts = np.unique(keys[order], return_index=True)
+        bounds = np.append(starts, len(order))
+        for position, key in enumerate(unique.tolist()):
+            candidates = self._neighbourhood(key, radius_nm)
+            if not len(candidates):
+                continue
+            members = order[bounds[position]:bounds[position + 1]]
+            matrix = haversine_nm_array(
+                lat[members, None], lon[members, None], self.lat[None, candidates], self.lon[None, candidates]
+            )
+            closest = matrix.argmin(axis=1)
+            closest_distance = matrix[np.arange(len(members)), closest]
+            inside = closest_distance <= radius_nm
+            best[members[inside]] = candidates[closest[inside]]
+            distance[members[inside]] = closest_distance[inside]
+        return best, distance
+
+
+class Geofence:
+    """Derives vessel status from port proximity and speed, and port events."""
+
+    def __init__(self):
+        self._index = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._index = None
+
+    def index(self):
+        index = self._index
+        if index is None or time.monotonic() - self._loaded_at > INDEX_TTL:
+            with self._lock:
+                ports = list(Port.objects.values_list('id', 'name', 'location_lat', 'location_lon'))
+                index = self._index = PortIndex(ports)
+                self._loaded_at = time.monotonic()
+        return index
+
+    def apply(self, vessels, previous):
+        """
+        Set `status` on each vessel from its nearest port and speed, and
+        return (vessel_id, 'port_arrival' | 'port_departure', message) events
+        for vessels entering or leaving in_port.
+        """
+        if not vessels:
+            return []
+        index = self.index()
+        lat = np.array([float(vessel.last_position_lat) for vessel in vessels])
+        lon = np.array([float(vessel.last_position_lon) for vessel in vessels])
+        speed = np.array([np.nan if vessel.last_speed is None else float(vessel.last_speed) for vessel in vessels])
+        port, distance = index.nearest(lat, lon, anchorage_radius_nm())
+
+        # Stopped within a port's radius is in_port, within its anchorage anchored;
+        # anywhere else, however slow, the vessel is underway (in_transit).
+        stopped = speed <= STOPPED_KNOTS
+        status = np.where(
+            stopped & (distance <= port_radius_nm()), 'in_port',
+            np.where(stopped & (distance <= anchorage_radius_nm()), 'anchored', 'in_transit'),
+        )
+
+        events = []
+        departures = []
+        for position, vessel in enumerate(vessels):
+            vessel.status = str(status[position])
+            before = previous.get(vessel.pk)
+            was_in_port = before is not None and before.status == 'in_port'
+            if vessel.status == 'in_port' and not was_in_port:
+                events.append((vessel.pk, 'port_arrival', f'{vessel.name} arrived at {index.names[port[position]]}'))
+            elif was_in_port and vessel.status != 'in_port':
+                if before.lat is None or before.lon is None:
+                    events.append((vessel.pk, 'port_departure', f'{vessel.name} departed from port'))
+                else:
+                    departures.append((vessel, before))
+
+        if departures:
+            # Name the port the vessel left, located from its previous fix.
+            departed_from, _ = index.nearest(
+                [float(before.lat) for _, before in departures],
+                [float(before.lon) for _, before in departures],
+                anchorage_radius_nm(),
+            )
+            for (vessel, _), port_index in zip(departures, departed_from.tolist()):
+                name = index.names[port_index] if port_index >= 0 else 'port'
+                events.append((vessel.pk, 'port_departure', f'{vessel.name} departed from {name}'))
+        return events
+
+
+geofence = Geofence()
@@ -0,0 +1,89 @@
+import base64
+from datetime import timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import archive
+from .models import VesselPosition
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+POSITION_COLUMNS = ('id', 'latitude', 'longitude', 'speed', 'heading', 'timestamp')
+
+
+def parse_time(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value.replace(' ', '+'))
+    if parsed is None:
+        raise ValueError(f'Invalid datetime: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def format_time(value):
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def encode_cursor(timestamp, pk):
+    raw = f'{timestamp.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return parse_time(timestamp), int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def position_dict(row):
+    _, lat, lon, speed, heading, timestamp = row
+    return {
+        'latitude': float(lat),
+        'longitude': float(lon),
+        'speed': float(speed) if speed is not None else None,
+        'heading': float(heading) if heading is not None else None,
+        'timestamp': format_time(timestamp),
+    }
+
+
+def history_page(vessel_id, start=None, end=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of a vessel's track, newest first.
+
+    Pages are addressed by a (timestamp, id) keyset cursor instead of an
+    offset, so every page is a bounded range scan on the (vessel, -timestamp)
+    index no matter how far back the client has paged. Once the page reaches
+    positions moved out by the retention job, it continues from the archive
+    segments on disk. Returns the page as plain dicts and the cursor for the
+    next page (None on the last page).
+    """
+    queryset = VesselPosition.objects.filter(vessel_id=vessel_id)
+    if start:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end:
+        queryset = queryset.filter(timestamp__lte=end)
+    before = None
+    if cursor:
+        before = decode_cursor(cursor)
+        timestamp, pk = before
+        queryset = queryset.filter(timestamp__lte=timestamp).exclude(timestamp=timestamp, id__gte=pk)
+
+    rows = list(queryset.order_by('-timestamp', '-id').values_list(*POSITION_COLUMNS)[:limit + 1])
+    archived_until = archive.newest_timestamp()
+    if archived_until and (len(rows) <= limit or rows[-1][5] <= archived_until):
+        rows += archive.read_positions(vessel_id, start, end, before, limit + 1)
+        rows = sorted(rows, key=lambda row: (row[5], row[0]), reverse=True)[:limit + 1]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][5], rows[-1][0])
+    return [position_dict(row) for row in rows], next_cursor
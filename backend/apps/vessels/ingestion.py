@@ -0,0 +1,154 @@
+from collections import namedtuple
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.metrics.registry import timer
+
+from .bulk import update_rows
+from .geofence import geofence
+from .live import LAST_POSITION_FIELDS, live_positions
+from .models import Vessel, VesselPosition
+from .signals import positions_ingested
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Snapshot of a vessel's last_* columns, taken before a chunk overwrites them.
+VesselState = namedtuple('VesselState', 'lat lon speed heading status timestamp')
+
+
+@dataclass
+class PositionReport:
+    """A single provider-agnostic AIS position fix, keyed by MMSI."""
+    mmsi: int
+    latitude: float
+    longitude: float
+    speed: float = None
+    heading: float = None
+    timestamp: datetime = None
+    status: str = None
+
+
+@dataclass
+class IngestResult:
+    received: int = 0
+    stored: int = 0
+    vessels_updated: int = 0
+    unknown_mmsi: set = field(default_factory=set)
+    positions: list = field(default_factory=list)
+
+
+def ingest_reports(reports, chunk_size=None):
+    """
+    Persist a batch of PositionReports.
+
+    Reports are written in chunks, one transaction per chunk: VesselPosition
+    rows go through bulk_create and the owning Vessel rows get one
+    executemany UPDATE of their last_* columns. Reports for unknown MMSIs are
+    skipped and reported back; a report older than the vessel's current fix
+    is kept as history but does not rewind the vessel's last position.
+
+    With LIVE_POSITION_WRITE_BEHIND the vessels and their previous state come
+    from the live position store, and their rows are written by its periodic
+    flush instead of the per-chunk UPDATE. The store may predate a delete in
+    another process, so the ids it resolves are checked against Vessel first.
+    Other processes' relays hold such vessels back until that flush lands.
+    """
+    chunk_size = chunk_size or getattr(settings, 'AIS_INGEST_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    reports = list(reports)
+    result = IngestResult(received=len(reports))
+    for start in range(0, len(reports), chunk_size):
+        with timer('ingest.chunk'):
+            _ingest_chunk(reports[start:start + chunk_size], result)
+    live_positions.flush_due()
+    return result
+
+
+def _ingest_chunk(reports, result):
+    now = timezone.now()
+    mmsis = {report.mmsi for report in reports}
+    write_behind = live_positions.write_behind()
+    if write_behind:
+        vessels = live_positions.vessels(mmsis)
+        existing = set(Vessel.objects.filter(pk__in=[vessel.pk for vessel in vessels.values()])
+                       .values_list('pk', flat=True))
+        for mmsi, vessel in list(vessels.items()):
+            if vessel.pk not in existing:
+                live_positions.remove(vessel.pk)
+                del vessels[mmsi]
+    else:
+        vessels = {
+            vessel.mmsi: vessel
+            for vessel in Vessel.objects.filter(mmsi__in=mmsis).only('id', 'mmsi', 'name', *LAST_POSITION_FIELDS)
+        }
+
+    positions = []
+    latest = {}
+    for report in reports:
+        vessel = vessels.get(report.mmsi)
+        if vessel is None:
+            result.unknown_mmsi.add(report.mmsi)
+            continue
+        timestamp = report.timestamp or now
+        positions.append(VesselPosition(
+            vessel=vessel,
+            latitude=report.latitude,
+            longitude=report.longitude,
+            speed=report.speed,
+            heading=report.heading,
+            timestamp=timestamp,
+            recorded_at=now,
+            created_at=now,
+        ))
+        current = latest.get(vessel.pk)
+        if current is None or timestamp >= current[1]:
+            latest[vessel.pk] = (report, timestamp)
+
+    changed = []
+    derived = []
+    previous = {}
+    for vessel in vessels.values():
+        if vessel.pk not in latest:
+            continue
+        report, timestamp = latest[vessel.pk]
+        if vessel.last_position_update and timestamp < vessel.last_position_update:
+            continue
+        previous[vessel.pk] = VesselState(
+            vessel.last_position_lat, vessel.last_position_lon, vessel.last_speed,
+            vessel.last_heading, vessel.status, vessel.last_position_update,
+        )
+        vessel.last_position_lat = report.latitude
+        vessel.last_position_lon = report.longitude
+        vessel.last_speed = report.speed
+        vessel.last_heading = report.heading
+        vessel.last_position_update = timestamp
+        if report.status:
+            vessel.status = report.status
+        else:
+            derived.append(vessel)
+        changed.append(vessel)
+
+    # Vessels without a reported status get one from port proximity and speed.
+    port_events = geofence.apply(derived, previous)
+
+    with transaction.atomic():
+        # Stamped once the IMMEDIATE transaction holds the write lock, so
+        # updated_at follows commit order and sync cursors cannot skip it.
+        stamped = timezone.now()
+        for vessel in changed:
+            vessel.updated_at = stamped
+        VesselPosition.objects.bulk_create(positions)
+        if not write_behind:
+            update_rows(Vessel, LAST_POSITION_FIELDS, [
+                [getattr(vessel, name) for name in LAST_POSITION_FIELDS] + [vessel.pk] for vessel in changed
+            ])
+    live_positions.put(changed, dirty=write_behind)
+
+    result.stored += len(positions)
+    result.vessels_updated += len(changed)
+    result.positions.extend(positions)
+    positions_ingested.send(sender=VesselPosition, positions=positions, vessels=changed, previous=previous,
+                             port_events=port_events)
@@ -0,0 +1,228 @@
+"""
+Background AIS ingest pipeline.
+
+A tick claims the pipeline's single active IngestJob. While one is queued
+or running, further ticks only bump its `coalesced` counter, so a slow run
+never overlaps the next one. A claimed job is handed to an executor: Celery
+(tasks.run_ingest_job, with tasks.ingest_tick scheduled by
+django_celery_beat) or, with INGEST_EXECUTOR = 'local', a worker thread in
+this process, which needs no broker.
+
+Each run polls the source into a per-process backlog keyed by MMSI, so a
+vessel that reports again before its previous fix was stored only keeps the
+latest one. A newer fix keeps the vessel's place in the backlog and stored
+vessels leave it, so vessels left over from a run go first in the next one
+and a fleet larger than the batch is worked through in turn. The batch taken from the backlog is sized from recent
+throughput to fit INGEST_TICK_DEADLINE_MS, and ingestion stops early if the
+deadline passes anyway; whatever is left waits for the next tick.
+
+A running job records a heartbeat after every chunk. Queued jobs expire
+INGEST_JOB_TIMEOUT after they were requested and running ones that long
+after their last heartbeat; an expired run that turns out to be alive
+stops at its next heartbeat and does not overwrite the job's failed state.
+"""
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.metrics.registry import timer
+
+from .ingestion import DEFAULT_CHUNK_SIZE, ingest_reports
+from .models import IngestJob
+
+PIPELINE = 'ais'
+ACTIVE_STATUSES = ('queued', 'running')
+DEFAULT_SOURCE = 'apps.vessels.services.MockAISProvider'
+DEFAULT_DEADLINE_MS = 5000
+# Share of the deadline the batch is sized for, leaving room for the poll.
+DEADLINE_FRACTION = 0.8
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 100_000
+# Weight of the latest run in the smoothed throughput.
+THROUGHPUT_SMOOTHING = 0.5
+# A job queued, or running without a heartbeat, for longer than this is assumed lost with its worker.
+DEFAULT_JOB_TIMEOUT = timedelta(minutes=10)
+
+
+class JobExpired(Exception):
+    """The running job was expired (see _expire_lost_jobs) while it was still working."""
+
+_backlog = {}
+
+
+def _deadline_seconds():
+    return getattr(settings, 'INGEST_TICK_DEADLINE_MS', DEFAULT_DEADLINE_MS) / 1000.0
+
+
+def _expire_lost_jobs(pipeline):
+    timeout = getattr(settings, 'INGEST_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT)
+    now = timezone.now()
+    IngestJob.objects.filter(
+        Q(status='queued', requested_at__lt=now - timeout) | Q(status='running', heartbeat_at__lt=now - timeout),
+        pipeline=pipeline,
+    ).update(status='failed', finished_at=now, error='Timed out')
+
+
+def _heartbeat(job):
+    """Record progress; raises JobExpired if the job was timed out meanwhile."""
+    job.heartbeat_at = timezone.now()
+    if not IngestJob.objects.filter(pk=job.pk, status='running').update(heartbeat_at=job.heartbeat_at):
+        raise JobExpired(job.pk)
+
+
+def claim_job(pipeline=PIPELINE):
+    """
+    Returns (job, created): a new queued job, or the active job this tick
+    was coalesced into.
+    """
+    _expire_lost_jobs(pipeline)
+    while True:
+        try:
+            with transaction.atomic():
+                return IngestJob.objects.create(pipeline=pipeline), True
+        except IntegrityError:
+            active = IngestJob.objects.filter(pipeline=pipeline, status__in=ACTIVE_STATUSES)
+            active.update(coalesced=F('coalesced') + 1)
+            job = active.first()
+            if job is not None:
+                return job, False
+            # The active job finished in between; claim again.
+
+
+def batch_size(pipeline=PIPELINE):
+    """Reports the next run should take to finish within the tick deadline."""
+    throughput = (
+        IngestJob.objects.filter(pipeline=pipeline, status='succeeded', throughput__isnull=False)
+        .values_list('throughput', flat=True)
+        .first()
+    )
+    if not throughput:
+        return getattr(settings, 'AIS_INGEST_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    size = int(throughput * _deadline_seconds() * DEADLINE_FRACTION)
+    return max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, size))
+
+
+def run_job(job_id):
+    """Run a queued job; returns it, or None if another worker already took it."""
+    now = timezone.now()
+    if not IngestJob.objects.filter(pk=job_id, status='queued').update(
+        status='running', started_at=now, heartbeat_at=now,
+    ):
+        return None
+    job = IngestJob.objects.get(pk=job_id)
+    try:
+        with timer('ingest.tick'):
+            _ingest(job)
+        job.status = 'succeeded'
+    except JobExpired:
+        job.refresh_from_db()
+        return job
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    # Only while still running: an expired job's row already says failed, and
+    # a newer job may hold the pipeline.
+    IngestJob.objects.filter(pk=job.pk, status='running').update(**{
+        name: getattr(job, name) for name in (
+            'status', 'finished_at', 'batch_size', 'received', 'stored', 'backlog', 'throughput', 'error',
+        )
+    })
+    return job
+
+
+def _ingest(job):
+    started = time.perf_counter()
+    deadline = started + _deadline_seconds()
+    source = import_string(getattr(settings, 'INGEST_SOURCE', DEFAULT_SOURCE))()
+    for report in source.generate_reports():
+        _backlog[report.mmsi] = report
+    _heartbeat(job)
+
+    job.batch_size = batch_size(job.pipeline)
+    batch = list(islice(_backlog.values(), job.batch_size))
+    chunk_size = getattr(settings, 'AIS_INGEST_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    ingest_started = time.perf_counter()
+    taken = 0
+    while taken < len(batch) and time.perf_counter() < deadline:
+        chunk = batch[taken:taken + chunk_size]
+        job.stored += ingest_reports(chunk, chunk_size).stored
+        for report in chunk:
+            del _backlog[report.mmsi]
+        taken += len(chunk)
+        _heartbeat(job)
+
+    elapsed = time.perf_counter() - ingest_started
+    job.received = taken
+    job.backlog = len(_backlog)
+    if taken and elapsed > 0:
+        measured = taken / elapsed
+        previous = (
+            IngestJob.objects.filter(pipeline=job.pipeline, status='succeeded', throughput__isnull=False)
+            .values_list('throughput', flat=True)
+            .first()
+        )
+        job.throughput = measured if previous is None else (
+            THROUGHPUT_SMOOTHING * measured + (1 - THROUGHPUT_SMOOTHING) * previous
+        )
+
+
+class LocalExecutor:
+    """Runs jobs one at a time on a worker thread in this process."""
+
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, job_id):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest')
+        return self._pool.submit(self._run, job_id)
+
+    @staticmethod
+    def _run(job_id):
+        try:
+            return run_job(job_id)
+        finally:
+            connections.close_all()
+
+
+class CeleryExecutor:
+    """Queues jobs on the Celery broker."""
+
+    def submit(self, job_id):
+        # Binds shared tasks to the configured app (broker from settings); see config/__init__.py.
+        import config.celery  # noqa: F401
+
+        from .tasks import run_ingest_job
+        return run_ingest_job.delay(job_id)
+
+
+EXECUTORS = {
+    'local': LocalExecutor(),
+    'celery': CeleryExecutor(),
+}
+
+
+def trigger(pipeline=PIPELINE):
+    """Claim a job and submit it, or coalesce into the active one; returns (job, created)."""
+    job, created = claim_job(pipeline)
+    if created:
+        try:
+            EXECUTORS[getattr(settings, 'INGEST_EXECUTOR', 'celery')].submit(job.pk)
+        except Exception:
+            IngestJob.objects.filter(pk=job.pk).update(
+                status='failed', finished_at=timezone.now(), error=traceback.format_exc(),
+            )
+            raise
+    return job, created
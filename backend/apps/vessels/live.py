@@ -0,0 +1,326 @@
+"""
+Process-local live state of the fleet.
+
+The latest fix of every vessel (position, speed, heading, status and its
+timestamps) is held in parallel NumPy arrays, one slot per vessel, behind
+{id: slot} and {mmsi: slot} dicts. Reading the current fleet, or one
+vessel, is array access with no query; loading it is a single values_list
+over Vessel converted column by column.
+
+With LIVE_POSITION_WRITE_BEHIND (off by default), ingestion takes each
+vessel's previous state from here and only marks the slots it advanced as
+dirty. flush() writes the dirty slots back to their Vessel rows with one
+executemany UPDATE, at most every LIVE_POSITION_FLUSH_INTERVAL seconds and
+at exit, so a vessel reported in many chunks is written once. It writes the
+position columns, the status only where a fix changed it, and a fresh
+updated_at, so edits made elsewhere survive and sync cursors see the rows.
+Only the process that ingests holds dirty slots; other processes reload
+from Vessel every LIVE_POSITION_TTL seconds like the other in-memory
+indexes. Write behind assumes one ingesting process; with several, leave it
+off and every chunk updates Vessel directly.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .bulk import update_rows
+from .history import format_time
+from .models import Vessel
+
+# The Vessel columns that follow each new fix.
+LAST_POSITION_FIELDS = [
+    'last_position_lat',
+    'last_position_lon',
+    'last_speed',
+    'last_heading',
+    'last_position_update',
+    'status',
+    'updated_at',
+]
+LOAD_FIELDS = ['id', 'mmsi', 'name', *LAST_POSITION_FIELDS]
+# What flush() writes back: the fix itself, never the status or updated_at as loaded.
+FLUSH_FIELDS = ['last_position_lat', 'last_position_lon', 'last_speed', 'last_heading', 'last_position_update']
+FLOAT_COLUMNS = ('last_position_lat', 'last_position_lon', 'last_speed', 'last_heading')
+TIME_COLUMNS = ('last_position_update', 'updated_at')
+# Model.from_db() takes the loaded values in field declaration order.
+INSTANCE_FIELDS = [field.attname for field in Vessel._meta.concrete_fields if field.attname in LOAD_FIELDS]
+DEFAULT_TTL = 60
+DEFAULT_FLUSH_INTERVAL = 5
+INITIAL_CAPACITY = 1024
+# Microseconds since the epoch; this marks a missing timestamp.
+NO_TIME = np.iinfo(np.int64).min
+
+
+def _micros(value):
+    if value is None:
+        return NO_TIME
+    return int(value.timestamp()) * 1_000_000 + value.microsecond
+
+
+def _datetime(micros):
+    if micros == NO_TIME:
+        return None
+    seconds, fraction = divmod(micros, 1_000_000)
+    return datetime.fromtimestamp(seconds, tz=dt_timezone.utc).replace(microsecond=fraction)
+
+
+def _number(value):
+    return None if value != value else value
+
+
+class LivePositionStore:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._size = 0
+        self._slots = None
+        self._by_mmsi = None
+        self._names = []
+        self._statuses = []
+        self._status_codes = {}
+        self._loaded_at = 0.0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.RLock()
+        self._allocate(0)
+
+    @staticmethod
+    def write_behind():
+        return getattr(settings, 'LIVE_POSITION_WRITE_BEHIND', False)
+
+    def _allocate(self, capacity):
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._mmsis = np.zeros(capacity, dtype=np.int64)
+        self._floats = {name: np.full(capacity, np.nan) for name in FLOAT_COLUMNS}
+        self._times = {name: np.full(capacity, NO_TIME, dtype=np.int64) for name in TIME_COLUMNS}
+        self._status = np.zeros(capacity, dtype=np.int16)
+        self._dirty = np.zeros(capacity, dtype=bool)
+        self._status_dirty = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed):
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, INITIAL_CAPACITY)
+        for name in ('_ids', '_mmsis', '_status', '_dirty', '_status_dirty'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        for columns, fill in ((self._floats, np.nan), (self._times, NO_TIME)):
+            for name, old in columns.items():
+                new = np.full(capacity, fill, dtype=old.dtype)
+                new[:self._size] = old[:self._size]
+                columns[name] = new
+
+    def _status_code(self, status):
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._statuses)
+            self._statuses.append(status)
+        return code
+
+    def invalidate(self):
+        with self._lock:
+            self._slots = None
+
+    def load(self):
+        """Rebuild every slot from Vessel, writing back dirty slots first."""
+        with self._lock:
+            self.flush()
+            rows = list(Vessel.objects.order_by().values_list(*LOAD_FIELDS))
+            self._size = 0
+            self._allocate(max(len(rows), INITIAL_CAPACITY))
+            self._size = len(rows)
+            self._slots, self._by_mmsi, self._names = {}, {}, []
+            if rows:
+                columns = list(zip(*rows))
+                ids, mmsis, names = columns[:3]
+                values = dict(zip(LAST_POSITION_FIELDS, columns[3:]))
+                self._ids[:self._size] = ids
+                self._mmsis[:self._size] = mmsis
+                self._names = list(names)
+                for name in FLOAT_COLUMNS:
+                    self._floats[name][:self._size] = [np.nan if value is None else float(value) for value in values[name]]
+                for name in TIME_COLUMNS:
+                    self._times[name][:self._size] = [_micros(value) for value in values[name]]
+                self._status[:self._size] = [self._status_code(value) for value in values['status']]
+                self._slots = dict(zip(ids, range(self._size)))
+                self._by_mmsi = dict(zip(mmsis, range(self._size)))
+            self._loaded_at = time.monotonic()
+
+    def _ensure(self):
+        ttl = self.ttl or getattr(settings, 'LIVE_POSITION_TTL', DEFAULT_TTL)
+        if self._slots is None or time.monotonic() - self._loaded_at > ttl:
+            self.load()
+
+    def _row(self, slot):
+        """Values of one slot in LOAD_FIELDS order."""
+        return [
+            int(self._ids[slot]), int(self._mmsis[slot]), self._names[slot],
+            *(_number(float(self._floats[name][slot])) for name in FLOAT_COLUMNS),
+            _datetime(int(self._times['last_position_update'][slot])),
+            self._statuses[self._status[slot]],
+            _datetime(int(self._times['updated_at'][slot])),
+        ]
+
+    def _put(self, vessel, dirty):
+        slot = self._slots.get(vessel.pk)
+        if slot is None:
+            slot = self._size
+            self._grow(slot + 1)
+            self._size += 1
+            self._slots[vessel.pk] = slot
+            self._names.append(vessel.name)
+        elif self._mmsis[slot] != vessel.mmsi:
+            self._by_mmsi.pop(int(self._mmsis[slot]), None)
+        self._ids[slot] = vessel.pk
+        self._mmsis[slot] = vessel.mmsi
+        self._by_mmsi[vessel.mmsi] = slot
+        self._names[slot] = vessel.name
+        timestamp = _micros(vessel.last_position_update)
+        if not dirty and self._dirty[slot] and timestamp < self._times['last_position_update'][slot]:
+            # A save of a row read before the pending fix was written back.
+            return
+        for name in FLOAT_COLUMNS:
+            value = getattr(vessel, name)
+            self._floats[name][slot] = np.nan if value is None else float(value)
+        self._times['last_position_update'][slot] = timestamp
+        self._times['updated_at'][slot] = _micros(vessel.updated_at)
+        status = self._status_code(vessel.status)
+        if dirty and status != self._status[slot]:
+            self._status_dirty[slot] = True
+        self._status[slot] = status
+        self._dirty[slot] |= dirty
+
+    def put(self, vessels, dirty=False):
+        """Store the last_* fields of saved or ingested Vessel instances."""
+        with self._lock:
+            if self._slots is None:
+                return
+            for vessel in vessels:
+                self._put(vessel, dirty)
+
+    def remove(self, vessel_id):
+        """Drop a vessel, moving the last slot into its place."""
+        with self._lock:
+            if self._slots is None or vessel_id not in self._slots:
+                return
+            slot = self._slots.pop(vessel_id)
+            self._by_mmsi.pop(int(self._mmsis[slot]), None)
+            last = self._size - 1
+            if slot != last:
+                for array in (self._ids, self._mmsis, self._status, self._dirty, self._status_dirty,
+                              *self._floats.values(), *self._times.values()):
+                    array[slot] = array[last]
+                self._names[slot] = self._names[last]
+                self._slots[int(self._ids[slot])] = slot
+                self._by_mmsi[int(self._mmsis[slot])] = slot
+            self._names.pop()
+            self._dirty[last] = self._status_dirty[last] = False
+            self._size = last
+
+    def vessels(self, mmsis):
+        """
+        {mmsi: Vessel} for ingestion, built from the slots and shaped like
+        Vessel.objects.only(*LOAD_FIELDS). MMSIs without a slot are looked
+        up in Vessel (vessels created in another process since the load).
+        """
+        with self._lock:
+            self._ensure()
+            alias = router.db_for_read(Vessel)
+            found, missing = {}, []
+            for mmsi in mmsis:
+                slot = self._by_mmsi.get(mmsi)
+                if slot is None:
+                    missing.append(mmsi)
+                else:
+                    values = dict(zip(LOAD_FIELDS, self._row(slot)))
+                    found[mmsi] = Vessel.from_db(alias, INSTANCE_FIELDS, [values[name] for name in INSTANCE_FIELDS])
+            if missing:
+                loaded = list(Vessel.objects.filter(mmsi__in=missing).only(*LOAD_FIELDS))
+                self.put(loaded)
+                found.update((vessel.mmsi, vessel) for vessel in loaded)
+            return found
+
+    def get(self, vessel_id=None, mmsi=None):
+        """Live state of one vessel by id or MMSI, or None."""
+        with self._lock:
+            self._ensure()
+            slot = self._slots.get(vessel_id) if mmsi is None else self._by_mmsi.get(mmsi)
+            if slot is None:
+                return None
+            values = dict(zip(LOAD_FIELDS, self._row(slot)))
+            return {
+                'id': values['id'],
+                'mmsi': values['mmsi'],
+                'lat': values['last_position_lat'],
+                'lon': values['last_position_lon'],
+                'speed': values['last_speed'],
+                'heading': values['last_heading'],
+                'status': values['status'],
+                'updated': format_time(values['last_position_update']) if values['last_position_update'] else None,
+            }
+
+    def columns(self):
+        """
+        Parallel id/mmsi/lat/lon/speed/heading/status/updated lists of the
+        vessels with a known position, in id order.
+        """
+        with self._lock:
+            self._ensure()
+            size = self._size
+            lat, lon = self._floats['last_position_lat'][:size], self._floats['last_position_lon'][:size]
+            placed = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+            selection = placed[np.argsort(self._ids[placed], kind='stable')]
+            times = self._times['last_position_update'][selection].tolist()
+            return {
+                'id': self._ids[selection].tolist(),
+                'mmsi': self._mmsis[selection].tolist(),
+                'lat': lat[selection].tolist(),
+                'lon': lon[selection].tolist(),
+                'speed': [_number(value) for value in self._floats['last_speed'][selection].tolist()],
+                'heading': [_number(value) for value in self._floats['last_heading'][selection].tolist()],
+                'status': [self._statuses[code] for code in self._status[selection].tolist()],
+                'updated': [None if value == NO_TIME else format_time(_datetime(value)) for value in times],
+            }
+
+    def flush(self):
+        """Write dirty slots back to their Vessel rows; returns how many."""
+        with self._lock:
+            slots = np.flatnonzero(self._dirty[:self._size]).tolist()
+            if not slots:
+                self._flushed_at = time.monotonic()
+                return 0
+            with transaction.atomic():
+                # Stamped under the write lock, like ingestion, so sync cursors see it.
+                now = timezone.now()
+                rows, status_rows = [], []
+                for slot in slots:
+                    values = dict(zip(LOAD_FIELDS, self._row(slot)))
+                    row = [values[name] for name in FLUSH_FIELDS] + [now]
+                    if self._status_dirty[slot]:
+                        status_rows.append(row + [values['status'], values['id']])
+                    else:
+                        rows.append(row + [values['id']])
+                    self._times['updated_at'][slot] = _micros(now)
+                update_rows(Vessel, [*FLUSH_FIELDS, 'updated_at'], rows)
+                update_rows(Vessel, [*FLUSH_FIELDS, 'updated_at', 'status'], status_rows)
+            self._dirty[slots] = self._status_dirty[slots] = False
+            self._flushed_at = time.monotonic()
+            return len(rows) + len(status_rows)
+
+    def flush_due(self):
+        """flush() when LIVE_POSITION_FLUSH_INTERVAL has passed since the last one."""
+        interval = getattr(settings, 'LIVE_POSITION_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        if time.monotonic() - self._flushed_at >= interval:
+            return self.flush()
+        return 0
+
+
+live_positions = LivePositionStore()
+atexit.register(live_positions.flush)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.vessels.retention import DEFAULT_BATCH_SIZE, run_retention
+
+
+class Command(BaseCommand):
+    help = 'Roll up and archive VesselPosition rows older than POSITION_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        stats = run_retention(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {stats['archived']} positions into {stats['segments']} segments, "
+            f"{stats['rollups']} hourly rollups written, {stats['cells']} space-time cells and "
+            f"{stats['snapshots']} fleet snapshots pruned"
+        ))
@@ -0,0 +1,131 @@
+import json
+import multiprocessing
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from apps.vessels.history import history_page
+from apps.vessels.ingestion import ingest_reports
+from apps.vessels.models import Vessel
+from apps.vessels.representations import vessel_rows
+from apps.vessels.simulator import MMSI_BASE, FleetSimulator
+from config.routers import read_replica
+
+TICK_SECONDS = 10
+
+
+def _summary(samples_s):
+    if not samples_s:
+        return {'reads': 0, 'p50_ms': None, 'p99_ms': None}
+    samples_ms = np.array(samples_s) * 1000.0
+    return {
+        'reads': len(samples_ms),
+        'p50_ms': round(float(np.percentile(samples_ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(samples_ms, 99)), 2),
+    }
+
+
+def _ingest_until(simulator, stop, written):
+    try:
+        while not stop.is_set():
+            simulator.step(TICK_SECONDS)
+            stored = ingest_reports(simulator.reports()).stored
+            with written.get_lock():
+                written.value += stored
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Time fleet list and history reads through the replica alias, idle and while a thread ingests '
+        'simulated ticks. Writes simulated vessels: run it against a scratch DATABASE_NAME.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vessels', type=int, default=5_000)
+        parser.add_argument('--seconds', type=float, default=10.0, help='Length of each measuring phase')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--journal-mode', choices=['wal', 'delete'], default='wal',
+            help='Override the journal mode from SQLITE_PRAGMAS, to compare against rollback journaling',
+        )
+        parser.add_argument(
+            '--output', default=str(settings.BASE_DIR / 'benchmarks' / 'concurrent_reads.jsonl'),
+        )
+
+    def handle(self, *args, **options):
+        mode = options['journal_mode'].upper()
+        connections.close_all()
+        for alias in connections:
+            config = connections.settings[alias]
+            config['OPTIONS'] = {
+                **config['OPTIONS'],
+                'init_command': config['OPTIONS'].get('init_command', '').replace(
+                    'journal_mode=WAL', f'journal_mode={mode}'
+                ),
+            }
+
+        simulator = FleetSimulator(options['vessels'], seed=options['seed'])
+        simulator.populate()
+        ingest_reports(simulator.reports())
+        ids = list(
+            Vessel.objects.filter(mmsi__gte=MMSI_BASE, mmsi__lt=MMSI_BASE + options['vessels'])
+            .values_list('id', flat=True)
+        )
+        rng = np.random.default_rng(options['seed'])
+
+        idle = self._read(ids, rng, options['seconds'])
+
+        # The writer is a separate process, as ingest workers are in production, so the
+        # readers contend with it for the database rather than for this interpreter's GIL.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        written = context.Value('q', 0)
+        writer = context.Process(target=_ingest_until, args=(simulator, stop, written), name='benchmark-ingest')
+        started = time.perf_counter()
+        writer.start()
+        busy = self._read(ids, rng, options['seconds'])
+        stop.set()
+        writer.join()
+        ingest_s = time.perf_counter() - started
+
+        record = {
+            'recorded_at': timezone.now().isoformat(),
+            'journal_mode': mode.lower(),
+            'vessels': options['vessels'],
+            'ingest_reports_per_second': round(written.value / ingest_s, 1),
+            'idle': idle,
+            'under_ingest': busy,
+        }
+        for phase in ('idle', 'under_ingest'):
+            for name, result in record[phase].items():
+                self.stdout.write(
+                    f"{phase:<13} {name:<8} p50 {result['p50_ms']} ms   p99 {result['p99_ms']} ms   "
+                    f"({result['reads']} reads)"
+                )
+        self.stdout.write(f"ingest {record['ingest_reports_per_second']:,.0f} reports/s")
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with output.open('a', encoding='utf-8') as fh:
+            fh.write(json.dumps(record) + '\n')
+
+    @staticmethod
+    def _read(ids, rng, seconds):
+        samples = {'list': [], 'history': []}
+        deadline = time.perf_counter() + seconds
+        with read_replica():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                vessel_rows(Vessel.objects.all())
+                samples['list'].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                history_page(int(rng.choice(ids)), None, None, None, 100)
+                samples['history'].append(time.perf_counter() - started)
+        return {name: _summary(values) for name, values in samples.items()}
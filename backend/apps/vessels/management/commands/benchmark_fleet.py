@@ -0,0 +1,146 @@
+import json
+import platform
+import subprocess
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import django
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.vessels.ingestion import ingest_reports
+from apps.vessels.models import Vessel
+from apps.vessels.simulator import MMSI_BASE, FleetSimulator
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def _latency(samples_s, queries):
+    samples_ms = np.array(samples_s) * 1000.0
+    return {
+        'requests': len(samples_ms),
+        'p50_ms': round(float(np.percentile(samples_ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(samples_ms, 99)), 2),
+        'queries': queries,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate fleets of the given sizes and record ingest throughput, list/history latency and '
+        'query counts as JSON lines (runs in a rolled-back transaction)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000])
+        parser.add_argument('--ticks', type=int, default=5, help='Fleet-wide ingest ticks per size')
+        parser.add_argument('--tick-seconds', type=int, default=60, help='Simulated time between ticks')
+        parser.add_argument('--requests', type=int, default=30, help='Timed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=str(settings.BASE_DIR / 'benchmarks' / 'fleet.jsonl'))
+
+    def handle(self, *args, **options):
+        base = {
+            'recorded_at': timezone.now().isoformat(),
+            'commit': _commit(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': options['seed'],
+        }
+        records = []
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    records.append({**base, 'vessels': size, **self._run(size, options)})
+                    raise _Rollback
+            except _Rollback:
+                pass
+            self._print(records[-1])
+
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with output.open('a', encoding='utf-8') as fh:
+            for record in records:
+                fh.write(json.dumps(record) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Appended {len(records)} results to {output}'))
+
+    def _run(self, size, options):
+        ticks, tick_seconds = options['ticks'], options['tick_seconds']
+        start = timezone.now().replace(microsecond=0) - timedelta(seconds=ticks * tick_seconds)
+        simulator = FleetSimulator(size, seed=options['seed'], start=start)
+        simulator.populate()
+
+        ingest_s, ingest_queries, reports = 0.0, [], 0
+        for tick in range(ticks):
+            if tick:
+                simulator.step(tick_seconds)
+            batch = simulator.reports()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                ingest_reports(batch)
+                ingest_s += time.perf_counter() - started
+            ingest_queries.append(len(queries))
+            reports += len(batch)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='benchmark-fleet'))
+        rng = np.random.default_rng(options['seed'])
+        ids = list(Vessel.objects.filter(mmsi__gte=MMSI_BASE, mmsi__lt=MMSI_BASE + size).values_list('id', flat=True))
+        history_urls = [f'/api/vessels/{vessel_id}/history/' for vessel_id in rng.choice(ids, options['requests'])]
+        return {
+            'ingest': {
+                'reports': reports,
+                'seconds': round(ingest_s, 3),
+                'reports_per_second': round(reports / ingest_s, 1) if ingest_s else None,
+                'queries_per_tick': round(float(np.mean(ingest_queries)), 1),
+            },
+            'list': self._endpoint(client, ['/api/vessels/'] * options['requests']),
+            'list_map': self._endpoint(client, ['/api/vessels/?layout=map'] * options['requests']),
+            'history': self._endpoint(client, history_urls),
+        }
+
+    @staticmethod
+    def _endpoint(client, urls):
+        samples, queries = [], 0
+        for url in urls:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET {url} returned {response.status_code}')
+            queries = max(queries, len(captured))
+        return _latency(samples, queries)
+
+    def _print(self, record):
+        ingest = record['ingest']
+        self.stdout.write(
+            f"{record['vessels']:,} vessels: ingest {ingest['reports_per_second']:,.0f} reports/s "
+            f"({ingest['queries_per_tick']:.0f} queries/tick)"
+        )
+        for name in ('list', 'list_map', 'history'):
+            result = record[name]
+            self.stdout.write(
+                f"  {name:<9} p50 {result['p50_ms']:8.1f} ms   p99 {result['p99_ms']:8.1f} ms   "
+                f"{result['queries']} queries"
+            )
@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.vessels.models import Vessel
+from apps.vessels.representations import vessel_map_columns, vessel_rows
+from apps.vessels.serializers import VesselSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare VesselSerializer with the values_list list representations (runs in a rolled-back transaction)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+        parser.add_argument('--repeat', type=int, default=3, help='Best-of-N timing per renderer')
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        paths = {
+            'VesselSerializer': lambda qs: VesselSerializer(qs, many=True).data,
+            'vessel_rows': vessel_rows,
+            'vessel_map_columns': vessel_map_columns,
+        }
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self._populate(size)
+                    queryset = Vessel.objects.filter(external_api_source='benchmark')
+                    self.stdout.write(f'{size:,} vessels')
+                    for name, build in paths.items():
+                        build_s, render_s, payload = self._time(build, queryset, renderer, options['repeat'])
+                        self.stdout.write(
+                            f'  {name:<20} build {build_s * 1000:9.1f} ms   '
+                            f'render {render_s * 1000:9.1f} ms   payload {payload / 1024:10.1f} KiB'
+                        )
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _time(self, build, queryset, renderer, repeat):
+        best_build = best_render = float('inf')
+        payload = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = build(queryset.all())
+            built = time.perf_counter()
+            payload = len(renderer.render(data))
+            best_build = min(best_build, built - started)
+            best_render = min(best_render, time.perf_counter() - built)
+        return best_build, best_render, payload
+
+    def _populate(self, size):
+        now = timezone.now()
+        rng = random.Random(size)
+        base = 900_000_000
+        Vessel.objects.bulk_create([
+            Vessel(
+                imo=base + index,
+                mmsi=base + index,
+                name=f'BENCH {index}',
+                vessel_type='container',
+                flag='PA',
+                status='in_transit',
+                length=rng.uniform(50, 400),
+                beam=rng.uniform(10, 60),
+                draft=rng.uniform(5, 20),
+                last_position_lat=rng.uniform(-80, 80),
+                last_position_lon=rng.uniform(-180, 180),
+                last_speed=rng.uniform(0, 25),
+                last_heading=rng.uniform(0, 360),
+                last_position_update=now,
+                external_api_source='benchmark',
+            )
+            for index in range(size)
+        ], batch_size=5000)
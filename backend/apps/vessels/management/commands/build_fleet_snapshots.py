@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.vessels.snapshots import build_checkpoints
+
+
+class Command(BaseCommand):
+    help = 'Fold positions stored since the last run into the fleet snapshot checkpoints'
+
+    def handle(self, *args, **options):
+        stats = build_checkpoints()
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {stats['positions']} positions: {stats['created']} checkpoints created, "
+            f"{stats['patched']} patched with late reports"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.vessels.spacetime import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the space-time cell index from the stored VesselPosition history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        cells = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed position history into {cells} cells'))
@@ -0,0 +1,140 @@
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.vessels.ingestion import PositionReport, ingest_reports
+from apps.vessels.models import Vessel
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _rows(path):
+    """Yield dict rows from a CSV (with header) or NDJSON fixture."""
+    with _open(path) as fh:
+        if '.ndjson' in path or '.jsonl' in path:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(fh)
+
+
+def _optional_float(value):
+    return float(value) if value not in (None, '') else None
+
+
+def _parse_timestamp(value):
+    """The aware datetime of a recorded fix, or None when missing or unparsable."""
+    try:
+        timestamp = parse_datetime(value or '')
+    except ValueError:
+        return None
+    if timestamp is not None and timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, dt_timezone.utc)
+    return timestamp
+
+
+def _to_report(row):
+    """A PositionReport for the row, or None when it has no usable timestamp."""
+    timestamp = _parse_timestamp(row.get('timestamp'))
+    if timestamp is None:
+        # ingest_reports() would stamp it with the current time, which misplaces a recorded fix.
+        return None
+    return PositionReport(
+        mmsi=int(row['mmsi']),
+        latitude=float(row.get('latitude', row.get('lat'))),
+        longitude=float(row.get('longitude', row.get('lon'))),
+        speed=_optional_float(row.get('speed')),
+        heading=_optional_float(row.get('heading')),
+        timestamp=timestamp,
+        status=row.get('status') or None,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Replay recorded AIS fixture files (CSV or NDJSON, optionally gzipped) through the ingest pipeline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Reports handed to ingest_reports per call')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per write transaction')
+        parser.add_argument('--register-unknown', action='store_true',
+                            help='Create placeholder vessels for MMSIs not yet in the registry')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        totals = {'received': 0, 'stored': 0, 'vessels_updated': 0, 'bad_timestamp': 0, 'conflicts': 0}
+        unknown = set()
+        ingest_seconds = 0.0
+
+        for path in options['files']:
+            batch = []
+            for row in _rows(path):
+                report = _to_report(row)
+                if report is None:
+                    totals['bad_timestamp'] += 1
+                    continue
+                batch.append(report)
+                if len(batch) >= batch_size:
+                    ingest_seconds += self._ingest(batch, options, totals, unknown)
+                    batch = []
+            if batch:
+                ingest_seconds += self._ingest(batch, options, totals, unknown)
+
+        rate = totals['received'] / ingest_seconds if ingest_seconds else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {totals['received']} reports: stored {totals['stored']}, "
+            f"updated {totals['vessels_updated']} vessels in {ingest_seconds:.2f}s ({rate:,.0f} reports/sec)"
+        ))
+        if totals['bad_timestamp']:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {totals['bad_timestamp']} reports with a missing or unparsable timestamp"
+            ))
+        if totals['conflicts']:
+            self.stdout.write(self.style.WARNING(
+                f"Could not register {totals['conflicts']} unknown MMSIs: their placeholder IMO is taken"
+            ))
+        if unknown:
+            self.stdout.write(self.style.WARNING(f'Skipped reports for {len(unknown)} unknown MMSIs'))
+
+    def _ingest(self, batch, options, totals, unknown):
+        if options['register_unknown']:
+            totals['conflicts'] += self._register(batch)
+        started = time.perf_counter()
+        result = ingest_reports(batch, chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        totals['received'] += result.received
+        totals['stored'] += result.stored
+        totals['vessels_updated'] += result.vessels_updated
+        unknown |= result.unknown_mmsi
+        return elapsed
+
+    def _register(self, batch):
+        """Create placeholder vessels for unknown MMSIs; returns how many could not be created."""
+        mmsis = {report.mmsi for report in batch}
+        known = set(Vessel.objects.filter(mmsi__in=mmsis).values_list('mmsi', flat=True))
+        missing = mmsis - known
+        if not missing:
+            return 0
+        # Real IMO numbers are positive, so the negated MMSI is a placeholder no registered vessel holds.
+        Vessel.objects.bulk_create([
+            Vessel(mmsi=mmsi, imo=-mmsi, name=f'MMSI {mmsi}', vessel_type='other', flag='', external_api_source='replay')
+            for mmsi in missing
+        ], ignore_conflicts=True)
+        created = Vessel.objects.filter(mmsi__in=missing).count()
+        return len(missing) - created
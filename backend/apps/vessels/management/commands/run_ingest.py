@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.vessels.jobs import trigger
+
+
+class Command(BaseCommand):
+    help = 'Trigger ingest ticks on a fixed interval (a stand-in for celery beat on a single node)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None, help='Seconds between ticks')
+        parser.add_argument('--once', action='store_true', help='Trigger a single tick and exit')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'INGEST_INTERVAL_SECONDS', 10)
+        while True:
+            job, created = trigger()
+            state = 'started' if created else 'coalesced into'
+            self.stdout.write(f'Tick {state} ingest job {job.pk}')
+            if options['once']:
+                return
+            time.sleep(interval)
@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from config.routers import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into a separate replica file (a local stand-in for replication)'
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        replica = connections[REPLICA_ALIAS].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or replica['ENGINE'] != primary['ENGINE']:
+            raise CommandError('sync_replica only copies between SQLite files')
+        if str(primary['NAME']) == str(replica['NAME']):
+            self.stdout.write('The replica alias shares the primary file; nothing to copy.')
+            return
+        connections[REPLICA_ALIAS].close()
+        source = sqlite3.connect(primary['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            # The online backup API gives a consistent snapshot while writers keep going.
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f"Copied {primary['NAME']} to {replica['NAME']}"))
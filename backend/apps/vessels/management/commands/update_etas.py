@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.vessels.eta import update_etas
+
+
+class Command(BaseCommand):
+    help = 'Recompute ETAs of active vessel routes whose vessel has moved'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recompute every active route')
+
+    def handle(self, *args, **options):
+        stats = update_etas(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {stats['recomputed']} of {stats['routes']} active routes "
+            f"({stats['stopped']} stopped, {stats['unknown_port']} with unknown destination)"
+        ))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0002_vessel_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_position_id', models.BigIntegerField(default=0)),
+                ('archived_until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VesselPositionHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('avg_lat', models.FloatField()),
+                ('avg_lon', models.FloatField()),
+                ('avg_speed', models.FloatField(blank=True, null=True)),
+                ('max_speed', models.FloatField(blank=True, null=True)),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('vessel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_positions', to='vessels.vessel')),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'unique_together': {('vessel', 'hour')},
+            },
+        ),
+    ]
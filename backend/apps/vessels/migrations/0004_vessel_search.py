@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:07
+
+from django.db import migrations, models
+
+# SQLite only: an external-content FTS5 table over Vessel.name with the
+# trigram tokenizer, kept in sync by triggers so bulk writes are covered too.
+CREATE_SEARCH_SQL = [
+    """CREATE VIRTUAL TABLE vessels_vessel_search USING fts5(
+        name, content='vessels_vessel', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER vessels_vessel_search_ai AFTER INSERT ON vessels_vessel BEGIN
+        INSERT INTO vessels_vessel_search(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER vessels_vessel_search_ad AFTER DELETE ON vessels_vessel BEGIN
+        INSERT INTO vessels_vessel_search(vessels_vessel_search, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER vessels_vessel_search_au AFTER UPDATE OF name ON vessels_vessel BEGIN
+        INSERT INTO vessels_vessel_search(vessels_vessel_search, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO vessels_vessel_search(rowid, name) VALUES (new.id, new.name);
+    END""",
+    "INSERT INTO vessels_vessel_search(vessels_vessel_search) VALUES ('rebuild')",
+    # Per-trigram document counts, used to pick selective trigrams for fuzzy lookups.
+    "CREATE VIRTUAL TABLE vessels_vessel_search_vocab USING fts5vocab(vessels_vessel_search, 'row')",
+]
+
+DROP_SEARCH_SQL = [
+    'DROP TRIGGER IF EXISTS vessels_vessel_search_ai',
+    'DROP TRIGGER IF EXISTS vessels_vessel_search_ad',
+    'DROP TRIGGER IF EXISTS vessels_vessel_search_au',
+    'DROP TABLE IF EXISTS vessels_vessel_search_vocab',
+    'DROP TABLE IF EXISTS vessels_vessel_search',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0003_position_retention'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vessel',
+            index=models.Index(fields=['name'], name='vessels_ves_name_357b6d_idx'),
+        ),
+        migrations.RunPython(_run(CREATE_SEARCH_SQL), _run(DROP_SEARCH_SQL)),
+    ]
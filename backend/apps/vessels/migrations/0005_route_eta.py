@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0004_vessel_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vesselroute',
+            name='eta_computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vesselroute',
+            name='eta_lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vesselroute',
+            name='eta_lon',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0006_ingest_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PositionCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(max_length=12)),
+                ('bucket', models.DateTimeField()),
+                ('vessel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='position_cells', to='vessels.vessel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vessel', 'bucket'], name='vessels_pos_vessel__bcefc8_idx'), models.Index(fields=['bucket'], name='vessels_pos_bucket_ed7446_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cell', 'bucket', 'vessel'), name='unique_position_cell')],
+            },
+        ),
+    ]
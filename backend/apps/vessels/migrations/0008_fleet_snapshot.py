@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0007_position_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FleetSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(unique=True)),
+                ('vessels', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='vesselposition',
+            index=models.Index(fields=['timestamp'], name='vessels_ves_timesta_6b6658_idx'),
+        ),
+    ]
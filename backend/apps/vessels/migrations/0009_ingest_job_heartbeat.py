@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0008_fleet_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last progress of the running worker', null=True),
+        ),
+    ]
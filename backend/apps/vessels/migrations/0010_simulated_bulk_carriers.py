@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def cargo_to_bulk(apps, schema_editor):
+    # Simulated fleets used to register a 'cargo' type, which is not a Vessel.VESSEL_TYPES choice.
+    Vessel = apps.get_model('vessels', 'Vessel')
+    Vessel.objects.filter(external_api_source='simulator', vessel_type='cargo').update(vessel_type='bulk')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0009_ingest_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(cargo_to_bulk, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:09
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_speed_samples(apps, schema_editor):
+    # Older rollups did not count speed samples; every sample is the closest estimate.
+    VesselPositionHourly = apps.get_model('vessels', 'VesselPositionHourly')
+    VesselPositionHourly.objects.filter(avg_speed__isnull=False).update(speed_samples=F('samples'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0010_simulated_bulk_carriers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vesselpositionhourly',
+            name='speed_samples',
+            field=models.PositiveIntegerField(default=0, help_text='Samples with a speed, which avg_speed averages'),
+        ),
+        migrations.RunPython(backfill_speed_samples, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:23
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_baselines(apps, schema_editor):
+    # Existing subscriptions start from the vessel's current state.
+    Vessel = apps.get_model('vessels', 'Vessel')
+    VesselAlert = apps.get_model('vessels', 'VesselAlert')
+    vessel = Vessel.objects.filter(pk=OuterRef('vessel_id'))
+    VesselAlert.objects.update(**{
+        f'baseline_{name}': Subquery(vessel.values(column)[:1])
+        for name, column in (
+            ('lat', 'last_position_lat'), ('lon', 'last_position_lon'), ('speed', 'last_speed'),
+            ('heading', 'last_heading'), ('status', 'status'),
+        )
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0011_hourly_speed_samples'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vesselalert',
+            name='baseline_heading',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='vesselalert',
+            name='baseline_lat',
+            field=models.DecimalField(blank=True, decimal_places=8, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='vesselalert',
+            name='baseline_lon',
+            field=models.DecimalField(blank=True, decimal_places=8, max_digits=11, null=True),
+        ),
+        migrations.AddField(
+            model_name='vesselalert',
+            name='baseline_speed',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='vesselalert',
+            name='baseline_status',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(backfill_baselines, migrations.RunPython.noop),
+    ]
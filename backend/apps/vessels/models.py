@@ -42,6 +42,11 @@ class Vessel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name']),
+        ]
+
     def __str__(self):
         return f"{self.name} (IMO: {self.imo})"
 
@@ -58,6 +63,8 @@ class VesselPosition(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['vessel', '-timestamp']),
+            # Fleet-wide time windows (snapshots.py).
+            models.Index(fields=['timestamp']),
         ]
         ordering = ['-timestamp']
 
@@ -69,6 +76,10 @@ class VesselRoute(models.Model):
     eta = models.DateTimeField(blank=True, null=True)
     expected_duration = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True, help_text="Duration in hours")
     status = models.CharField(max_length=50, choices=(('active', 'Active'), ('completed', 'Completed'), ('cancelled', 'Cancelled')), default='active')
+    # Vessel position the current eta was computed from (see eta.update_etas).
+    eta_lat = models.FloatField(blank=True, null=True)
+    eta_lon = models.FloatField(blank=True, null=True)
+    eta_computed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -86,6 +97,97 @@ class VesselAlert(models.Model):
     alert_type = models.CharField(max_length=50, choices=ALERT_TYPES)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Vessel state the alert compares against: taken when subscribing and
+    # again each time the alert fires (apps.vessels.alerts).
+    baseline_lat = models.DecimalField(max_digits=10, decimal_places=8, blank=True, null=True)
+    baseline_lon = models.DecimalField(max_digits=11, decimal_places=8, blank=True, null=True)
+    baseline_speed = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    baseline_heading = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    baseline_status = models.CharField(max_length=50, blank=True, null=True)
 
     class Meta:
         unique_together = ('vessel', 'user', 'alert_type')
+
+class VesselTombstone(models.Model):
+    """Records deleted vessel ids so delta sync clients can drop them."""
+    vessel_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+class VesselPositionHourly(models.Model):
+    """Per-vessel hourly summary of positions rolled out of VesselPosition."""
+    vessel = models.ForeignKey(Vessel, on_delete=models.CASCADE, related_name='hourly_positions')
+    hour = models.DateTimeField()
+    samples = models.PositiveIntegerField(default=0)
+    avg_lat = models.FloatField()
+    avg_lon = models.FloatField()
+    avg_speed = models.FloatField(blank=True, null=True)
+    speed_samples = models.PositiveIntegerField(default=0, help_text="Samples with a speed, which avg_speed averages")
+    max_speed = models.FloatField(blank=True, null=True)
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('vessel', 'hour')
+        ordering = ['-hour']
+
+class RetentionCheckpoint(models.Model):
+    """How far (by VesselPosition id) a job walking the position table has got, e.g. retention."""
+    name = models.CharField(max_length=50, unique=True)
+    last_position_id = models.BigIntegerField(default=0)
+    archived_until = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class IngestJob(models.Model):
+    """One run of the background ingest pipeline (see jobs.py)."""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    pipeline = models.CharField(max_length=50, default='ais')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    requested_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True, help_text="Last progress of the running worker")
+    finished_at = models.DateTimeField(blank=True, null=True)
+    coalesced = models.PositiveIntegerField(default=0, help_text="Ticks folded into this run while it was pending")
+    batch_size = models.PositiveIntegerField(default=0)
+    received = models.PositiveIntegerField(default=0)
+    stored = models.PositiveIntegerField(default=0)
+    backlog = models.PositiveIntegerField(default=0, help_text="Reports left for the next run")
+    throughput = models.FloatField(blank=True, null=True, help_text="Reports per second")
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-requested_at']
+        constraints = [
+            # At most one queued or running job per pipeline: a second tick coalesces.
+            models.UniqueConstraint(
+                fields=['pipeline'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='one_active_ingest_job',
+            ),
+        ]
+
+class PositionCell(models.Model):
+    """A vessel was seen in geohash `cell` during the hour starting at `bucket` (see spacetime.py)."""
+    vessel = models.ForeignKey(Vessel, on_delete=models.CASCADE, related_name='position_cells')
+    cell = models.CharField(max_length=12)
+    bucket = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cell', 'bucket', 'vessel'], name='unique_position_cell'),
+        ]
+        indexes = [
+            models.Index(fields=['vessel', 'bucket']),
+            models.Index(fields=['bucket']),
+        ]
+
+class FleetSnapshot(models.Model):
+    """Every vessel's last fix as of `taken_at`, stored as compressed columns (see snapshots.py)."""
+    taken_at = models.DateTimeField(unique=True)
+    vessels = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
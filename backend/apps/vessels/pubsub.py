@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+
+class Subscription:
+    """
+    One subscriber's view of the position stream.
+
+    Pending updates are kept as a dict keyed by vessel id, so a consumer that
+    falls behind only ever holds the latest update per vessel: memory is
+    bounded by the number of vessels it watches, never by how far behind it is.
+    """
+
+    def __init__(self, bus, vessel_ids=None, bbox=None, loop=None):
+        self.bus = bus
+        self.vessel_ids = set(vessel_ids) if vessel_ids else None
+        self.bbox = tuple(bbox) if bbox else None
+        self.coalesced = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._loop = loop or asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    def matches(self, update):
+        if self.vessel_ids is not None and update['id'] not in self.vessel_ids:
+            return False
+        if self.bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = self.bbox
+            if not (min_lat <= update['lat'] <= max_lat):
+                return False
+            if min_lon <= max_lon:
+                return min_lon <= update['lon'] <= max_lon
+            # Box crossing the antimeridian
+            return update['lon'] >= min_lon or update['lon'] <= max_lon
+        return True
+
+    def offer(self, update):
+        with self._lock:
+            if update['id'] in self._pending:
+                self.coalesced += 1
+            self._pending[update['id']] = update
+            wake = len(self._pending) == 1
+        if wake:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # Subscriber's event loop already closed; it will be unsubscribed.
+                pass
+
+    async def get(self):
+        """Wait for and drain everything pending as one batch."""
+        while True:
+            await self._ready.wait()
+            with self._lock:
+                batch = list(self._pending.values())
+                self._pending.clear()
+                self._ready.clear()
+            if batch:
+                return batch
+
+    def update_filter(self, vessel_ids=None, bbox=None):
+        self.bus.unsubscribe(self)
+        self.vessel_ids = set(vessel_ids) if vessel_ids else None
+        self.bbox = tuple(bbox) if bbox else None
+        self.bus.attach(self)
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class PositionBus:
+    """
+    In-process pub/sub for live vessel updates.
+
+    Subscribers filtering by vessel id are indexed by id so a publish only
+    touches the subscribers that asked for that vessel; bounding-box and
+    unfiltered subscribers are checked per update. publish() never blocks and
+    is safe to call from any thread.
+    """
+
+    def __init__(self):
+        self._by_vessel = {}
+        self._scan = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, vessel_ids=None, bbox=None, loop=None):
+        subscription = Subscription(self, vessel_ids=vessel_ids, bbox=bbox, loop=loop)
+        self.attach(subscription)
+        return subscription
+
+    def attach(self, subscription):
+        with self._lock:
+            if subscription.vessel_ids:
+                for vessel_id in subscription.vessel_ids:
+                    self._by_vessel.setdefault(vessel_id, set()).add(subscription)
+            else:
+                self._scan.add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._scan.discard(subscription)
+            for vessel_id in subscription.vessel_ids or ():
+                subs = self._by_vessel.get(vessel_id)
+                if subs is not None:
+                    subs.discard(subscription)
+                    if not subs:
+                        del self._by_vessel[vessel_id]
+
+    def has_subscribers(self):
+        return bool(self._scan or self._by_vessel)
+
+    def publish(self, updates):
+        with self._lock:
+            for update in updates:
+                for subscription in self._by_vessel.get(update['id'], ()):
+                    if subscription.matches(update):
+                        subscription.offer(update)
+                for subscription in self._scan:
+                    if subscription.matches(update):
+                        subscription.offer(update)
+
+
+def vessel_update(vessel):
+    """Wire format for one live position, built from an ingested Vessel row."""
+    return {
+        'id': vessel.pk,
+        'mmsi': vessel.mmsi,
+        'lat': float(vessel.last_position_lat),
+        'lon': float(vessel.last_position_lon),
+        'speed': float(vessel.last_speed) if vessel.last_speed is not None else None,
+        'heading': float(vessel.last_heading) if vessel.last_heading is not None else None,
+        'status': vessel.status,
+        'timestamp': vessel.last_position_update.isoformat() if vessel.last_position_update else None,
+    }
+
+
+bus = PositionBus()
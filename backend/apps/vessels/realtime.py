@@ -0,0 +1,182 @@
+"""
+ASGI endpoints pushing live vessel positions from the in-process PositionBus.
+
+    ws://<host>/ws/vessels/?token=<access>&bbox=<minLat>,<minLon>,<maxLat>,<maxLon>&vessels=<id>,<id>
+    GET /api/vessels/stream/?token=<access>&bbox=...&vessels=...   (text/event-stream)
+
+Both accept the same filters; a WebSocket client can change them later by
+sending {"bbox": [...], "vessels": [...]}. Each message carries a batch of
+the latest position per vessel since the previous one. While anyone is
+subscribed, a background task polls the ingest relay so positions stored by
+other processes (the Celery worker) reach the bus too.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .pubsub import bus
+from .relay import relay, relay_interval
+
+WEBSOCKET_PATH = '/ws/vessels/'
+SSE_PATH = '/api/vessels/stream/'
+SSE_KEEPALIVE_SECONDS = 15
+
+_relay_task = None
+
+
+async def _poll_relay():
+    while bus.has_subscribers():
+        await sync_to_async(relay.poll)()
+        await asyncio.sleep(relay_interval())
+
+
+def _start_relay():
+    global _relay_task
+    if _relay_task is None or _relay_task.done():
+        _relay_task = asyncio.ensure_future(_poll_relay())
+
+
+def _authenticated(params, headers):
+    token = params.get('token', [None])[0]
+    authorization = headers.get(b'authorization', b'').decode()
+    if not token and authorization.startswith('Bearer '):
+        token = authorization[len('Bearer '):]
+    if not token:
+        return False
+    try:
+        AccessToken(token)
+    except TokenError:
+        return False
+    return True
+
+
+def _parse_filter(bbox=None, vessels=None):
+    if isinstance(bbox, str):
+        bbox = bbox.split(',')
+    if isinstance(vessels, str):
+        vessels = vessels.split(',')
+    if bbox:
+        bbox = [float(value) for value in bbox]
+        if len(bbox) != 4:
+            raise ValueError('bbox needs minLat,minLon,maxLat,maxLon')
+    vessel_ids = [int(value) for value in vessels if str(value).strip()] if vessels else None
+    return {'bbox': bbox or None, 'vessel_ids': vessel_ids or None}
+
+
+def _query_filter(params):
+    return _parse_filter(params.get('bbox', [None])[0], params.get('vessels', [None])[0])
+
+
+class RealtimeRouter:
+    """Serves the live position endpoints and hands everything else to Django."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get('path')
+        if scope['type'] == 'websocket':
+            if path == WEBSOCKET_PATH:
+                return await websocket_positions(scope, receive, send)
+            await receive()
+            return await send({'type': 'websocket.close', 'code': 4404})
+        if scope['type'] == 'http' and path == SSE_PATH:
+            return await sse_positions(scope, receive, send)
+        return await self.application(scope, receive, send)
+
+
+async def websocket_positions(scope, receive, send):
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    params = parse_qs(scope['query_string'].decode())
+    if not _authenticated(params, dict(scope['headers'])):
+        return await send({'type': 'websocket.close', 'code': 4401})
+    try:
+        subscription = bus.subscribe(**_query_filter(params))
+    except ValueError:
+        return await send({'type': 'websocket.close', 'code': 4400})
+    await send({'type': 'websocket.accept'})
+    _start_relay()
+
+    async def reader():
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+            if message.get('text'):
+                try:
+                    payload = json.loads(message['text'])
+                    subscription.update_filter(**_parse_filter(payload.get('bbox'), payload.get('vessels')))
+                except (ValueError, TypeError, AttributeError):
+                    await send({'type': 'websocket.send', 'text': json.dumps({'type': 'error', 'detail': 'Invalid filter'})})
+
+    async def writer():
+        while True:
+            batch = await subscription.get()
+            await send({'type': 'websocket.send', 'text': json.dumps({'type': 'positions', 'positions': batch})})
+
+    await _run_until_first_exits(reader(), writer(), subscription)
+
+
+async def sse_positions(scope, receive, send):
+    params = parse_qs(scope['query_string'].decode())
+    headers = dict(scope['headers'])
+    if scope['method'] != 'GET':
+        return await _plain_response(send, 405, b'Method not allowed')
+    if not _authenticated(params, headers):
+        return await _plain_response(send, 401, b'Authentication credentials were not provided or are invalid')
+    try:
+        subscription = bus.subscribe(**_query_filter(params))
+    except ValueError as exc:
+        return await _plain_response(send, 400, str(exc).encode())
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    _start_relay()
+
+    async def reader():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def writer():
+        while True:
+            try:
+                batch = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                continue
+            data = json.dumps(batch)
+            await send({'type': 'http.response.body', 'body': f'event: positions\ndata: {data}\n\n'.encode(), 'more_body': True})
+
+    await _run_until_first_exits(reader(), writer(), subscription)
+
+
+async def _run_until_first_exits(reader, writer, subscription):
+    tasks = [asyncio.ensure_future(reader), asyncio.ensure_future(writer)]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    finally:
+        subscription.close()
+        for task in tasks:
+            task.cancel()
+
+
+async def _plain_response(send, status, body):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,118 @@
+"""
+Ingest activity relayed to processes that did not ingest.
+
+positions_ingested only fires in the process that ran the chunk, which with
+INGEST_EXECUTOR = 'celery' (and always for the beat-scheduled tick) is a
+Celery worker. Web and ASGI processes keep their own state derived from it:
+the PositionBus behind the WebSocket/SSE endpoints, simplified tracks in
+their local cache, and the tile and live position indexes. Each process
+polls VesselPosition ids at most every INGEST_RELAY_INTERVAL seconds. Every
+vessel with positions past the last id it saw gets its cached tracks
+invalidated, and those whose last fix moved are pushed to the bus and the
+indexes. Vessels this process ingested itself were already handled by the
+signal receivers and are skipped.
+
+With LIVE_POSITION_WRITE_BEHIND the ingesting process stores positions at
+once but writes the Vessel rows only on its next flush. A vessel whose row
+has not caught up with its newest new position yet stays pending and is
+re-read on the following polls, however far the id watermark has moved,
+until the flush lands (or PENDING_TIMEOUT passes, e.g. after the ingesting
+process died before flushing).
+
+The ASGI app polls from a background task while it has subscribers; views
+that read the derived state poll before they do, so the first poll of a
+process comes before anything is cached and only has to note the current id.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max
+
+from .live import LOAD_FIELDS, live_positions
+from .models import Vessel, VesselPosition
+from .pubsub import bus, vessel_update
+from .simplify import invalidate_tracks
+from .tiles import tile_index
+
+DEFAULT_INTERVAL = 2
+VESSELS_PER_QUERY = 500
+PENDING_TIMEOUT = 60
+
+
+def relay_interval():
+    return getattr(settings, 'INGEST_RELAY_INTERVAL', DEFAULT_INTERVAL)
+
+
+class IngestRelay:
+    def __init__(self):
+        self._last_id = None
+        # {vessel id: last_position_update} of the fixes already handled here.
+        self._seen = {}
+        # {vessel id: (newest stored fix, monotonic time first seen)} of rows not flushed yet.
+        self._pending = {}
+        self._polled_at = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, vessels):
+        """Note vessels whose new fix this process handled itself."""
+        with self._lock:
+            for vessel in vessels:
+                self._seen[vessel.pk] = vessel.last_position_update
+
+    def poll(self, force=False):
+        """Catch up with positions stored since the last poll; returns how many vessels moved."""
+        if not force and time.monotonic() - self._polled_at < relay_interval():
+            return 0
+        if not self._lock.acquire(blocking=False):
+            # Another thread of this process is polling already.
+            return 0
+        try:
+            self._polled_at = time.monotonic()
+            high = VesselPosition.objects.aggregate(high=Max('id'))['high'] or 0
+            if self._last_id is None or high < self._last_id:
+                self._last_id = high
+                return 0
+            if high == self._last_id and not self._pending:
+                return 0
+            newest = dict(
+                VesselPosition.objects.filter(id__gt=self._last_id, id__lte=high)
+                .order_by().values('vessel_id').annotate(newest=Max('timestamp')).values_list('vessel_id', 'newest')
+            )
+            self._last_id = high
+            invalidate_tracks(list(newest))
+            now = time.monotonic()
+            for vessel_id, (fix, since) in list(self._pending.items()):
+                if now - since > PENDING_TIMEOUT:
+                    del self._pending[vessel_id]
+                elif vessel_id not in newest or fix > newest[vessel_id]:
+                    newest[vessel_id] = fix
+            moved = []
+            vessel_ids = list(newest)
+            for start in range(0, len(vessel_ids), VESSELS_PER_QUERY):
+                chunk = vessel_ids[start:start + VESSELS_PER_QUERY]
+                for vessel in Vessel.objects.filter(pk__in=chunk).only(*LOAD_FIELDS):
+                    fix = newest.pop(vessel.pk)
+                    if vessel.last_position_update is None or vessel.last_position_update < fix:
+                        # Not flushed yet (write-behind): look again next poll.
+                        self._pending[vessel.pk] = (fix, self._pending.get(vessel.pk, (None, now))[1])
+                        continue
+                    self._pending.pop(vessel.pk, None)
+                    if vessel.last_position_lat is None or vessel.last_position_update == self._seen.get(vessel.pk):
+                        continue
+                    self._seen[vessel.pk] = vessel.last_position_update
+                    moved.append(vessel)
+            # Whatever is left was deleted.
+            for vessel_id in newest:
+                self._pending.pop(vessel_id, None)
+        finally:
+            self._lock.release()
+
+        tile_index.update(moved)
+        live_positions.put(moved)
+        if bus.has_subscribers():
+            bus.publish([vessel_update(vessel) for vessel in moved])
+        return len(moved)
+
+
+relay = IngestRelay()
@@ -0,0 +1,62 @@
+"""
+Read-path representations of the fleet built straight from database rows.
+
+The list endpoint renders thousands of vessels per poll; going through
+VesselSerializer means a model instance, a Decimal and a DRF field call per
+column per row. These helpers read tuples with values_list, let the database
+round and cast DecimalFields to floats, and build the output dicts in one pass. The
+keys match VesselSerializer (fields='__all__'), with decimals as numbers.
+"""
+from django.db.models import DecimalField, FloatField
+from django.db.models.functions import Cast, Round
+
+from .history import format_time
+from .models import Vessel
+
+DATETIME_FIELDS = {
+    field.attname for field in Vessel._meta.concrete_fields if field.get_internal_type() == 'DateTimeField'
+}
+VESSEL_FIELDS = [field.attname for field in Vessel._meta.concrete_fields]
+
+MAP_COLUMNS = ('id', 'lat', 'lon', 'heading', 'speed')
+
+
+def _float_casts(names):
+    casts = {}
+    for name in names:
+        field = Vessel._meta.get_field(name)
+        if isinstance(field, DecimalField):
+            casts[f'_{name}'] = Cast(Round(name, field.decimal_places), FloatField())
+    return casts
+
+
+def _columns(queryset, names):
+    casts = _float_casts(names)
+    selected = [f'_{name}' if f'_{name}' in casts else name for name in names]
+    return queryset.annotate(**casts).values_list(*selected)
+
+
+def vessel_rows(queryset):
+    """The list endpoint payload for a Vessel queryset, as plain dicts."""
+    dates = [index for index, name in enumerate(VESSEL_FIELDS) if name in DATETIME_FIELDS]
+    rows = []
+    for values in _columns(queryset.order_by('pk'), VESSEL_FIELDS):
+        values = list(values)
+        for index in dates:
+            if values[index] is not None:
+                values[index] = format_time(values[index])
+        rows.append(dict(zip(VESSEL_FIELDS, values)))
+    return rows
+
+
+def vessel_map_columns(queryset):
+    """
+    Compact columnar payload for the map: parallel arrays of
+    id/lat/lon/heading/speed, only for vessels with a known position.
+    """
+    queryset = queryset.filter(last_position_lat__isnull=False, last_position_lon__isnull=False)
+    names = ['id', 'last_position_lat', 'last_position_lon', 'last_heading', 'last_speed']
+    rows = list(_columns(queryset.order_by('pk'), names))
+    if not rows:
+        return {column: [] for column in MAP_COLUMNS}
+    return {column: list(values) for column, values in zip(MAP_COLUMNS, zip(*rows))}
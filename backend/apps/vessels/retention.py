@@ -0,0 +1,208 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import archive, snapshots, spacetime
+from .models import RetentionCheckpoint, VesselPosition, VesselPositionHourly
+
+CHECKPOINT_NAME = 'positions'
+# Each batch commits on its own; ingest waits on the write lock for one batch at most.
+DEFAULT_BATCH_SIZE = 10_000
+HOUR_US = 3_600_000_000
+# Keep each DELETE, and each rollup lookup or write, well under SQLite's bound-parameter limit.
+DELETE_RANGES_PER_QUERY = 400
+VESSELS_PER_QUERY = 400
+ROLLUPS_PER_QUERY = 500
+
+
+def retention_window():
+    return timedelta(days=getattr(settings, 'POSITION_RETENTION_DAYS', 30))
+
+
+def run_retention(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Move VesselPosition rows older than the retention window out of the hot
+    table: roll them into VesselPositionHourly, write them to an archive
+    segment and delete them, one id-ordered batch per transaction.
+
+    The checkpoint is the id below which every position has been archived,
+    so a run walks the primary key from there instead of scanning by
+    timestamp. Rows still inside the window hold the checkpoint back but not
+    the scan: eligible rows after them are archived anyway, and the scan
+    stops at the first batch with nothing left to archive. Late reports that
+    land behind such a batch are archived, and merged into their hourly
+    rollup, once the rows ahead of them age out. Space-time cells
+    (spacetime.py) and fleet snapshot checkpoints (snapshots.py) older than
+    the window are dropped with them.
+    """
+    cutoff = (now or timezone.now()) - retention_window()
+    checkpoint, _ = RetentionCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    _remove_orphan_segments(checkpoint.last_position_id)
+    stats = {'archived': 0, 'segments': 0, 'rollups': 0}
+    scanned = checkpoint.last_position_id
+    blocked = False
+
+    while True:
+        rows = list(
+            VesselPosition.objects.filter(id__gt=scanned)
+            .order_by('id')
+            .values_list('id', 'vessel_id', 'latitude', 'longitude', 'speed', 'heading', 'timestamp')[:batch_size]
+        )
+        if not rows:
+            break
+        eligible = [row[6] < cutoff for row in rows]
+        if not any(eligible):
+            break
+
+        columns = _columns([row for row, keep in zip(rows, eligible) if keep])
+        archive.write_segment(columns)
+        ranges = _id_ranges(rows, eligible)
+        with transaction.atomic():
+            stats['rollups'] += _rollup(columns)
+            for start in range(0, len(ranges), DELETE_RANGES_PER_QUERY):
+                condition = Q(pk__in=[])
+                for first, last in ranges[start:start + DELETE_RANGES_PER_QUERY]:
+                    condition |= Q(id__gte=first, id__lte=last)
+                VesselPosition.objects.filter(condition).delete()
+            if not blocked:
+                prefix = eligible.index(False) if False in eligible else len(rows)
+                blocked = prefix < len(rows)
+                if prefix:
+                    checkpoint.last_position_id = rows[prefix - 1][0]
+            newest = archive.from_micros(columns['timestamp'].max())
+            if checkpoint.archived_until is None or newest > checkpoint.archived_until:
+                checkpoint.archived_until = newest
+            checkpoint.save()
+
+        stats['archived'] += len(columns['id'])
+        stats['segments'] += 1
+        scanned = rows[-1][0]
+        if len(rows) < batch_size:
+            break
+    stats['cells'] = spacetime.prune(cutoff)
+    stats['snapshots'] = snapshots.prune(cutoff)
+    return stats
+
+
+def _id_ranges(rows, eligible):
+    """(first_id, last_id) for each run of consecutive eligible rows."""
+    ranges = []
+    run_start = None
+    for index, (row, keep) in enumerate(zip(rows, eligible)):
+        if keep and run_start is None:
+            run_start = row[0]
+        if run_start is not None and (not keep or index == len(rows) - 1):
+            ranges.append((run_start, row[0] if keep else rows[index - 1][0]))
+            run_start = None
+    return ranges
+
+
+def _remove_orphan_segments(checkpoint_id):
+    """
+    Drop segments written by a run that crashed before committing: their
+    rows are still in the hot table.
+    """
+    for _, _, first_id, _, path in archive.segments():
+        if first_id > checkpoint_id and VesselPosition.objects.filter(id=first_id).exists():
+            archive.remove_segment(path)
+
+
+def _nullable(values):
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=float)
+
+
+def _columns(rows):
+    ids, vessel_ids, lats, lons, speeds, headings, timestamps = zip(*rows)
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'vessel_id': np.array(vessel_ids, dtype=np.int64),
+        'lat': np.array(lats, dtype=float),
+        'lon': np.array(lons, dtype=float),
+        'speed': _nullable(speeds),
+        'heading': _nullable(headings),
+        'timestamp': np.array([archive.to_micros(value) for value in timestamps], dtype=np.int64),
+    }
+
+
+def _rollup(columns):
+    """Fold a batch into the hourly summaries, merging with existing hours."""
+    hours = columns['timestamp'] // HOUR_US
+    keys, inverse = np.unique(np.stack([columns['vessel_id'], hours], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    size = len(keys)
+    samples = np.bincount(inverse, minlength=size)
+    sum_lat = np.bincount(inverse, weights=columns['lat'], minlength=size)
+    sum_lon = np.bincount(inverse, weights=columns['lon'], minlength=size)
+    has_speed = ~np.isnan(columns['speed'])
+    speed_samples = np.bincount(inverse[has_speed], minlength=size)
+    sum_speed = np.bincount(inverse[has_speed], weights=columns['speed'][has_speed], minlength=size)
+    max_speed = np.full(size, -np.inf)
+    np.maximum.at(max_speed, inverse[has_speed], columns['speed'][has_speed])
+    first_ts = np.full(size, np.iinfo(np.int64).max)
+    np.minimum.at(first_ts, inverse, columns['timestamp'])
+    last_ts = np.full(size, np.iinfo(np.int64).min)
+    np.maximum.at(last_ts, inverse, columns['timestamp'])
+
+    hour_starts = {hour: archive.from_micros(hour * HOUR_US) for hour in np.unique(keys[:, 1]).tolist()}
+    vessel_ids = np.unique(keys[:, 0]).tolist()
+    existing = {}
+    for start in range(0, len(vessel_ids), VESSELS_PER_QUERY):
+        existing.update(
+            ((row.vessel_id, row.hour), row)
+            for row in VesselPositionHourly.objects.filter(
+                vessel_id__in=vessel_ids[start:start + VESSELS_PER_QUERY],
+                hour__gte=min(hour_starts.values()),
+                hour__lte=max(hour_starts.values()),
+            )
+        )
+
+    created, updated = [], []
+    for index, (vessel_id, hour) in enumerate(keys.tolist()):
+        count = int(samples[index])
+        avg_speed = sum_speed[index] / speed_samples[index] if speed_samples[index] else None
+        peak = float(max_speed[index]) if speed_samples[index] else None
+        first = archive.from_micros(first_ts[index])
+        last = archive.from_micros(last_ts[index])
+        row = existing.get((vessel_id, hour_starts[hour]))
+        if row is None:
+            created.append(VesselPositionHourly(
+                vessel_id=vessel_id,
+                hour=hour_starts[hour],
+                samples=count,
+                avg_lat=sum_lat[index] / count,
+                avg_lon=sum_lon[index] / count,
+                avg_speed=avg_speed,
+                speed_samples=int(speed_samples[index]),
+                max_speed=peak,
+                first_timestamp=first,
+                last_timestamp=last,
+            ))
+            continue
+        # Late reports for an hour that was already rolled up.
+        total = row.samples + count
+        row.avg_lat = (row.avg_lat * row.samples + sum_lat[index]) / total
+        row.avg_lon = (row.avg_lon * row.samples + sum_lon[index]) / total
+        if avg_speed is not None:
+            speeds = row.speed_samples + int(speed_samples[index])
+            row.avg_speed = (
+                avg_speed if row.avg_speed is None
+                else (row.avg_speed * row.speed_samples + sum_speed[index]) / speeds
+            )
+            row.speed_samples = speeds
+            row.max_speed = peak if row.max_speed is None else max(row.max_speed, peak)
+        row.first_timestamp = min(row.first_timestamp, first)
+        row.last_timestamp = max(row.last_timestamp, last)
+        row.samples = total
+        updated.append(row)
+
+    VesselPositionHourly.objects.bulk_create(created, batch_size=ROLLUPS_PER_QUERY)
+    VesselPositionHourly.objects.bulk_update(
+        updated,
+        ['samples', 'avg_lat', 'avg_lon', 'avg_speed', 'speed_samples', 'max_speed', 'first_timestamp', 'last_timestamp'],
+        batch_size=ROLLUPS_PER_QUERY,
+    )
+    return len(created) + len(updated)
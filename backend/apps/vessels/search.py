@@ -0,0 +1,149 @@
+"""
+Vessel registry search: name prefixes, trigram substring/fuzzy names and
+exact or prefix IMO/MMSI.
+
+IMO and MMSI are fixed-width numbers, so a digit prefix is a range scan on
+their unique indexes. Name prefixes are a range scan on the name index.
+Substring and fuzzy name matches use the SQLite FTS5 trigram table created
+in migration 0004; other databases fall back to icontains.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Vessel
+
+SEARCH_TABLE = 'vessels_vessel_search'
+SEARCH_VOCAB_TABLE = 'vessels_vessel_search_vocab'
+IMO_DIGITS = 7
+MMSI_DIGITS = 9
+AUTOCOMPLETE_FIELDS = ('id', 'name', 'imo', 'mmsi', 'vessel_type', 'flag')
+DEFAULT_AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+# The trigram tokenizer cannot match anything shorter than this.
+MIN_TRIGRAM_LENGTH = 3
+
+_fts_tables = {}
+
+
+def _has_fts(alias):
+    if alias not in _fts_tables:
+        connection = connections[alias]
+        _fts_tables[alias] = (
+            connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[alias]
+
+
+def _digit_range(prefix, width):
+    """[low, high) of all width-digit numbers starting with prefix."""
+    if len(prefix) > width:
+        return None
+    scale = 10 ** (width - len(prefix))
+    return int(prefix) * scale, (int(prefix) + 1) * scale
+
+
+def _number_q(term):
+    condition = Q(pk__in=[])
+    if not term.isdigit():
+        return condition
+    for field, width in (('imo', IMO_DIGITS), ('mmsi', MMSI_DIGITS)):
+        bounds = _digit_range(term, width)
+        if bounds:
+            condition |= Q(**{f'{field}__gte': bounds[0], f'{field}__lt': bounds[1]})
+    return condition
+
+
+def _name_prefix_q(term):
+    # AIS names are conventionally upper case; also try the term as typed.
+    condition = Q(pk__in=[])
+    for variant in {term, term.upper()}:
+        condition |= Q(name__gte=variant, name__lt=variant + '\U0010ffff')
+    return condition
+
+
+def _phrase(term):
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def _match_sql():
+    return f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+
+
+def _fts_ids(alias, expression, limit, ranked=False):
+    sql = _match_sql() + (' ORDER BY rank' if ranked else '') + ' LIMIT %s'
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, [expression, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fuzzy_ids(alias, term, limit):
+    """
+    Names sharing the most trigrams with the term, ranked by bm25. Only the
+    rarer half of the term's trigrams is used as the candidate filter, so a
+    typo still matches while common trigrams ("ER ", "SEA") never pull in
+    most of the registry.
+    """
+    term = term.lower()
+    trigrams = list(dict.fromkeys(term[index:index + 3] for index in range(len(term) - 2)))
+    with connections[alias].cursor() as cursor:
+        placeholders = ', '.join(['%s'] * len(trigrams))
+        cursor.execute(f'SELECT term, doc FROM {SEARCH_VOCAB_TABLE} WHERE term IN ({placeholders})', trigrams)
+        counts = dict(cursor.fetchall())
+    present = sorted((trigram for trigram in trigrams if trigram in counts), key=counts.get)
+    if not present:
+        return []
+    selective = present[:max(2, len(present) // 2)]
+    return _fts_ids(alias, ' OR '.join(_phrase(trigram) for trigram in selective), limit, ranked=True)
+
+
+def filter_vessels(queryset, term):
+    """
+    Restrict a Vessel queryset to the `search` term (list endpoint): a
+    case-insensitive name substring, or an IMO/MMSI prefix. Terms too short
+    for the trigram table keep the plain icontains scan.
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+    if len(term) >= MIN_TRIGRAM_LENGTH and _has_fts(queryset.db):
+        name_q = Q(pk__in=RawSQL(_match_sql(), [_phrase(term)]))
+    else:
+        name_q = Q(name__icontains=term)
+    return queryset.filter(name_q | _number_q(term))
+
+
+def autocomplete(term, limit=DEFAULT_AUTOCOMPLETE_LIMIT):
+    """
+    Top `limit` vessels for a partial name, IMO or MMSI, best first: number
+    prefixes, then name prefixes, then name substrings, then fuzzy trigram
+    matches. Each stage is an index lookup capped at `limit` rows and later
+    stages only run while the result is still short.
+    """
+    term = term.strip()
+    if not term:
+        return []
+    vessels = Vessel.objects.all()
+    alias = vessels.db
+    ranked = {}
+
+    def take(ids):
+        for vessel_id in ids:
+            if len(ranked) >= limit:
+                return
+            ranked.setdefault(vessel_id, None)
+
+    if term.isdigit():
+        take(vessels.filter(_number_q(term)).order_by('imo').values_list('id', flat=True)[:limit])
+    if len(ranked) < limit:
+        take(vessels.filter(_name_prefix_q(term)).order_by('name').values_list('id', flat=True)[:limit])
+    if len(ranked) < limit and len(term) >= MIN_TRIGRAM_LENGTH:
+        if _has_fts(alias):
+            take(_fts_ids(alias, _phrase(term), limit))
+            if len(ranked) < limit:
+                take(_fuzzy_ids(alias, term, limit))
+        else:
+            take(vessels.filter(name__icontains=term).order_by('name').values_list('id', flat=True)[:limit])
+
+    rows = {row['id']: row for row in vessels.filter(pk__in=list(ranked)).values(*AUTOCOMPLETE_FIELDS)}
+    return [rows[vessel_id] for vessel_id in ranked if vessel_id in rows]
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Vessel, VesselPosition, VesselRoute, VesselAlert
+from .models import IngestJob, Vessel, VesselPosition, VesselRoute, VesselAlert
 
 class VesselPositionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,3 +10,13 @@ class VesselSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vessel
         fields = '__all__'
+
+class VesselRouteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VesselRoute
+        fields = ['origin_port', 'destination_port', 'departure_time', 'eta', 'expected_duration', 'status', 'eta_computed_at']
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestJob
+        exclude = ['pipeline']
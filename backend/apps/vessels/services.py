@@ -1,7 +1,8 @@
 import random
 from datetime import timedelta
 from django.utils import timezone
-from .models import Vessel, VesselPosition
+from .models import Vessel
+from .ingestion import PositionReport, ingest_reports
 
 class MockAISProvider:
     """
@@ -13,41 +14,32 @@ class MockAISProvider:
         self.center_lon = 139.6917
     
     def generate_positions(self):
+        return ingest_reports(self.generate_reports()).positions
+
+    def generate_reports(self):
         vessels = Vessel.objects.all()
         if not vessels.exists():
             self._create_mock_vessels()
             vessels = Vessel.objects.all()
             
-        updated_positions = []
-        for vessel in vessels:
+        now = timezone.now()
+        reports = []
+        for mmsi, lat, lon in vessels.values_list('mmsi', 'last_position_lat', 'last_position_lon'):
             # Simulate movement
-            lat_opt = float(vessel.last_position_lat) if vessel.last_position_lat else self.center_lat
-            lon_opt = float(vessel.last_position_lon) if vessel.last_position_lon else self.center_lon
+            lat_opt = float(lat) if lat else self.center_lat
+            lon_opt = float(lon) if lon else self.center_lon
             
             # Random small movement
-            new_lat = lat_opt + random.uniform(-0.01, 0.01)
-            new_lon = lon_opt + random.uniform(-0.01, 0.01)
-            
-            vessel.last_position_lat = new_lat
-            vessel.last_position_lon = new_lon
-            vessel.last_heading = random.uniform(0, 360)
-            vessel.last_speed = random.uniform(10, 20)
-            vessel.last_position_update = timezone.now()
-            vessel.status = 'in_transit'
-            vessel.save()
-            
-            # Record history
-            pos = VesselPosition.objects.create(
-                vessel=vessel,
-                latitude=new_lat,
-                longitude=new_lon,
-                speed=vessel.last_speed,
-                heading=vessel.last_heading,
-                timestamp=timezone.now()
-            )
-            updated_positions.append(pos)
+            reports.append(PositionReport(
+                mmsi=mmsi,
+                latitude=lat_opt + random.uniform(-0.01, 0.01),
+                longitude=lon_opt + random.uniform(-0.01, 0.01),
+                speed=random.uniform(10, 20),
+                heading=random.uniform(0, 360),
+                timestamp=now,
+            ))
             
-        return updated_positions
+        return reports
 
     def _create_mock_vessels(self):
         vessel_data = [
@@ -0,0 +1,85 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from apps.ports.models import Port
+
+from .alerts import BASELINE_FIELDS, current_baseline, engine as alert_engine
+from .geofence import geofence
+from .live import live_positions
+from .models import Vessel, VesselAlert, VesselTombstone
+from .pubsub import bus, vessel_update
+from .relay import relay
+from .simplify import invalidate_tracks
+from .spacetime import index_positions
+from .tiles import tile_index
+from .sync import prune_tombstones
+
+# Sent once per committed ingest chunk with `positions` (the new VesselPosition
+# rows), `vessels` (the Vessel rows whose last_* fields were advanced) and
+# `previous` ({vessel id: ingestion.VesselState} from before the chunk) and
+# `port_events` ([(vessel id, 'port_arrival'|'port_departure', message)]).
+positions_ingested = Signal()
+
+
+@receiver(post_delete, sender=Vessel)
+def record_vessel_tombstone(sender, instance, **kwargs):
+    VesselTombstone.objects.create(vessel_id=instance.pk)
+    prune_tombstones()
+    tile_index.remove(instance.pk)
+    live_positions.remove(instance.pk)
+
+
+@receiver(post_save, sender=Vessel)
+def move_saved_vessel_tile(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tile_index.update([instance])
+        live_positions.put([instance])
+
+
+@receiver(positions_ingested)
+def publish_live_positions(sender, vessels, **kwargs):
+    relay.observe(vessels)
+    if bus.has_subscribers():
+        bus.publish([vessel_update(vessel) for vessel in vessels])
+
+
+@receiver(positions_ingested)
+def invalidate_simplified_tracks(sender, positions, **kwargs):
+    invalidate_tracks({position.vessel_id for position in positions})
+
+
+@receiver(positions_ingested)
+def move_vessel_tiles(sender, vessels, **kwargs):
+    tile_index.update(vessels)
+
+
+@receiver(positions_ingested)
+def index_position_cells(sender, positions, **kwargs):
+    index_positions(positions)
+
+
+@receiver(positions_ingested)
+def evaluate_vessel_alerts(sender, vessels, port_events, **kwargs):
+    alert_engine.evaluate(vessels)
+    if port_events:
+        alert_engine.fire_events(port_events)
+
+
+@receiver(pre_save, sender=VesselAlert)
+def take_alert_baseline(sender, instance, raw=False, **kwargs):
+    if not raw and instance._state.adding:
+        vessel = Vessel.objects.get(pk=instance.vessel_id)
+        for name, value in zip(BASELINE_FIELDS, current_baseline(vessel)):
+            setattr(instance, name, value)
+
+
+@receiver(post_save, sender=VesselAlert)
+@receiver(post_delete, sender=VesselAlert)
+def invalidate_alert_rules(sender, **kwargs):
+    alert_engine.invalidate()
+
+
+@receiver(post_save, sender=Port)
+@receiver(post_delete, sender=Port)
+def invalidate_port_index(sender, **kwargs):
+    geofence.invalidate()
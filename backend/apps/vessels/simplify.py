@@ -0,0 +1,160 @@
+import math
+import time
+from datetime import datetime
+
+import numpy as np
+from django.core.cache import cache
+
+from . import archive
+from .history import POSITION_COLUMNS, format_time
+from .models import VesselPosition
+
+EARTH_RADIUS_M = 6371008.8
+# Web-mercator ground resolution at the equator for zoom 0, in metres/pixel.
+ZOOM0_METRES_PER_PIXEL = 156543.03392
+TRACK_CACHE_TIMEOUT = 60 * 60
+# Positions one simplification may read; longer ranges need narrowing with from/to.
+MAX_TRACK_POINTS = 500_000
+# Smallest Douglas-Peucker tolerance, in metres (zoom tolerances are rounded to 0.1 m).
+MIN_TOLERANCE = 0.1
+
+
+def zoom_tolerance(zoom, latitude=0.0, pixels=1.0):
+    """
+    Tolerance in metres matching `pixels` screen pixels at the given zoom,
+    rounded to 0.1 m so nearby viewports share cached tracks.
+    """
+    tolerance = pixels * ZOOM0_METRES_PER_PIXEL * math.cos(math.radians(latitude)) / (2 ** zoom)
+    return max(round(tolerance, 1), MIN_TOLERANCE)
+
+
+def _project(lat, lon):
+    """Local equirectangular projection to metres, good enough for one track."""
+    lat_r = np.radians(lat)
+    lon_r = np.radians(np.unwrap(lon, period=360.0))
+    x = EARTH_RADIUS_M * lon_r * np.cos(lat_r.mean())
+    y = EARTH_RADIUS_M * lat_r
+    return x, y
+
+
+def _segment_distances(x, y, start, end):
+    """Distance of every point strictly between start and end to that segment."""
+    px, py = x[start + 1:end], y[start + 1:end]
+    ax, ay, bx, by = x[start], y[start], x[end], y[end]
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    if length2 == 0.0:
+        return np.hypot(px - ax, py - ay)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / length2, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def douglas_peucker(lat, lon, tolerance):
+    """
+    Boolean mask of the points Douglas-Peucker keeps at `tolerance` metres.
+
+    The recursion is unrolled onto an explicit stack and each segment's
+    farthest point is found with one vectorized pass, so the Python-level
+    work is proportional to the number of points kept, not the input size.
+    """
+    count = len(lat)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if count < 3:
+        return keep
+    x, y = _project(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _segment_distances(x, y, start, end)
+        index = int(distances.argmax())
+        if distances[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def time_buckets(timestamps, bucket_seconds):
+    """Boolean mask keeping the first point of every `bucket_seconds` window."""
+    timestamps = np.asarray(timestamps, dtype=float)
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=bool)
+    buckets = np.floor_divide(timestamps, bucket_seconds)
+    keep = np.empty(len(buckets), dtype=bool)
+    keep[0] = True
+    np.not_equal(buckets[1:], buckets[:-1], out=keep[1:])
+    keep[-1] = True
+    return keep
+
+
+def _track_generation(vessel_id):
+    return cache.get(f'vessel-track-gen:{vessel_id}', 0)
+
+
+def invalidate_tracks(vessel_ids):
+    """Drop every cached simplified track for these vessels in one cache call."""
+    token = time.time_ns()
+    cache.set_many({f'vessel-track-gen:{vessel_id}': token for vessel_id in vessel_ids}, None)
+
+
+def simplified_track(vessel_id, method, parameter, start=None, end=None):
+    """
+    A vessel's track between start and end (oldest first), reduced with
+    Douglas-Peucker (`parameter` = tolerance in metres) or time buckets
+    (`parameter` = bucket size in seconds). Like history_page, the range
+    reads the archive segments as well as the hot table. Results are cached
+    per vessel and parameter until the next ingest touching that vessel.
+    """
+    key = 'vessel-track:{}:{}:{}:{}:{}:{}'.format(
+        vessel_id, _track_generation(vessel_id), method, parameter,
+        start.isoformat() if start else '', end.isoformat() if end else '',
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    queryset = VesselPosition.objects.filter(vessel_id=vessel_id)
+    if start:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end:
+        queryset = queryset.filter(timestamp__lte=end)
+    rows = list(queryset.order_by('timestamp', 'id').values_list(*POSITION_COLUMNS)[:MAX_TRACK_POINTS + 1])
+    archived_until = archive.newest_timestamp()
+    if archived_until and (start is None or start <= archived_until) and len(rows) <= MAX_TRACK_POINTS:
+        archived = archive.read_positions(vessel_id, start, end, limit=MAX_TRACK_POINTS + 1 - len(rows))
+        if archived:
+            rows = sorted(archived + rows, key=lambda row: (row[5], row[0]))
+    if len(rows) > MAX_TRACK_POINTS:
+        raise ValueError(f'More than {MAX_TRACK_POINTS} positions in range; narrow it with from/to')
+
+    count = len(rows)
+    if count:
+        # Transposed once; every column is then converted as a whole.
+        _, lats, lons, speeds, headings, timestamps = zip(*rows)
+        del rows
+        lat = np.array(lats, dtype=float)
+        lon = np.array(lons, dtype=float)
+        if method == 'dp':
+            keep = douglas_peucker(lat, lon, parameter)
+        else:
+            keep = time_buckets(np.fromiter(map(datetime.timestamp, timestamps), dtype=float, count=count), parameter)
+        indices = np.flatnonzero(keep).tolist()
+    else:
+        indices = []
+
+    points = [{
+        'latitude': float(lat[i]),
+        'longitude': float(lon[i]),
+        'speed': float(speeds[i]) if speeds[i] is not None else None,
+        'heading': float(headings[i]) if headings[i] is not None else None,
+        'timestamp': format_time(timestamps[i]),
+    } for i in indices]
+    track = {'input_points': count, 'output_points': len(points), 'results': points}
+    cache.set(key, track, TRACK_CACHE_TIMEOUT)
+    return track
@@ -0,0 +1,290 @@
+"""
+Seeded fleet simulator for load tests and benchmarks.
+
+Every vessel sails a great-circle leg between two ports at a cruise speed
+typical of its type, with a mean-reverting speed wobble and a little
+heading noise, then calls at the destination for a while before sailing on
+to another port. All randomness comes from one NumPy generator, so the same
+seed, start time and sequence of step() calls always yield the same reports.
+State is held in arrays and advanced in one vectorized pass per step, which
+keeps a 100k vessel tick in the tens of milliseconds.
+"""
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from apps.ports.models import Port
+
+from .geo import EARTH_RADIUS_NM, haversine_nm_array
+from .ingestion import PositionReport
+from .models import Vessel
+
+# (name, code, country, lat, lon)
+PORTS = [
+    ('Shanghai', 'CNSHA', 'China', 31.230, 121.490),
+    ('Singapore', 'SGSIN', 'Singapore', 1.264, 103.840),
+    ('Ningbo', 'CNNGB', 'China', 29.868, 121.544),
+    ('Shenzhen', 'CNSZX', 'China', 22.483, 113.883),
+    ('Busan', 'KRPUS', 'South Korea', 35.104, 129.040),
+    ('Hong Kong', 'HKHKG', 'Hong Kong', 22.287, 114.157),
+    ('Tokyo', 'JPTYO', 'Japan', 35.617, 139.783),
+    ('Yokohama', 'JPYOK', 'Japan', 35.450, 139.650),
+    ('Kaohsiung', 'TWKHH', 'Taiwan', 22.614, 120.283),
+    ('Port Klang', 'MYPKG', 'Malaysia', 3.000, 101.390),
+    ('Jebel Ali', 'AEJEA', 'United Arab Emirates', 25.011, 55.061),
+    ('Colombo', 'LKCMB', 'Sri Lanka', 6.950, 79.843),
+    ('Mumbai', 'INBOM', 'India', 18.950, 72.850),
+    ('Port Said', 'EGPSD', 'Egypt', 31.265, 32.301),
+    ('Piraeus', 'GRPIR', 'Greece', 37.942, 23.646),
+    ('Algeciras', 'ESALG', 'Spain', 36.130, -5.440),
+    ('Rotterdam', 'NLRTM', 'Netherlands', 51.950, 4.050),
+    ('Antwerp', 'BEANR', 'Belgium', 51.263, 4.400),
+    ('Hamburg', 'DEHAM', 'Germany', 53.540, 9.980),
+    ('Felixstowe', 'GBFXT', 'United Kingdom', 51.955, 1.320),
+    ('Le Havre', 'FRLEH', 'France', 49.483, 0.117),
+    ('Gdansk', 'PLGDN', 'Poland', 54.400, 18.667),
+    ('New York', 'USNYC', 'United States', 40.668, -74.045),
+    ('Savannah', 'USSAV', 'United States', 32.083, -81.083),
+    ('Houston', 'USHOU', 'United States', 29.730, -95.270),
+    ('Los Angeles', 'USLAX', 'United States', 33.733, -118.267),
+    ('Long Beach', 'USLGB', 'United States', 33.754, -118.216),
+    ('Seattle', 'USSEA', 'United States', 47.600, -122.340),
+    ('Vancouver', 'CAVAN', 'Canada', 49.290, -123.110),
+    ('Panama (Balboa)', 'PABLB', 'Panama', 8.950, -79.567),
+    ('Santos', 'BRSSZ', 'Brazil', -23.967, -46.300),
+    ('Buenos Aires', 'ARBUE', 'Argentina', -34.600, -58.367),
+    ('Durban', 'ZADUR', 'South Africa', -29.870, 31.030),
+    ('Cape Town', 'ZACPT', 'South Africa', -33.906, 18.434),
+    ('Lagos', 'NGLOS', 'Nigeria', 6.433, 3.400),
+    ('Sydney', 'AUSYD', 'Australia', -33.860, 151.200),
+    ('Melbourne', 'AUMEL', 'Australia', -37.830, 144.930),
+    ('Auckland', 'NZAKL', 'New Zealand', -36.843, 174.767),
+]
+
+# vessel_type: (share of fleet, min cruise knots, max cruise knots)
+VESSEL_PROFILES = {
+    'container': (0.30, 16.0, 22.0),
+    'bulk': (0.30, 10.0, 15.0),
+    'tanker': (0.25, 11.0, 15.0),
+    'passenger': (0.05, 15.0, 22.0),
+    'fishing': (0.05, 6.0, 10.0),
+    'other': (0.05, 8.0, 14.0),
+}
+FLAGS = ['PA', 'LR', 'MH', 'HK', 'SG', 'MT', 'BS', 'GR', 'CN', 'JP', 'NO', 'DK', 'DE', 'GB', 'US']
+
+SIMULATOR_SOURCE = 'simulator'
+MMSI_BASE = 201_000_000
+# Simulated identities sit in ranges no real or mock vessel uses.
+IMO_BASE = 1_000_000
+MAX_VESSELS = 999_999
+ARRIVAL_NM = 0.5
+MIN_DWELL_HOURS = 6.0
+MAX_DWELL_HOURS = 48.0
+INITIAL_IN_PORT = 0.2
+SPEED_REVERSION = 0.3
+SPEED_NOISE_KNOTS = 0.3
+HEADING_NOISE_DEGREES = 2.0
+# Large steps are split so arrivals and speed changes stay realistic.
+MAX_STEP_SECONDS = 600.0
+
+
+def _bearing(lat1, lon1, lat2, lon2):
+    """Initial great-circle bearing in radians, from arrays of degrees."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dlam = np.radians(lon2 - lon1)
+    y = np.sin(dlam) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlam)
+    return np.arctan2(y, x)
+
+
+def _travel(lat, lon, bearing, distance_nm):
+    """Point reached after distance_nm along the great circle at `bearing` (radians)."""
+    phi1, lam1 = np.radians(lat), np.radians(lon)
+    delta = distance_nm / EARTH_RADIUS_NM
+    phi2 = np.arcsin(np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(bearing))
+    lam2 = lam1 + np.arctan2(
+        np.sin(bearing) * np.sin(delta) * np.cos(phi1),
+        np.cos(delta) - np.sin(phi1) * np.sin(phi2),
+    )
+    return np.degrees(phi2), (np.degrees(lam2) + 540.0) % 360.0 - 180.0
+
+
+class FleetSimulator:
+    def __init__(self, vessels=1000, seed=0, start=None):
+        if not 1 <= vessels <= MAX_VESSELS:
+            raise ValueError(f'vessels must be between 1 and {MAX_VESSELS}')
+        self.size = vessels
+        self.seed = seed
+        self.clock = start or timezone.now().replace(second=0, microsecond=0)
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+
+        self.port_lat = np.array([port[3] for port in PORTS])
+        self.port_lon = np.array([port[4] for port in PORTS])
+        types = list(VESSEL_PROFILES)
+        shares = np.array([VESSEL_PROFILES[name][0] for name in types])
+        self.type_index = rng.choice(len(types), size=vessels, p=shares / shares.sum())
+        self.types = types
+        low = np.array([VESSEL_PROFILES[name][1] for name in types])[self.type_index]
+        high = np.array([VESSEL_PROFILES[name][2] for name in types])[self.type_index]
+        self.cruise = rng.uniform(low, high)
+        self.flag_index = rng.integers(len(FLAGS), size=vessels)
+
+        origin = rng.integers(len(PORTS), size=vessels)
+        self.destination = self._other_port(origin)
+        self.in_port = rng.random(vessels) < INITIAL_IN_PORT
+        leg = haversine_nm_array(
+            self.port_lat[origin], self.port_lon[origin],
+            self.port_lat[self.destination], self.port_lon[self.destination],
+        )
+        bearing = _bearing(
+            self.port_lat[origin], self.port_lon[origin],
+            self.port_lat[self.destination], self.port_lon[self.destination],
+        )
+        self.lat, self.lon = _travel(
+            self.port_lat[origin], self.port_lon[origin], bearing, leg * rng.random(vessels),
+        )
+        self.lat[self.in_port] = self.port_lat[origin][self.in_port]
+        self.lon[self.in_port] = self.port_lon[origin][self.in_port]
+        # A vessel in port is moored at its last destination.
+        self.destination = np.where(self.in_port, origin, self.destination)
+        self.speed = np.where(self.in_port, 0.0, self.cruise)
+        self.heading = (np.degrees(bearing) + 360.0) % 360.0
+        self.elapsed = 0.0
+        # Simulated seconds at which a vessel in port sails again.
+        self.dwell_until = np.where(
+            self.in_port, rng.uniform(0, MAX_DWELL_HOURS, vessels) * 3600.0, 0.0,
+        )
+
+    def _other_port(self, current):
+        """A random port different from `current` for each vessel."""
+        offset = self.rng.integers(1, len(PORTS), size=len(current))
+        return (current + offset) % len(PORTS)
+
+    @property
+    def mmsis(self):
+        return MMSI_BASE + np.arange(self.size)
+
+    def ensure_ports(self):
+        existing = set(Port.objects.filter(code__in=[port[1] for port in PORTS]).values_list('code', flat=True))
+        Port.objects.bulk_create([
+            Port(name=name, code=code, country=country, location_lat=lat, location_lon=lon)
+            for name, code, country, lat, lon in PORTS
+            if code not in existing
+        ])
+
+    def populate(self):
+        """Create the simulated ports and any simulated vessels not yet registered."""
+        self.ensure_ports()
+        mmsis = self.mmsis.tolist()
+        existing = set(
+            Vessel.objects.filter(mmsi__gte=MMSI_BASE, mmsi__lt=MMSI_BASE + self.size).values_list('mmsi', flat=True)
+        )
+        Vessel.objects.bulk_create([
+            Vessel(
+                imo=IMO_BASE + index,
+                mmsi=mmsi,
+                name=f'SIM {index:06d}',
+                vessel_type=self.types[self.type_index[index]],
+                flag=FLAGS[self.flag_index[index]],
+                status='in_port' if self.in_port[index] else 'in_transit',
+                external_api_source=SIMULATOR_SOURCE,
+            )
+            for index, mmsi in enumerate(mmsis)
+            if mmsi not in existing
+        ], batch_size=5000)
+
+    def step(self, seconds):
+        """Advance the fleet by `seconds` of simulated time."""
+        remaining = float(seconds)
+        while remaining > 0:
+            dt = min(remaining, MAX_STEP_SECONDS)
+            self._advance(dt)
+            remaining -= dt
+        self.clock += timedelta(seconds=seconds)
+
+    def _advance(self, dt):
+        rng = self.rng
+        self.elapsed += dt
+        sailing = ~self.in_port
+
+        noise = rng.normal(0.0, SPEED_NOISE_KNOTS, self.size)
+        self.speed = np.where(
+            sailing,
+            np.clip(self.speed + SPEED_REVERSION * (self.cruise - self.speed) + noise, 0.0, None),
+            0.0,
+        )
+        dest_lat = self.port_lat[self.destination]
+        dest_lon = self.port_lon[self.destination]
+        bearing = _bearing(self.lat, self.lon, dest_lat, dest_lon)
+        to_go = haversine_nm_array(self.lat, self.lon, dest_lat, dest_lon)
+        travelled = self.speed * dt / 3600.0
+        arriving = sailing & (to_go - travelled <= ARRIVAL_NM)
+        lat, lon = _travel(self.lat, self.lon, bearing, np.minimum(travelled, to_go))
+        self.lat = np.where(sailing, lat, self.lat)
+        self.lon = np.where(sailing, lon, self.lon)
+        heading_noise = rng.normal(0.0, HEADING_NOISE_DEGREES, self.size)
+        self.heading = np.where(sailing, (np.degrees(bearing) + heading_noise) % 360.0, self.heading)
+
+        # Port calls: arrive, dwell, then sail for a different port.
+        self.lat[arriving] = dest_lat[arriving]
+        self.lon[arriving] = dest_lon[arriving]
+        self.speed[arriving] = 0.0
+        self.in_port |= arriving
+        dwell = rng.uniform(MIN_DWELL_HOURS, MAX_DWELL_HOURS, self.size) * 3600.0
+        self.dwell_until = np.where(arriving, self.elapsed + dwell, self.dwell_until)
+        departing = self.in_port & ~arriving & (self.elapsed >= self.dwell_until)
+        next_port = self._other_port(self.destination)
+        self.destination = np.where(departing, next_port, self.destination)
+        self.in_port &= ~departing
+        self.speed[departing] = self.cruise[departing] * 0.5
+
+    def reports(self):
+        """PositionReports for the whole fleet at the current clock; status is left to the geofence."""
+        return [
+            PositionReport(
+                mmsi=mmsi,
+                latitude=lat,
+                longitude=lon,
+                speed=speed,
+                heading=heading,
+                timestamp=self.clock,
+            )
+            for mmsi, lat, lon, speed, heading in zip(
+                self.mmsis.tolist(),
+                np.round(self.lat, 6).tolist(),
+                np.round(self.lon, 6).tolist(),
+                np.round(self.speed, 1).tolist(),
+                np.round(self.heading, 1).tolist(),
+            )
+        ]
+
+
+class SimulatedAISProvider:
+    """
+    INGEST_SOURCE adapter: one simulator per process, sized by
+    SIMULATOR_VESSELS and seeded by SIMULATOR_SEED, advanced by the wall
+    clock time between polls.
+    """
+    _simulator = None
+    _polled_at = None
+    _lock = threading.Lock()
+
+    def generate_reports(self):
+        cls = type(self)
+        with cls._lock:
+            now = time.monotonic()
+            if cls._simulator is None:
+                cls._simulator = FleetSimulator(
+                    vessels=getattr(settings, 'SIMULATOR_VESSELS', 1000),
+                    seed=getattr(settings, 'SIMULATOR_SEED', 0),
+                )
+                cls._simulator.populate()
+            else:
+                cls._simulator.step(now - cls._polled_at)
+            cls._polled_at = now
+            return cls._simulator.reports()
@@ -0,0 +1,285 @@
+"""
+Point-in-time fleet snapshots ("where was everyone at T").
+
+A FleetSnapshot checkpoint holds every vessel's last fix as of `taken_at`,
+one every SNAPSHOT_INTERVAL on boundaries aligned to the epoch. Columns use
+archive's fixed-point encoding and are stored compressed. The fleet as of T
+is the last checkpoint at or before T plus the positions in (taken_at, T]:
+one row and at most one interval of history, read through the timestamp
+index, however long the history is.
+
+build_checkpoints() runs on a schedule. Each run extends the chain from the
+newest checkpoint, carrying every vessel forward until a VesselTombstone
+says it was deleted (readers drop those too), and reads past a
+RetentionCheckpoint watermark (by position id) for late reports. A late fix
+is merged into each checkpoint it is newer than, so every checkpoint
+reflects all positions up to the watermark. Readers merge positions past the
+watermark as well, which makes answers exact between runs too.
+
+Playback reconstructs the first frame that way. Later frames come from an
+ordered scan of the range, one SNAPSHOT_INTERVAL per query, and only list
+the vessels that moved since the previous frame. The range itself is capped
+at SNAPSHOT_PLAYBACK_MAX_SPAN.
+"""
+import io
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from . import archive
+from .history import format_time
+from .models import FleetSnapshot, RetentionCheckpoint, VesselPosition, VesselTombstone
+
+CHECKPOINT_NAME = 'snapshots'
+DEFAULT_INTERVAL = timedelta(hours=1)
+MAX_FRAMES = 500
+DEFAULT_PLAYBACK_MAX_SPAN = timedelta(days=1)
+FIELDS = ('id', 'vessel_id', 'timestamp', 'latitude', 'longitude', 'speed', 'heading')
+COLUMNS = ('id', 'vessel_id', 'timestamp', 'lat', 'lon', 'speed', 'heading')
+
+
+def snapshot_interval():
+    return getattr(settings, 'SNAPSHOT_INTERVAL', DEFAULT_INTERVAL)
+
+
+def _align(value, interval):
+    """Latest checkpoint boundary at or before `value`."""
+    step = interval // archive.MICROSECOND
+    return archive.from_micros(archive.to_micros(value) // step * step)
+
+
+def _empty():
+    return {
+        'id': np.zeros(0, dtype=np.int64),
+        'vessel_id': np.zeros(0, dtype=np.int64),
+        'timestamp': np.zeros(0, dtype=np.int64),
+        'lat': np.zeros(0),
+        'lon': np.zeros(0),
+        'speed': np.zeros(0),
+        'heading': np.zeros(0),
+    }
+
+
+def _nullable(values):
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=float)
+
+
+def _columns(rows):
+    if not rows:
+        return _empty()
+    ids, vessel_ids, timestamps, lats, lons, speeds, headings = zip(*rows)
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'vessel_id': np.array(vessel_ids, dtype=np.int64),
+        'timestamp': np.array([archive.to_micros(value) for value in timestamps], dtype=np.int64),
+        'lat': np.array(lats, dtype=float),
+        'lon': np.array(lons, dtype=float),
+        'speed': _nullable(speeds),
+        'heading': _nullable(headings),
+    }
+
+
+def _take(columns, index):
+    return {name: values[index] for name, values in columns.items()}
+
+
+def _latest(columns):
+    """Each vessel's newest fix (by timestamp, then id), in vessel_id order."""
+    if not len(columns['id']):
+        return columns
+    order = np.lexsort((columns['id'], columns['timestamp'], columns['vessel_id']))
+    vessel_ids = columns['vessel_id'][order]
+    last = np.append(vessel_ids[1:] != vessel_ids[:-1], True)
+    return _take(columns, order[last])
+
+
+def _drop_deleted(state, until):
+    """The state without the vessels deleted at or before `until`."""
+    if not len(state['id']):
+        return state
+    deleted = list(VesselTombstone.objects.filter(deleted_at__lte=until).values_list('vessel_id', flat=True))
+    if not deleted:
+        return state
+    return _take(state, ~np.isin(state['vessel_id'], deleted))
+
+
+def merge(state, columns):
+    """Advance a fleet state with position columns; fixes older than the state's are ignored."""
+    return _latest({name: np.concatenate([state[name], columns[name]]) for name in COLUMNS})
+
+
+def encode(state):
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        id=state['id'],
+        vessel_id=state['vessel_id'],
+        timestamp=state['timestamp'],
+        lat=np.rint(state['lat'] * archive.COORD_SCALE).astype(np.int32),
+        lon=np.rint(state['lon'] * archive.COORD_SCALE).astype(np.int32),
+        speed=archive._scaled_u16(state['speed']),
+        heading=archive._scaled_u16(state['heading']),
+    )
+    return buffer.getvalue()
+
+
+def _unscaled(values):
+    result = values.astype(float) / archive.VALUE_SCALE
+    result[values == archive.NULL_U16] = np.nan
+    return result
+
+
+def decode(data):
+    with np.load(io.BytesIO(bytes(data))) as stored:
+        return {
+            'id': stored['id'],
+            'vessel_id': stored['vessel_id'],
+            'timestamp': stored['timestamp'],
+            'lat': stored['lat'].astype(float) / archive.COORD_SCALE,
+            'lon': stored['lon'].astype(float) / archive.COORD_SCALE,
+            'speed': _unscaled(stored['speed']),
+            'heading': _unscaled(stored['heading']),
+        }
+
+
+def _positions(condition):
+    return _columns(list(VesselPosition.objects.filter(condition).order_by().values_list(*FIELDS)))
+
+
+def _watermark():
+    checkpoint = RetentionCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+    return checkpoint.last_position_id if checkpoint else 0
+
+
+def build_checkpoints(now=None, interval=None):
+    """
+    Fold positions stored since the last run into the checkpoint chain and
+    add checkpoints up to `now`; returns {'created', 'patched', 'positions'}.
+
+    Every patched or created checkpoint commits on its own, so ingest never
+    waits on more than one. The watermark only advances once the chain is
+    complete; a run that stops halfway leaves it behind, and the next run
+    merges the same late reports again, which changes nothing.
+    """
+    interval = interval or snapshot_interval()
+    now = now or timezone.now()
+    stats = {'created': 0, 'patched': 0, 'positions': 0}
+    cursor, _ = RetentionCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    high = VesselPosition.objects.aggregate(high=Max('id'))['high'] or 0
+    latest = FleetSnapshot.objects.order_by('-taken_at').first()
+
+    if latest is not None:
+        # Late reports: stored since the last run, but at or before a checkpoint.
+        late = _positions(Q(id__gt=cursor.last_position_id, id__lte=high, timestamp__lte=latest.taken_at))
+        stats['positions'] += len(late['id'])
+        if len(late['id']):
+            oldest = archive.from_micros(late['timestamp'].min())
+            pending = FleetSnapshot.objects.filter(taken_at__gte=oldest).order_by('taken_at').values_list('pk', flat=True)
+            for pk in list(pending):
+                with transaction.atomic():
+                    # Read inside the transaction: a concurrent run may have patched it since.
+                    snapshot = FleetSnapshot.objects.get(pk=pk)
+                    upto = late['timestamp'] <= archive.to_micros(snapshot.taken_at)
+                    state = _drop_deleted(merge(decode(snapshot.data), _take(late, upto)), snapshot.taken_at)
+                    snapshot.data, snapshot.vessels = encode(state), len(state['id'])
+                    snapshot.save(update_fields=['data', 'vessels', 'updated_at'])
+                stats['patched'] += 1
+                if snapshot.pk == latest.pk:
+                    latest = snapshot
+        state, taken_at = decode(latest.data), latest.taken_at
+    else:
+        first = VesselPosition.objects.filter(id__lte=high).aggregate(first=Min('timestamp'))['first']
+        state, taken_at = _empty(), None
+        if first is not None:
+            taken_at = _align(first, interval) - interval
+
+    while taken_at is not None and taken_at + interval <= now:
+        window = Q(id__lte=high, timestamp__gt=taken_at, timestamp__lte=taken_at + interval)
+        columns = _positions(window)
+        stats['positions'] += len(columns['id'])
+        taken_at += interval
+        state = _drop_deleted(merge(state, columns), taken_at)
+        with transaction.atomic():
+            if FleetSnapshot.objects.filter(taken_at__gte=taken_at).exists():
+                # A concurrent run got here first and carries the chain on.
+                break
+            FleetSnapshot.objects.create(taken_at=taken_at, vessels=len(state['id']), data=encode(state))
+        stats['created'] += 1
+
+    RetentionCheckpoint.objects.filter(name=CHECKPOINT_NAME, last_position_id__lt=high).update(
+        last_position_id=high, updated_at=timezone.now(),
+    )
+    return stats
+
+
+def fleet_state(at):
+    """Columns of every vessel's last fix at or before `at`; ValueError when no checkpoint covers it."""
+    # Read before the checkpoint, so a concurrent run can only add to what is merged.
+    watermark = _watermark()
+    snapshot = FleetSnapshot.objects.filter(taken_at__lte=at).order_by('-taken_at').first()
+    if snapshot is None:
+        raise ValueError(f'No fleet snapshot at or before {format_time(at)}')
+    window = Q(timestamp__gt=snapshot.taken_at, timestamp__lte=at) | Q(id__gt=watermark, timestamp__lte=snapshot.taken_at)
+    return _drop_deleted(merge(decode(snapshot.data), _positions(window)), at)
+
+
+def _frame(at, columns, full=False):
+    return {
+        'at': format_time(at),
+        'full': full,
+        'id': columns['vessel_id'].tolist(),
+        'lat': np.round(columns['lat'], 7).tolist(),
+        'lon': np.round(columns['lon'], 7).tolist(),
+        'speed': [None if value != value else value for value in columns['speed'].tolist()],
+        'heading': [None if value != value else value for value in columns['heading'].tolist()],
+        'timestamp': [format_time(archive.from_micros(value)) for value in columns['timestamp'].tolist()],
+    }
+
+
+def snapshot(at):
+    """The fleet as of `at`: parallel id/lat/lon/speed/heading/timestamp lists."""
+    return _frame(at, fleet_state(at), full=True)
+
+
+def playback(start, end, step):
+    """
+    Frames every `step` from `start` to `end`: the first holds the whole
+    fleet, each later one the vessels whose last fix changed since the
+    previous frame.
+    """
+    if step <= timedelta(0) or end < start:
+        raise ValueError('Playback needs from <= to and a positive step')
+    max_span = getattr(settings, 'SNAPSHOT_PLAYBACK_MAX_SPAN', DEFAULT_PLAYBACK_MAX_SPAN)
+    if end - start > max_span:
+        raise ValueError(f'Playback is limited to {max_span / timedelta(hours=1):g} hours; use a shorter range')
+    count = (end - start) // step + 1
+    if count > MAX_FRAMES:
+        raise ValueError(f'Playback is limited to {MAX_FRAMES} frames; use a larger step')
+    frames = [_frame(start, fleet_state(start), full=True)]
+    last = start + step * (count - 1)
+    interval = snapshot_interval()
+    # Latest fix per vessel since the previous frame, carried across scan windows.
+    pending = _empty()
+    index, scanned = 1, start
+    while index < count:
+        upto = min(scanned + interval, last)
+        moves = _positions(Q(timestamp__gt=scanned, timestamp__lte=upto))
+        moves = _take(moves, np.lexsort((moves['id'], moves['timestamp'])))
+        while index < count and start + step * index <= upto:
+            at = start + step * index
+            split = int(np.searchsorted(moves['timestamp'], archive.to_micros(at), side='right'))
+            frames.append(_frame(at, merge(pending, _take(moves, slice(0, split)))))
+            pending, moves = _empty(), _take(moves, slice(split, None))
+            index += 1
+        pending = merge(pending, moves)
+        scanned = upto
+    return frames
+
+
+def prune(before):
+    """Drop checkpoints taken before `before` (their deltas are leaving the hot table)."""
+    return FleetSnapshot.objects.filter(taken_at__lt=before).delete()[0]
@@ -0,0 +1,200 @@
+"""
+Space-time index over position history.
+
+Every stored position marks its vessel as present in one PositionCell: a
+geohash cell of CELL_PRECISION characters during one BUCKET-long time
+bucket. Rows only record presence, so indexing a batch is a single
+INSERT that ignores cells already known.
+
+A proximity question ("who was within r nm of here between t0 and t1")
+first collects the vessels seen in the cells covering the circle during
+the buckets overlapping the window, then checks only those vessels'
+positions exactly. Circles too large for a small set of cells are covered
+with shorter geohash prefixes, which match their stored child cells as
+key ranges.
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Q
+
+from .geo import haversine_nm_array
+from .models import PositionCell, VesselPosition
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+CELL_PRECISION = 4
+BUCKET = timedelta(hours=1)
+MAX_COVER_CELLS = 64
+VESSEL_QUERY_CHUNK = 500
+
+_alphabet = np.array(list(BASE32))
+
+
+def _bits(precision):
+    """(longitude bits, latitude bits) of a geohash of `precision` characters."""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def _indices(lat, lon, precision):
+    lon_bits, lat_bits = _bits(precision)
+    lat_index = np.floor((np.clip(lat, -90, 90) + 90) / 180 * (1 << lat_bits)).astype(np.int64)
+    lon_index = np.floor((np.mod(np.asarray(lon, dtype=float) + 180, 360)) / 360 * (1 << lon_bits)).astype(np.int64)
+    return np.minimum(lat_index, (1 << lat_bits) - 1), lon_index % (1 << lon_bits)
+
+
+def _encode_indices(lat_index, lon_index, precision):
+    lon_bits, lat_bits = _bits(precision)
+    code = np.zeros(len(lat_index), dtype=np.int64)
+    for bit in range(5 * precision):
+        # Geohash interleaves bits starting with longitude.
+        if bit % 2 == 0:
+            value = (lon_index >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            value = (lat_index >> (lat_bits - 1 - bit // 2)) & 1
+        code = (code << 1) | value
+    shifts = 5 * np.arange(precision - 1, -1, -1)
+    digits = (code[:, None] >> shifts) & 31
+    return [''.join(row) for row in _alphabet[digits].tolist()]
+
+
+def encode(lat, lon, precision=CELL_PRECISION):
+    """Geohash of each point in the lat/lon arrays."""
+    lat = np.atleast_1d(np.asarray(lat, dtype=float))
+    lon = np.atleast_1d(np.asarray(lon, dtype=float))
+    return _encode_indices(*_indices(lat, lon, precision), precision)
+
+
+def cover(lat, lon, radius_nm):
+    """
+    Geohash cells (at most CELL_PRECISION characters, at most
+    MAX_COVER_CELLS of them) whose union covers the circle.
+    """
+    lat_span = radius_nm / 60.0
+    south, north = max(lat - lat_span, -90.0), min(lat + lat_span, 90.0)
+    widest = max(abs(south), abs(north))
+    lon_span = 180.0 if widest >= 89.0 else radius_nm / (60.0 * math.cos(math.radians(widest)))
+    lon_span = min(lon_span, 180.0)
+    for precision in range(CELL_PRECISION, 0, -1):
+        lon_bits, lat_bits = _bits(precision)
+        lat_lo, lon_lo = _indices(np.array([south]), np.array([lon - lon_span]), precision)
+        lat_hi, lon_hi = _indices(np.array([north]), np.array([lon + lon_span]), precision)
+        rows = np.arange(lat_lo[0], lat_hi[0] + 1)
+        if lon_span >= 180.0:
+            columns = np.arange(1 << lon_bits)
+        else:
+            width = (int(lon_hi[0]) - int(lon_lo[0])) % (1 << lon_bits)
+            columns = (lon_lo[0] + np.arange(width + 1)) % (1 << lon_bits)
+        if len(rows) * len(columns) <= MAX_COVER_CELLS or precision == 1:
+            grid_rows, grid_columns = np.meshgrid(rows, columns, indexing='ij')
+            return _encode_indices(grid_rows.ravel(), grid_columns.ravel(), precision)
+
+
+def bucket_start(value):
+    """Start of the time bucket holding `value`."""
+    seconds = BUCKET.total_seconds()
+    return value - timedelta(seconds=value.timestamp() % seconds)
+
+
+def _cell_condition(cells):
+    exact = [cell for cell in cells if len(cell) == CELL_PRECISION]
+    condition = Q(cell__in=exact) if exact else Q(pk__in=[])
+    for prefix in cells:
+        if len(prefix) < CELL_PRECISION:
+            # '~' sorts after every geohash character.
+            condition |= Q(cell__gte=prefix, cell__lt=prefix + '~')
+    return condition
+
+
+def index_positions(positions):
+    """Record the cells the given VesselPositions fall in."""
+    if not positions:
+        return
+    cells = encode([float(p.latitude) for p in positions], [float(p.longitude) for p in positions])
+    keys = {
+        (position.vessel_id, cell, bucket_start(position.timestamp))
+        for position, cell in zip(positions, cells)
+    }
+    PositionCell.objects.bulk_create(
+        [PositionCell(vessel_id=vessel_id, cell=cell, bucket=bucket) for vessel_id, cell, bucket in keys],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild(batch_size=50_000):
+    """Index every VesselPosition from scratch; returns the number of cells."""
+    PositionCell.objects.all().delete()
+    last_id = 0
+    while True:
+        batch = list(
+            VesselPosition.objects.filter(id__gt=last_id).order_by('id')
+            .only('id', 'vessel_id', 'latitude', 'longitude', 'timestamp')[:batch_size]
+        )
+        if not batch:
+            break
+        index_positions(batch)
+        last_id = batch[-1].id
+    return PositionCell.objects.count()
+
+
+def prune(before):
+    """Drop cells whose bucket ended before `before`."""
+    return PositionCell.objects.filter(bucket__lt=bucket_start(before)).delete()[0]
+
+
+def vessels_in_cells(cells, start, end):
+    """Ids of vessels seen in any of `cells` during [start, end]."""
+    return set(
+        PositionCell.objects.filter(_cell_condition(cells), bucket__gte=bucket_start(start), bucket__lte=end)
+        .values_list('vessel_id', flat=True).distinct()
+    )
+
+
+def vessel_cells(vessel_id, start, end):
+    """{(cell, bucket start)} a vessel was seen in during [start, end]."""
+    return set(
+        PositionCell.objects.filter(vessel_id=vessel_id, bucket__gte=bucket_start(start), bucket__lte=end)
+        .values_list('cell', 'bucket')
+    )
+
+
+def closest_approaches(vessel_ids, lat, lon, radius_nm, start, end):
+    """
+    {vessel id: {'distance_nm', 'timestamp', 'first_seen', 'last_seen'}} for
+    vessels with a position within radius_nm of (lat, lon) during
+    [start, end]: the closest such fix and the span spent inside the radius.
+    """
+    lat_span = radius_nm / 60.0
+    rows = []
+    vessel_ids = sorted(vessel_ids)
+    for offset in range(0, len(vessel_ids), VESSEL_QUERY_CHUNK):
+        rows.extend(
+            VesselPosition.objects.filter(
+                vessel_id__in=vessel_ids[offset:offset + VESSEL_QUERY_CHUNK],
+                timestamp__gte=start,
+                timestamp__lte=end,
+                latitude__gte=lat - lat_span,
+                latitude__lte=lat + lat_span,
+            ).order_by().values_list('vessel_id', 'latitude', 'longitude', 'timestamp')
+        )
+    if not rows:
+        return {}
+
+    distance = haversine_nm_array(
+        lat, lon, np.array([float(row[1]) for row in rows]), np.array([float(row[2]) for row in rows]),
+    )
+    found = {}
+    for row, nm in zip(rows, distance.tolist()):
+        if nm > radius_nm:
+            continue
+        vessel_id, timestamp = row[0], row[3]
+        current = found.get(vessel_id)
+        if current is None:
+            found[vessel_id] = {'distance_nm': nm, 'timestamp': timestamp, 'first_seen': timestamp, 'last_seen': timestamp}
+            continue
+        if nm < current['distance_nm']:
+            current['distance_nm'], current['timestamp'] = nm, timestamp
+        current['first_seen'] = min(current['first_seen'], timestamp)
+        current['last_seen'] = max(current['last_seen'], timestamp)
+    return found
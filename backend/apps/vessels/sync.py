@@ -0,0 +1,82 @@
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags, quote_etag
+
+from .models import VesselTombstone
+
+# Deletions older than this are forgotten; clients holding an older cursor
+# get a full resync instead of a delta.
+TOMBSTONE_RETENTION = timedelta(days=7)
+# updated_at is stamped before the write commits, so a row can become visible
+# with a stamp older than a cursor already handed out. Deltas re-read this far
+# behind the cursor (clients upsert by id, so repeats are harmless); it has to
+# exceed the longest stamp-to-commit delay, i.e. the SQLite busy timeout.
+DEFAULT_CURSOR_OVERLAP = timedelta(seconds=30)
+
+
+def cursor_overlap():
+    return getattr(settings, 'SYNC_CURSOR_OVERLAP', DEFAULT_CURSOR_OVERLAP)
+
+
+def delta_since(cursor):
+    """Lower bound of the rows a delta after `cursor` has to include."""
+    return cursor - cursor_overlap()
+
+
+def fleet_etag(queryset, variant=''):
+    """
+    Cheap version tag for a (filtered) fleet queryset.
+
+    One aggregate over Vessel plus one over the tombstones tells whether
+    anything in the result could have changed, so unchanged polls never
+    serialize a whole row. A write committing late can leave the newest
+    updated_at as it was, so the (id, updated_at) pairs stamped within the
+    cursor overlap of it are part of the tag too.
+    """
+    queryset = queryset.order_by()
+    state = queryset.aggregate(latest=Max('updated_at'), total=Count('id'))
+    deleted = VesselTombstone.objects.aggregate(latest=Max('deleted_at'))['latest']
+    recent = ''
+    if state['latest'] is not None:
+        recent = hashlib.md5(repr(list(
+            queryset.filter(updated_at__gt=delta_since(state['latest'])).order_by('pk').values_list('pk', 'updated_at')
+        )).encode()).hexdigest()
+    raw = f"{state['latest']}|{state['total']}|{recent}|{deleted}|{variant}"
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest()), state['latest']
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+def parse_cursor(value):
+    # An unencoded '+' in the offset arrives as a space.
+    cursor = parse_datetime(value.replace(' ', '+')) if value else None
+    if cursor is None:
+        raise ValueError('Invalid since cursor')
+    if timezone.is_naive(cursor):
+        cursor = timezone.make_aware(cursor, dt_timezone.utc)
+    return cursor
+
+
+def format_cursor(value):
+    if value is None:
+        return None
+    return value.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def cursor_expired(cursor):
+    return cursor < timezone.now() - TOMBSTONE_RETENTION
+
+
+def prune_tombstones():
+    VesselTombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
@@ -0,0 +1,39 @@
+from celery import shared_task
+
+from .eta import update_etas
+from .jobs import claim_job, run_job
+from .retention import run_retention
+from .snapshots import build_checkpoints
+
+
+@shared_task
+def run_ingest_job(job_id):
+    job = run_job(job_id)
+    return job.status if job else None
+
+
+@shared_task
+def ingest_tick():
+    """Periodic entry point scheduled by django_celery_beat."""
+    job, created = claim_job()
+    if created:
+        run_job(job.pk)
+    return job.pk
+
+
+@shared_task
+def build_fleet_snapshots():
+    """Periodic entry point scheduled by django_celery_beat."""
+    return build_checkpoints()
+
+
+@shared_task
+def apply_retention():
+    """Periodic entry point scheduled by django_celery_beat."""
+    return run_retention()
+
+
+@shared_task
+def update_route_etas():
+    """Periodic entry point scheduled by django_celery_beat."""
+    return update_etas()
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.notifications.models import Notification
+from apps.vessels.alerts import engine
+from apps.vessels.ingestion import PositionReport, ingest_reports
+from apps.vessels.models import Vessel, VesselAlert
+
+MMSI = 220_000_000
+# 0.4 nm of latitude: below the 1 nm position_change threshold on its own.
+STEP = 0.4 / 60
+
+
+class AlertBaselineTests(TestCase):
+    def setUp(self):
+        engine.invalidate()
+        self.addCleanup(engine.invalidate)
+        self.vessel = Vessel.objects.create(
+            name='Drifter', imo=9_200_000, mmsi=MMSI, vessel_type='tanker', flag='PA',
+            last_position_lat=0, last_position_lon=0, last_speed=0, status='in_transit',
+        )
+        self.user = User.objects.create(username='alerts')
+        self.started = timezone.now()
+
+    def move(self, step):
+        ingest_reports([PositionReport(
+            mmsi=MMSI, latitude=step * STEP, longitude=0.0, speed=0.0, status='in_transit',
+            timestamp=self.started + timedelta(minutes=step),
+        )])
+        return Notification.objects.filter(user=self.user).count()
+
+    def test_small_fixes_fire_once_they_add_up_to_the_threshold(self):
+        VesselAlert.objects.create(vessel=self.vessel, user=self.user, alert_type='position_change')
+
+        self.assertEqual([self.move(step) for step in (1, 2, 3)], [0, 0, 1])
+        # The baseline moved to where the alert fired.
+        self.assertEqual([self.move(step) for step in (4, 5, 6)], [1, 1, 2])
+
+    def test_baseline_is_taken_when_subscribing(self):
+        self.move(2)
+        alert = VesselAlert.objects.create(vessel=self.vessel, user=self.user, alert_type='position_change')
+        self.assertAlmostEqual(float(alert.baseline_lat), 2 * STEP, places=6)
+
+        self.assertEqual([self.move(step) for step in (3, 4, 5)], [0, 0, 1])
@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.vessels import archive
+from apps.vessels.history import format_time
+from apps.vessels.models import Vessel, VesselPosition
+from apps.vessels.retention import retention_window, run_retention
+
+URL = '/api/vessels/export/'
+FIXES = 6
+ARCHIVED = 4
+
+
+class PositionExportTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(POSITION_ARCHIVE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='export'))
+        self.vessels = [
+            Vessel.objects.create(
+                name=f'V{index}', imo=9_500_000 + index, mmsi=250_000_000 + index, vessel_type='tanker', flag='PA',
+            )
+            for index in range(2)
+        ]
+        self.started = (timezone.now() - retention_window() - timedelta(days=1)).replace(microsecond=0)
+        VesselPosition.objects.bulk_create([
+            VesselPosition(
+                vessel=vessel, latitude=index, longitude=-index, speed=None if index == 0 else 10, heading=90,
+                timestamp=self.at(index),
+            )
+            for index in range(FIXES) for vessel in self.vessels
+        ])
+        run_retention(now=self.at(ARCHIVED - 0.5) + retention_window())
+
+    def at(self, hours):
+        return self.started + timedelta(hours=hours)
+
+    def export(self, **params):
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_export_reads_the_archive_before_the_hot_table(self):
+        self.assertEqual(VesselPosition.objects.count(), 2 * (FIXES - ARCHIVED))
+        self.assertEqual(len(archive.segments()), 1)
+
+        rows = list(csv.DictReader(io.StringIO(self.export(vessel=str(self.vessels[1].pk)).decode())))
+        self.assertEqual([row['timestamp'] for row in rows], [format_time(self.at(index)) for index in range(FIXES)])
+        self.assertEqual({row['mmsi'] for row in rows}, {str(self.vessels[1].mmsi)})
+        self.assertEqual([float(row['latitude']) for row in rows], [float(index) for index in range(FIXES)])
+        self.assertEqual(rows[0]['speed'], '')
+
+    def test_time_range_and_fleet_filters_apply_to_archived_rows(self):
+        window = {'from': format_time(self.at(2)), 'to': format_time(self.at(4))}
+        body = gzip.decompress(self.export(output='ndjson', compress='gzip', type='tanker', **window))
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(len(rows), 2 * 3)
+        self.assertEqual(sorted({row['timestamp'] for row in rows}), [format_time(self.at(index)) for index in (2, 3, 4)])
+        self.assertEqual({row['vessel_id'] for row in rows}, {vessel.pk for vessel in self.vessels})
+
+    def test_archived_rows_of_deleted_vessels_are_left_out(self):
+        self.vessels[0].delete()
+        rows = list(csv.DictReader(io.StringIO(self.export().decode())))
+        self.assertEqual(len(rows), FIXES)
+        self.assertEqual({row['vessel_id'] for row in rows}, {str(self.vessels[1].pk)})
@@ -0,0 +1,118 @@
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.vessels import archive
+from apps.vessels.history import history_page
+from apps.vessels.models import Vessel, VesselPosition
+from apps.vessels.retention import retention_window, run_retention
+from apps.vessels.simplify import simplified_track
+
+FIXES = 10
+ARCHIVED = 6
+
+
+class HistoryPagingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(POSITION_ARCHIVE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.vessel = Vessel.objects.create(name='Pager', imo=9_300_000, mmsi=230_000_000, vessel_type='bulk', flag='PA')
+        other = Vessel.objects.create(name='Other', imo=9_300_001, mmsi=230_000_001, vessel_type='bulk', flag='PA')
+        self.started = (timezone.now() - retention_window() - timedelta(days=1)).replace(microsecond=0)
+        VesselPosition.objects.bulk_create([
+            VesselPosition(
+                vessel=vessel, latitude=index, longitude=index, speed=10, timestamp=self.started + timedelta(hours=index),
+            )
+            for index in range(FIXES) for vessel in (self.vessel, other)
+        ])
+        # Everything up to and including fix ARCHIVED - 1 moves to the archive.
+        run_retention(now=self.started + timedelta(hours=ARCHIVED - 0.5) + retention_window())
+
+    def walk(self, limit, **bounds):
+        pages, cursor = [], None
+        while True:
+            page, cursor = history_page(self.vessel.pk, cursor=cursor, limit=limit, **bounds)
+            pages.append(page)
+            if cursor is None:
+                return pages
+
+    def test_pages_continue_from_the_hot_table_into_the_archive(self):
+        self.assertEqual(VesselPosition.objects.filter(vessel=self.vessel).count(), FIXES - ARCHIVED)
+        self.assertEqual(len(archive.segments()), 1)
+
+        pages = self.walk(limit=3)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+        latitudes = [row['latitude'] for page in pages for row in page]
+        self.assertEqual(latitudes, [float(index) for index in reversed(range(FIXES))])
+
+    def test_time_range_applies_to_archived_positions(self):
+        pages = self.walk(
+            limit=2, start=self.started + timedelta(hours=2), end=self.started + timedelta(hours=7),
+        )
+        latitudes = [row['latitude'] for page in pages for row in page]
+        self.assertEqual(latitudes, [7.0, 6.0, 5.0, 4.0, 3.0, 2.0])
+
+    def test_simplified_track_includes_archived_positions(self):
+        track = simplified_track(self.vessel.pk, 'time', 60)
+        self.assertEqual(track['input_points'], FIXES)
+        self.assertEqual([row['latitude'] for row in track['results']], [float(index) for index in range(FIXES)])
+
+        ranged = simplified_track(self.vessel.pk, 'dp', 1.0, start=self.started + timedelta(hours=4))
+        self.assertEqual(ranged['input_points'], FIXES - 4)
+        self.assertEqual(ranged['results'][0]['latitude'], 4.0)
+
+
+class ArchiveIndexTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(POSITION_ARCHIVE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(archive._indexes.clear)
+        self.started = timezone.now().replace(microsecond=0) - timedelta(days=90)
+        # Eight hourly segments of vessels 1 and 2; vessel 3 only in the first.
+        for hour in range(8):
+            vessel_ids = [1, 2, 3] if hour == 0 else [1, 2]
+            timestamp = archive.to_micros(self.started + timedelta(hours=hour))
+            archive.write_segment({
+                'vessel_id': np.array(vessel_ids),
+                'timestamp': np.full(len(vessel_ids), timestamp),
+                'id': np.arange(len(vessel_ids)) + 10 * hour,
+                'lat': np.full(len(vessel_ids), float(hour)),
+                'lon': np.zeros(len(vessel_ids)),
+                'speed': np.full(len(vessel_ids), np.nan),
+                'heading': np.zeros(len(vessel_ids)),
+            })
+
+    def test_page_opens_only_the_segments_it_needs(self):
+        with mock.patch('apps.vessels.archive._load', wraps=archive._load) as load:
+            rows = archive.read_positions(1, limit=2)
+        self.assertEqual([row[1] for row in rows], [7.0, 6.0])
+        self.assertEqual(load.call_count, 2)
+
+        with mock.patch('apps.vessels.archive._load', wraps=archive._load) as load:
+            rows = archive.read_positions(3, limit=2)
+        self.assertEqual([row[1] for row in rows], [0.0])
+        self.assertEqual(load.call_count, 1)
+
+    def test_segments_without_an_index_are_still_read(self):
+        for *_, path in archive.segments():
+            (path / archive.VESSEL_INDEX).unlink()
+        archive._indexes.clear()
+
+        rows = archive.read_positions(2, before=(self.started + timedelta(hours=5), 0), limit=3)
+        self.assertEqual([row[1] for row in rows], [4.0, 3.0, 2.0])
+        self.assertEqual([columns['vessel_id'].tolist() for columns in archive.scan_positions([3])], [[3]])
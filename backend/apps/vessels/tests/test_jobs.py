@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.vessels import jobs
+from apps.vessels.ingestion import PositionReport
+from apps.vessels.models import IngestJob, Vessel, VesselPosition
+
+FLEET = 10
+BATCH = 4
+
+
+class FleetSource:
+    """Every vessel of the test fleet reports once per poll, in the same order."""
+
+    def generate_reports(self):
+        now = timezone.now()
+        return [
+            PositionReport(mmsi=mmsi, latitude=1.0, longitude=2.0, speed=10.0, timestamp=now)
+            for mmsi in Vessel.objects.order_by('mmsi').values_list('mmsi', flat=True)
+        ]
+
+
+@override_settings(INGEST_SOURCE='apps.vessels.tests.test_jobs.FleetSource', INGEST_TICK_DEADLINE_MS=60_000)
+@mock.patch('apps.vessels.jobs.batch_size', return_value=BATCH)
+class IngestJobTests(TestCase):
+    def setUp(self):
+        jobs._backlog.clear()
+        self.addCleanup(jobs._backlog.clear)
+        for index in range(FLEET):
+            Vessel.objects.create(
+                name=f'V{index}', imo=9_000_000 + index, mmsi=200_000_000 + index, vessel_type='tanker', flag='PA',
+            )
+
+    def tick(self):
+        job, created = jobs.claim_job()
+        self.assertTrue(created)
+        return jobs.run_job(job.pk)
+
+    def test_fleet_larger_than_the_batch_is_drained_in_turn(self, batch_size):
+        stored = [set(), set(), set()]
+        for index in range(3):
+            seen = VesselPosition.objects.count()
+            job = self.tick()
+            self.assertEqual(job.status, 'succeeded')
+            self.assertEqual(job.stored, BATCH)
+            stored[index] = set(VesselPosition.objects.order_by('id')[seen:].values_list('vessel__mmsi', flat=True))
+
+        mmsis = [200_000_000 + index for index in range(FLEET)]
+        self.assertEqual(stored[0], set(mmsis[:4]))
+        self.assertEqual(stored[1], set(mmsis[4:8]))
+        # Left over from the last run first, then the fleet from the top again.
+        self.assertEqual(stored[2], set(mmsis[8:] + mmsis[:2]))
+        self.assertEqual(set(VesselPosition.objects.values_list('vessel__mmsi', flat=True)), set(mmsis))
+
+    def test_tick_coalesces_into_the_active_job(self, batch_size):
+        job, created = jobs.claim_job()
+        again, created_again = jobs.claim_job()
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual(IngestJob.objects.get(pk=job.pk).coalesced, 1)
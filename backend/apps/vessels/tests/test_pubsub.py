@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from apps.vessels.pubsub import PositionBus
+
+# Vessel id of the update that marks the end of a publisher's stream.
+DONE = -1
+
+
+def update(vessel_id, lat=0.0, lon=0.0, sequence=0):
+    return {'id': vessel_id, 'lat': lat, 'lon': lon, 'sequence': sequence}
+
+
+class PositionBusTests(SimpleTestCase):
+    """The in-process bus behind the WebSocket/SSE endpoints, driven without a server."""
+
+    async def test_subscriptions_only_receive_matching_updates(self):
+        bus = PositionBus()
+        by_vessel = bus.subscribe(vessel_ids=[1])
+        in_box = bus.subscribe(bbox=(0, 0, 10, 10))
+        across_antimeridian = bus.subscribe(bbox=(-10, 170, 10, -170))
+
+        bus.publish([update(1, 50, 50), update(2, 5, 5), update(3, 0, 175), update(4, 0, -175), update(5, 0, 0)])
+
+        self.assertEqual([item['id'] for item in await by_vessel.get()], [1])
+        self.assertEqual(sorted(item['id'] for item in await in_box.get()), [2, 5])
+        self.assertEqual(sorted(item['id'] for item in await across_antimeridian.get()), [3, 4])
+
+    async def test_slow_consumer_keeps_only_the_latest_update_per_vessel(self):
+        bus = PositionBus()
+        subscription = bus.subscribe()
+        for sequence in range(1000):
+            bus.publish([update(vessel_id, sequence=sequence) for vessel_id in (1, 2, 3)])
+
+        batch = await subscription.get()
+
+        self.assertEqual({item['id']: item['sequence'] for item in batch}, {1: 999, 2: 999, 3: 999})
+        self.assertEqual(subscription.coalesced, 3 * 999)
+
+    async def test_slow_consumer_ends_with_the_latest_update_from_a_publisher_thread(self):
+        bus = PositionBus()
+        subscription = bus.subscribe()
+        done = update(DONE)
+
+        def publisher():
+            for sequence in range(5000):
+                bus.publish([update(sequence % 10, sequence=sequence)])
+            # Published last, so the batch carrying it also carries (or follows) everything before it.
+            bus.publish([done])
+
+        thread = threading.Thread(target=publisher)
+        thread.start()
+        received, batches = {}, []
+        while DONE not in received:
+            batch = await asyncio.wait_for(subscription.get(), 5)
+            batches.append(len(batch))
+            received.update((item['id'], item['sequence']) for item in batch)
+            # A consumer much slower than the publisher.
+            await asyncio.sleep(0.01)
+        thread.join()
+
+        del received[DONE]
+        self.assertEqual(received, {vessel_id: 4990 + vessel_id for vessel_id in range(10)})
+        # However far behind, a batch holds at most one update per vessel.
+        self.assertLessEqual(max(batches), 11)
+
+    async def test_closed_subscription_stops_receiving(self):
+        bus = PositionBus()
+        subscription = bus.subscribe(vessel_ids=[1])
+        subscription.close()
+        bus.publish([update(1)])
+
+        self.assertFalse(bus.has_subscribers())
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(subscription.get(), 0.05)
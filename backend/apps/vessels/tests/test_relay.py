@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.vessels.live import LivePositionStore
+from apps.vessels.models import Vessel, VesselPosition
+from apps.vessels.relay import IngestRelay
+
+
+def create_vessels(count):
+    now = timezone.now()
+    return [
+        Vessel.objects.create(
+            name=f'V{index}', imo=9_700_000 + index, mmsi=270_000_000 + index, vessel_type='tanker', flag='PA',
+            status='in_transit', last_position_lat=0, last_position_lon=0, last_position_update=now,
+        )
+        for index in range(count)
+    ]
+
+
+class WriteBehindRelayTests(TestCase):
+    def test_vessel_is_pushed_once_its_row_is_flushed(self):
+        vessel, = create_vessels(1)
+        relay = IngestRelay()
+        relay.poll(force=True)
+
+        # Write-behind: the position is stored, the Vessel row waits for a flush.
+        fix = vessel.last_position_update + timedelta(minutes=1)
+        VesselPosition.objects.create(vessel=vessel, latitude=1, longitude=1, timestamp=fix)
+        self.assertEqual(relay.poll(force=True), 0)
+        self.assertEqual(relay.poll(force=True), 0)
+
+        Vessel.objects.filter(pk=vessel.pk).update(last_position_lat=1, last_position_lon=1, last_position_update=fix)
+        self.assertEqual(relay.poll(force=True), 1)
+        self.assertEqual(relay.poll(force=True), 0)
+
+    def test_late_fix_does_not_wait_for_a_flush(self):
+        vessel, = create_vessels(1)
+        relay = IngestRelay()
+        relay.poll(force=True)
+
+        late = vessel.last_position_update - timedelta(minutes=1)
+        VesselPosition.objects.create(vessel=vessel, latitude=1, longitude=1, timestamp=late)
+        # Moved as far as this process knows: it never saw the current fix.
+        self.assertEqual(relay.poll(force=True), 1)
+        VesselPosition.objects.create(vessel=vessel, latitude=1, longitude=1, timestamp=late)
+        self.assertEqual(relay.poll(force=True), 0)
+
+
+class LiveFlushTests(TestCase):
+    def test_flush_counts_rows_with_and_without_a_status_change(self):
+        moved, stopped = create_vessels(2)
+        store = LivePositionStore(ttl=3600)
+        store.load()
+
+        fix = timezone.now()
+        moved.last_position_lat, moved.last_position_update = 2, fix
+        stopped.last_position_lat, stopped.last_position_update, stopped.status = 3, fix, 'anchored'
+        store.put([moved, stopped], dirty=True)
+
+        self.assertEqual(store.flush(), 2)
+        self.assertEqual(
+            sorted(Vessel.objects.values_list('last_position_lat', 'status')),
+            [(2, 'in_transit'), (3, 'anchored')],
+        )
+        self.assertEqual(store.flush(), 0)
@@ -0,0 +1,38 @@
+import io
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.vessels.models import Vessel, VesselPosition
+
+FIXTURE = '''mmsi,latitude,longitude,speed,heading,timestamp,status
+205000001,1.0,2.0,10,90,2026-01-01T00:00:00Z,
+205000001,1.1,2.1,10,90,2026-01-01T00:10:00Z,
+205000002,3.0,4.0,,,not a time,
+205000002,3.1,4.1,,,,
+'''
+
+
+class ReplayCommandTests(TestCase):
+    def replay(self, *args):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'fixture.csv'
+        path.write_text(FIXTURE)
+        out = io.StringIO()
+        call_command('replay_ais', str(path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_reports_without_a_usable_timestamp_are_skipped_and_counted(self):
+        # A registered vessel whose IMO equals the unknown MMSI must not block its placeholder.
+        Vessel.objects.create(name='Taken', imo=205_000_001, mmsi=999_000_001, vessel_type='bulk', flag='PA')
+        output = self.replay('--register-unknown')
+
+        placeholder = Vessel.objects.get(mmsi=205_000_001)
+        self.assertEqual(placeholder.imo, -205_000_001)
+        self.assertEqual(VesselPosition.objects.filter(vessel=placeholder).count(), 2)
+        self.assertFalse(Vessel.objects.filter(mmsi=205_000_002).exists())
+        self.assertIn('Skipped 2 reports with a missing or unparsable timestamp', output)
+        self.assertNotIn('Could not register', output)
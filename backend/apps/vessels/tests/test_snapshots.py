@@ -0,0 +1,47 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.vessels import snapshots
+from apps.vessels.models import FleetSnapshot, Vessel, VesselPosition
+
+HOUR = timedelta(hours=1)
+
+
+class CheckpointBuildTests(TestCase):
+    def setUp(self):
+        self.vessel = Vessel.objects.create(name='Snap', imo=9_200_000, mmsi=220_000_000, vessel_type='bulk', flag='PA')
+        self.started = snapshots._align(timezone.now() - timedelta(days=1), HOUR)
+
+    def store(self, hours, lat):
+        return VesselPosition.objects.create(
+            vessel=self.vessel, latitude=lat, longitude=0, timestamp=self.started + hours * HOUR,
+        )
+
+    def latitudes(self):
+        return [
+            snapshots.decode(data)['lat'].tolist()
+            for data in FleetSnapshot.objects.order_by('taken_at').values_list('data', flat=True)
+        ]
+
+    def test_late_report_is_merged_again_after_an_interrupted_run(self):
+        self.store(0.5, 0)
+        stats = snapshots.build_checkpoints(now=self.started + 3 * HOUR, interval=HOUR)
+        self.assertEqual(stats['created'], 4)
+        self.assertEqual(self.latitudes(), [[], [0], [0], [0]])
+
+        late = self.store(1.5, 1)
+        patched = iter([snapshots.encode, mock.Mock(side_effect=RuntimeError('interrupted'))])
+        with mock.patch.object(snapshots, 'encode', side_effect=lambda state: next(patched)(state)):
+            with self.assertRaises(RuntimeError):
+                snapshots.build_checkpoints(now=self.started + 3 * HOUR, interval=HOUR)
+        # The first patch committed on its own; the watermark stayed behind.
+        self.assertEqual(self.latitudes(), [[], [0], [1], [0]])
+        self.assertLess(snapshots._watermark(), late.pk)
+
+        stats = snapshots.build_checkpoints(now=self.started + 4 * HOUR, interval=HOUR)
+        self.assertEqual((stats['patched'], stats['created']), (2, 1))
+        self.assertEqual(self.latitudes(), [[], [0], [1], [1], [1]])
+        self.assertEqual(snapshots._watermark(), late.pk)
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.vessels.models import Vessel
+from apps.vessels.sync import TOMBSTONE_RETENTION, format_cursor
+
+URL = '/api/vessels/'
+
+
+class VesselSyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='sync'))
+        self.vessels = [
+            Vessel.objects.create(
+                name=f'V{index}', imo=9_100_000 + index, mmsi=210_000_000 + index, vessel_type='tanker', flag='PA',
+            )
+            for index in range(3)
+        ]
+
+    def stamp(self, vessel, when):
+        Vessel.objects.filter(pk=vessel.pk).update(updated_at=when)
+
+    def test_unchanged_fleet_is_not_modified(self):
+        first = self.client.get(URL)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.data), 3)
+
+        again = self.client.get(URL, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['X-Sync-Cursor'], first['X-Sync-Cursor'])
+
+        self.vessels[0].name = 'Renamed'
+        self.vessels[0].save()
+        changed = self.client.get(URL, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+
+    def test_delta_carries_changes_and_deletions_since_the_cursor(self):
+        old = timezone.now() - timedelta(hours=1)
+        for vessel in self.vessels:
+            self.stamp(vessel, old)
+        # Outside the overlap re-read behind the cursor.
+        self.stamp(self.vessels[1], old - timedelta(hours=1))
+        cursor = self.client.get(URL)['X-Sync-Cursor']
+
+        self.vessels[0].name = 'Renamed'
+        self.vessels[0].save()
+        deleted = self.vessels[2].pk
+        self.vessels[2].delete()
+        delta = self.client.get(URL, {'since': cursor})
+
+        self.assertFalse(delta.data['full'])
+        self.assertEqual([row['id'] for row in delta.data['changed']], [self.vessels[0].pk])
+        self.assertEqual(delta.data['deleted'], [deleted])
+        self.assertEqual(delta.data['cursor'], delta['X-Sync-Cursor'])
+
+    def test_cursor_older_than_the_tombstones_gets_the_full_fleet(self):
+        expired = format_cursor(timezone.now() - TOMBSTONE_RETENTION - timedelta(hours=1))
+        delta = self.client.get(URL, {'since': expired})
+        self.assertTrue(delta.data['full'])
+        self.assertEqual(len(delta.data['changed']), 3)
+
+    def test_malformed_cursor_is_rejected(self):
+        self.assertEqual(self.client.get(URL, {'since': 'yesterday'}).status_code, 400)
+
+    def test_late_commit_behind_the_cursor_is_still_delivered(self):
+        now = timezone.now()
+        for vessel in self.vessels:
+            self.stamp(vessel, now - timedelta(minutes=5))
+        self.stamp(self.vessels[0], now)
+        first = self.client.get(URL, {'since': format_cursor(now - timedelta(minutes=1))})
+        self.assertEqual([row['id'] for row in first.data['changed']], [self.vessels[0].pk])
+
+        # A write stamped before that cursor was handed out, committed after it.
+        self.stamp(self.vessels[1], now - timedelta(seconds=5))
+        second = self.client.get(URL, {'since': first.data['cursor']})
+        self.assertIn(self.vessels[1].pk, [row['id'] for row in second.data['changed']])
+
+    def test_late_commit_changes_the_etag(self):
+        now = timezone.now()
+        for vessel in self.vessels:
+            self.stamp(vessel, now - timedelta(minutes=5))
+        self.stamp(self.vessels[0], now)
+        etag = self.client.get(URL)['ETag']
+
+        self.stamp(self.vessels[1], now - timedelta(seconds=5))
+        response = self.client.get(URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.vessels.models import Vessel
+from apps.vessels.tiles import INDIVIDUAL_ZOOM, MAX_LEVEL, TileIndex, clamp_viewport
+
+WORLD = (-90.0, -180.0, 90.0, 180.0)
+
+
+class ClampViewportTests(SimpleTestCase):
+    def test_low_zoom_viewport_is_left_alone(self):
+        self.assertEqual(clamp_viewport(*WORLD, zoom=2), WORLD)
+
+    def test_world_at_high_zoom_is_clamped_around_its_centre(self):
+        south, west, north, east = clamp_viewport(*WORLD, zoom=INDIVIDUAL_ZOOM)
+        self.assertAlmostEqual(east - west, 16 * 360 / 2 ** INDIVIDUAL_ZOOM)
+        self.assertAlmostEqual(west + east, 0.0)
+        self.assertAlmostEqual(south + north, 0.0)
+        self.assertLess(north, 1.0)
+
+    def test_clamped_viewport_may_cross_the_antimeridian(self):
+        south, west, north, east = clamp_viewport(0.0, 170.0, 0.5, -150.0, zoom=8)
+        self.assertGreater(west, east)
+        self.assertAlmostEqual(east + 360.0 - west, 16 * 360 / 2 ** 8)
+
+
+class TileQueryTests(TestCase):
+    def setUp(self):
+        for index in range(3):
+            Vessel.objects.create(
+                name=f'V{index}', imo=9_600_000 + index, mmsi=260_000_000 + index, vessel_type='tanker', flag='PA',
+                last_position_lat=0.001 * index, last_position_lon=0.001 * index,
+            )
+        Vessel.objects.create(
+            name='Far', imo=9_600_010, mmsi=260_000_010, vessel_type='tanker', flag='PA',
+            last_position_lat=40, last_position_lon=40,
+        )
+        self.index = TileIndex(ttl=3600)
+
+    def test_high_zoom_lists_vessels_of_the_clamped_viewport(self):
+        result = self.index.query(*WORLD, zoom=INDIVIDUAL_ZOOM)
+        self.assertEqual(sorted(vessel['name'] for vessel in result['vessels']), ['V0', 'V1', 'V2'])
+        self.assertEqual(result['clusters'], [])
+        self.assertLess(result['bbox'][2] - result['bbox'][0], 2.0)
+
+    @override_settings(TILE_MAX_VESSELS=2)
+    def test_too_many_vessels_are_clustered_instead(self):
+        result = self.index.query(-0.5, -0.5, 0.5, 0.5, zoom=INDIVIDUAL_ZOOM)
+        self.assertEqual(result['vessels'], [])
+        self.assertEqual(sum(cluster['count'] for cluster in result['clusters']), 3)
+        self.assertEqual({cluster['tile'][0] for cluster in result['clusters']}, {MAX_LEVEL})
@@ -0,0 +1,295 @@
+"""
+Zoom-aware clustering of the fleet for the map.
+
+Vessels are bucketed into a quadtree of web-mercator cells: level L splits
+the world into 2^L x 2^L cells, the same grid as map tiles at zoom L. Every
+level keeps {cell: [count, sum_lat, sum_lon]}, so a cluster's size and
+centroid are stored rather than computed, and the finest level also keeps
+the ids in each cell for vessel-level answers.
+
+A viewport at zoom z is answered from level z + CLUSTER_LEVEL_OFFSET (cells
+of 256 / 2^offset screen pixels), visiting only the cells inside it or,
+when that is fewer, the occupied cells of that level. From
+INDIVIDUAL_ZOOM on the vessels themselves are returned, unless the
+viewport holds more than TILE_MAX_VESSELS: then it is clustered at the
+finest level instead. A viewport wider or taller than MAX_VIEWPORT_TILES
+tiles at its zoom (more than any screen shows, e.g. the whole world at zoom
+12) is clamped to that many around its centre; the response's bbox is the
+viewport actually answered.
+
+Ingested chunks (positions_ingested) and Vessel saves move each vessel's
+contribution from its old cells to its new ones in place. Like the alert rule
+index, the whole index is reloaded from Vessel every TILE_INDEX_TTL
+seconds so ingests in other processes show up.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .history import format_time
+from .models import Vessel
+
+MAX_LEVEL = 14
+CLUSTER_LEVEL_OFFSET = 2
+INDIVIDUAL_ZOOM = 12
+DEFAULT_TTL = 60
+DEFAULT_MAX_VESSELS = 2000
+MAX_VIEWPORT_TILES = 16
+MAX_MERCATOR_LAT = 85.05112878
+POSITION_FIELDS = (
+    'id', 'last_position_lat', 'last_position_lon', 'name',
+    'status', 'last_speed', 'last_heading', 'last_position_update',
+)
+# Not loaded by ingest (see live.LAST_POSITION_FIELDS).
+STATIC_FIELDS = ('vessel_type', 'flag')
+
+
+def _unit(lat, lon):
+    """Web-mercator x, y in [0, 1) for arrays of degrees (y grows southwards, like tiles)."""
+    lat = np.clip(np.asarray(lat, dtype=float), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = np.mod(np.asarray(lon, dtype=float) + 180.0, 360.0) / 360.0
+    sin = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+    return np.clip(x, 0.0, np.nextafter(1.0, 0.0)), np.clip(y, 0.0, np.nextafter(1.0, 0.0))
+
+
+def _lat(y):
+    """Inverse of _unit's y for one value."""
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+
+def clamp_viewport(south, west, north, east, zoom):
+    """The viewport limited to MAX_VIEWPORT_TILES tiles each way around its centre."""
+    span = MAX_VIEWPORT_TILES / (1 << max(zoom, 0))
+    if span >= 1.0:
+        return south, west, north, east
+    width = (east - west) if west <= east else (east + 360.0 - west)
+    if width > span * 360.0:
+        centre = west + width / 2
+        west, east = centre - span * 180.0, centre + span * 180.0
+        # Back into [-180, 180]; a viewport crossing the antimeridian keeps west > east.
+        west, east = (west + 180.0) % 360.0 - 180.0, (east + 180.0) % 360.0 - 180.0
+    _, (top, bottom) = _unit([north, south], [0.0, 0.0])
+    if bottom - top > span:
+        centre = (top + bottom) / 2
+        north, south = _lat(centre - span / 2), _lat(centre + span / 2)
+    return south, west, north, east
+
+
+def max_vessels():
+    return getattr(settings, 'TILE_MAX_VESSELS', DEFAULT_MAX_VESSELS)
+
+
+def cell_keys(lat, lon, level):
+    """Quadtree cell of each point at `level`, as column * 2^level + row."""
+    x, y = _unit(lat, lon)
+    size = 1 << level
+    return (x * size).astype(np.int64) * size + (y * size).astype(np.int64)
+
+
+def _vessel_row(values, static=()):
+    vessel_id, lat, lon, name, status, speed, heading, updated = values
+    return {
+        'id': vessel_id,
+        'lat': float(lat),
+        'lon': float(lon),
+        'name': name,
+        **dict(zip(STATIC_FIELDS, static)),
+        'status': status,
+        'speed': float(speed) if speed is not None else None,
+        'heading': float(heading) if heading is not None else None,
+        'updated': format_time(updated) if updated is not None else None,
+    }
+
+
+class TileIndex:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._levels = None
+        self._members = None
+        self._vessels = None
+        self._keys = None
+        self._loaded_at = 0.0
+        self._lock = threading.RLock()
+
+    def invalidate(self):
+        with self._lock:
+            self._levels = None
+
+    def _ensure(self):
+        ttl = self.ttl or getattr(settings, 'TILE_INDEX_TTL', DEFAULT_TTL)
+        if self._levels is None or time.monotonic() - self._loaded_at > ttl:
+            rows = Vessel.objects.filter(
+                last_position_lat__isnull=False, last_position_lon__isnull=False,
+            ).values_list(*POSITION_FIELDS, *STATIC_FIELDS)
+            self._levels = [{} for _ in range(MAX_LEVEL + 1)]
+            self._members = {}
+            self._vessels = {}
+            self._keys = {}
+            static = len(STATIC_FIELDS)
+            self._place([_vessel_row(row[:-static], row[-static:]) for row in rows])
+            self._loaded_at = time.monotonic()
+
+    def _place(self, vessels):
+        """Add vessels (not currently indexed) to every level."""
+        if not vessels:
+            return
+        lat = np.array([vessel['lat'] for vessel in vessels])
+        lon = np.array([vessel['lon'] for vessel in vessels])
+        keys = np.stack([cell_keys(lat, lon, level) for level in range(MAX_LEVEL + 1)], axis=1).tolist()
+        for vessel, vessel_keys in zip(vessels, keys):
+            self._vessels[vessel['id']] = vessel
+            self._keys[vessel['id']] = vessel_keys
+            for level, key in enumerate(vessel_keys):
+                self._add(level, key, vessel['lat'], vessel['lon'], 1)
+            self._members.setdefault(vessel_keys[-1], set()).add(vessel['id'])
+
+    def _add(self, level, key, lat, lon, sign):
+        cells = self._levels[level]
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = [0, 0.0, 0.0]
+        cell[0] += sign
+        cell[1] += sign * lat
+        cell[2] += sign * lon
+        if cell[0] <= 0:
+            del cells[key]
+
+    def _remove(self, vessel_id):
+        vessel = self._vessels.pop(vessel_id, None)
+        if vessel is None:
+            return
+        vessel_keys = self._keys.pop(vessel_id)
+        for level, key in enumerate(vessel_keys):
+            self._add(level, key, vessel['lat'], vessel['lon'], -1)
+        members = self._members.get(vessel_keys[-1])
+        members.discard(vessel_id)
+        if not members:
+            del self._members[vessel_keys[-1]]
+
+    def update(self, vessels):
+        """Move saved or ingested Vessel instances to their new cells."""
+        with self._lock:
+            if self._levels is None:
+                return
+            placed = []
+            for vessel in vessels:
+                if vessel.last_position_lat is not None and vessel.last_position_lon is not None:
+                    placed.append(vessel)
+                else:
+                    self._remove(vessel.pk)
+            # Ingest loads vessels with only their position columns; the rest
+            # comes from the indexed row, or one query for vessels new here.
+            missing = [
+                vessel.pk for vessel in placed
+                if vessel.pk not in self._vessels and set(STATIC_FIELDS) & vessel.get_deferred_fields()
+            ]
+            loaded = dict(
+                (row[0], row[1:]) for row in Vessel.objects.filter(pk__in=missing).values_list('id', *STATIC_FIELDS)
+            ) if missing else {}
+            rows = []
+            for vessel in placed:
+                deferred = vessel.get_deferred_fields()
+                old = self._vessels.get(vessel.pk)
+                if old is not None:
+                    static = [old[name] if name in deferred else getattr(vessel, name) for name in STATIC_FIELDS]
+                elif vessel.pk in loaded:
+                    static = loaded[vessel.pk]
+                else:
+                    static = [getattr(vessel, name) for name in STATIC_FIELDS]
+                rows.append(_vessel_row([getattr(vessel, name) for name in POSITION_FIELDS], static))
+            if not rows:
+                return
+
+            lat = np.array([row['lat'] for row in rows])
+            lon = np.array([row['lon'] for row in rows])
+            keys = np.stack([cell_keys(lat, lon, level) for level in range(MAX_LEVEL + 1)], axis=1).tolist()
+            for row, new_keys in zip(rows, keys):
+                old = self._vessels.get(row['id'])
+                if old is None:
+                    self._place([row])
+                    continue
+                old_keys = self._keys[row['id']]
+                for level, (old_key, new_key) in enumerate(zip(old_keys, new_keys)):
+                    self._add(level, old_key, old['lat'], old['lon'], -1)
+                    self._add(level, new_key, row['lat'], row['lon'], 1)
+                if old_keys[-1] != new_keys[-1]:
+                    members = self._members[old_keys[-1]]
+                    members.discard(row['id'])
+                    if not members:
+                        del self._members[old_keys[-1]]
+                    self._members.setdefault(new_keys[-1], set()).add(row['id'])
+                self._vessels[row['id']] = row
+                self._keys[row['id']] = new_keys
+
+    def remove(self, vessel_id):
+        with self._lock:
+            if self._levels is not None:
+                self._remove(vessel_id)
+
+    @staticmethod
+    def _ranges(south, west, north, east, level):
+        """Column ranges and the row range covering the viewport at `level`."""
+        size = 1 << level
+        x, y = _unit([north, south], [west, east])
+        west_col, east_col = int(x[0] * size), int(x[1] * size)
+        if east - west >= 360.0:
+            columns = [(0, size - 1)]
+        elif x[0] <= x[1]:
+            columns = [(west_col, east_col)]
+        else:
+            # Viewport crossing the antimeridian (longitudes are wrapped by _unit).
+            columns = [(west_col, size - 1), (0, east_col)]
+        return columns, (int(y[0] * size), int(y[1] * size))
+
+    def _cells(self, level, cells, columns, rows):
+        size = 1 << level
+        area = sum(last - first + 1 for first, last in columns) * (rows[1] - rows[0] + 1)
+        if area <= len(cells):
+            for first, last in columns:
+                for column in range(first, last + 1):
+                    for row in range(rows[0], rows[1] + 1):
+                        key = column * size + row
+                        if key in cells:
+                            yield key, cells[key]
+            return
+        for key, cell in cells.items():
+            column, row = divmod(key, size)
+            if rows[0] <= row <= rows[1] and any(first <= column <= last for first, last in columns):
+                yield key, cell
+
+    def query(self, south, west, north, east, zoom):
+        """
+        Clusters (or, from INDIVIDUAL_ZOOM, vessels) inside the viewport at
+        the given map zoom.
+        """
+        south, west, north, east = clamp_viewport(south, west, north, east, zoom)
+        bbox = [round(value, 6) for value in (south, west, north, east)]
+        with self._lock:
+            self._ensure()
+            level = min(max(zoom, 0) + CLUSTER_LEVEL_OFFSET, MAX_LEVEL)
+            if zoom >= INDIVIDUAL_ZOOM:
+                columns, rows = self._ranges(south, west, north, east, MAX_LEVEL)
+                cells = list(self._cells(MAX_LEVEL, self._members, columns, rows))
+                if sum(len(members) for _, members in cells) <= max_vessels():
+                    vessels = [self._vessels[vessel_id] for _, members in cells for vessel_id in members]
+                    return {'zoom': zoom, 'bbox': bbox, 'clusters': [], 'vessels': vessels}
+
+            columns, rows = self._ranges(south, west, north, east, level)
+            size = 1 << level
+            clusters = []
+            for key, (count, sum_lat, sum_lon) in self._cells(level, self._levels[level], columns, rows):
+                column, row = divmod(key, size)
+                clusters.append({
+                    'lat': round(sum_lat / count, 6),
+                    'lon': round(sum_lon / count, 6),
+                    'count': count,
+                    'tile': [level, column, row],
+                })
+            return {'zoom': zoom, 'bbox': bbox, 'clusters': clusters, 'vessels': []}
+
+
+tile_index = TileIndex()
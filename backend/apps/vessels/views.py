@@ -1,10 +1,27 @@
+from datetime import timedelta
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import Vessel, VesselPosition
-from .serializers import VesselSerializer, VesselPositionSerializer
-from .services import MockAISProvider
+from rest_framework.utils.urls import replace_query_param
+from config.routers import replica_reads
+from apps.voyages.serializers import VoyageSerializer
+from .models import IngestJob, Vessel, VesselRoute, VesselTombstone
+from .serializers import IngestJobSerializer, VesselSerializer, VesselRouteSerializer
+from .representations import vessel_map_columns, vessel_rows
+from .search import DEFAULT_AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT, autocomplete, filter_vessels
+from .jobs import trigger as trigger_ingest
+from .export import FORMATS as EXPORT_FORMATS, export_positions, stream_export
+from .history import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, history_page, parse_time
+from .simplify import MIN_TOLERANCE, simplified_track, zoom_tolerance
+from .snapshots import playback, snapshot as fleet_snapshot
+from .tiles import tile_index
+from .live import live_positions
+from .relay import relay
+from .sync import cursor_expired, delta_since, etag_matches, fleet_etag, format_cursor, parse_cursor
 
 class VesselViewSet(viewsets.ModelViewSet):
     queryset = Vessel.objects.all()
@@ -22,20 +39,232 @@ class VesselViewSet(viewsets.ModelViewSet):
         if flag:
             queryset = queryset.filter(flag=flag)
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            queryset = filter_vessels(queryset, search)
             
         return queryset
 
+    @replica_reads
+    def list(self, request, *args, **kwargs):
+        """Full fleet, or only what changed after ?since=<cursor>; 304 when unchanged.
+
+        ?layout=map returns parallel id/lat/lon/heading/speed arrays instead.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, latest = fleet_etag(queryset, variant=request.query_params.urlencode())
+        headers = {'ETag': etag, 'X-Sync-Cursor': format_cursor(latest) or ''}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if request.query_params.get('layout') == 'map':
+            return Response(vessel_map_columns(queryset), headers=headers)
+
+        since = request.query_params.get('since', None)
+        if since is None:
+            return Response(vessel_rows(queryset), headers=headers)
+
+        try:
+            cursor = parse_cursor(since)
+        except ValueError as exc:
+            return Response({'since': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        full = cursor_expired(cursor)
+        # Rows re-read from behind the cursor are repeated; see sync.delta_since.
+        changed = queryset if full else queryset.filter(updated_at__gt=delta_since(cursor))
+        deleted = [] if full else list(
+            VesselTombstone.objects.filter(deleted_at__gt=delta_since(cursor)).values_list('vessel_id', flat=True)
+        )
+        return Response({
+            'cursor': format_cursor(latest) or since,
+            'full': full,
+            'changed': vessel_rows(changed),
+            'deleted': deleted,
+        }, headers=headers)
+
+    @action(detail=False, methods=['get'])
+    @replica_reads
+    def autocomplete(self, request):
+        """Top-k vessels matching a partial name, IMO or MMSI"""
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_AUTOCOMPLETE_LIMIT)), MAX_AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            return Response({'detail': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(autocomplete(request.query_params.get('q', ''), max(limit, 1)))
+
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """Clustered fleet for a map viewport: ?bbox=<south>,<west>,<north>,<east>&zoom=<z>
+
+        Returns counted clusters with their centroids, or the vessels themselves at high zoom.
+        """
+        params = request.query_params
+        try:
+            south, west, north, east = (float(value) for value in params.get('bbox', '-90,-180,90,180').split(','))
+            zoom = int(params.get('zoom', 2))
+            if south > north or not 0 <= zoom <= 30:
+                raise ValueError('Invalid viewport')
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        relay.poll()
+        return Response(tile_index.query(south, west, north, east, zoom))
+
+    @action(detail=False, methods=['get'])
+    def live(self, request):
+        """Current fleet state from the in-memory store, as parallel arrays
+
+        ?id=<id> or ?mmsi=<mmsi> returns that one vessel instead.
+        """
+        params = request.query_params
+        relay.poll()
+        if params.get('id') or params.get('mmsi'):
+            try:
+                vessel_id, mmsi = (int(params[name]) if params.get(name) else None for name in ('id', 'mmsi'))
+            except ValueError:
+                return Response({'detail': 'id and mmsi must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+            state = live_positions.get(vessel_id=vessel_id, mmsi=mmsi)
+            if state is None:
+                return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(state)
+        return Response(live_positions.columns())
+
+    @action(detail=False, methods=['get'])
+    @replica_reads
+    def snapshot(self, request):
+        """Every vessel's last fix as of ?at=<time>, as parallel arrays
+
+        ?from=&to=&step=<seconds> plays the range back instead: frames every step,
+        the first with the whole fleet and the rest with the vessels that moved.
+        """
+        params = request.query_params
+        try:
+            if params.get('from') or params.get('to'):
+                start, end = parse_time(params.get('from')), parse_time(params.get('to'))
+                if start is None or end is None:
+                    raise ValueError('Playback needs both from and to')
+                if not params.get('step', '60').isdigit():
+                    raise ValueError('step must be a whole number of seconds')
+                step = timedelta(seconds=int(params.get('step', 60)))
+                return Response({'frames': playback(start, end, step)})
+            return Response(fleet_snapshot(parse_time(params.get('at')) or timezone.now()))
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    @replica_reads
+    def export(self, request):
+        """Stream position history as ?output=csv|ndjson, optionally with ?compress=gzip.
+
+        ?vessel=<id>,<id> (or the list filters ?type=&flag=&search=) selects vessels,
+        ?from=&to= the time range.
+        """
+        params = request.query_params
+        # Not ?format=, which DRF reserves for picking a renderer.
+        export_format = params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'detail': "output must be 'csv' or 'ndjson'"}, status=status.HTTP_400_BAD_REQUEST)
+        compress = params.get('compress') == 'gzip'
+        try:
+            start, end = parse_time(params.get('from')), parse_time(params.get('to'))
+            vessel_ids = [int(value) for value in params['vessel'].split(',')] if params.get('vessel') else None
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        filtered = any(params.get(name) for name in ('type', 'flag', 'search'))
+        export = export_positions(vessel_ids, self.get_queryset() if filtered else None, start, end)
+        # Pin the alias now: the body is read after this view (and replica_reads) returned.
+        export = export.using(export.positions.db)
+        filename = f'positions.{export_format}' + ('.gz' if compress else '')
+        response = StreamingHttpResponse(
+            stream_export(export, export_format, compress),
+            content_type='application/gzip' if compress else EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=False, methods=['post'])
     def sync_mock_data(self, request):
-        """Force trigger mock data generation"""
-        provider = MockAISProvider()
-        positions = provider.generate_positions()
-        return Response({'message': f'Updated {len(positions)} vessels'}, status=status.HTTP_200_OK)
+        """Queue an ingest run, or coalesce into the one already pending"""
+        job, created = trigger_ingest()
+        return Response({
+            'job': IngestJobSerializer(job).data,
+            'coalesced': not created,
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'])
+    def ingest_status(self, request):
+        """Recent ingest jobs, newest first, or one job with ?job=<id>"""
+        jobs = IngestJob.objects.all()
+        job_id = request.query_params.get('job')
+        if job_id:
+            job = jobs.filter(pk=job_id).first() if job_id.isdigit() else None
+            if job is None:
+                return Response({'detail': 'Unknown job'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(IngestJobSerializer(job).data)
+        return Response(IngestJobSerializer(jobs[:20], many=True).data)
 
     @action(detail=True, methods=['get'])
+    @replica_reads
     def history(self, request, pk=None):
+        """Position history, newest first, with ?from=&to= and keyset ?cursor= paging.
+
+        ?simplify=dp&zoom=<z> (or &tolerance=<metres>) and ?simplify=time&bucket=<seconds>
+        return the whole range as a reduced track, oldest first.
+        """
         vessel = self.get_object()
-        positions = vessel.positions.all().order_by('-timestamp')[:100]
-        serializer = VesselPositionSerializer(positions, many=True)
-        return Response(serializer.data)
+        params = request.query_params
+        try:
+            start = parse_time(params.get('from'))
+            end = parse_time(params.get('to'))
+            if params.get('simplify'):
+                return self._simplified_history(vessel, params, start, end)
+            limit = min(int(params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError('limit must be positive')
+            results, next_cursor = history_page(vessel.pk, start, end, params.get('cursor'), limit)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({'next': next_url, 'results': results})
+
+    @action(detail=True, methods=['get'])
+    def route(self, request, pk=None):
+        """Current route with its last computed ETA (see eta.update_etas)"""
+        route = VesselRoute.objects.filter(vessel_id=pk).first()
+        if route is None:
+            return Response({'detail': 'No route for this vessel'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(VesselRouteSerializer(route).data)
+
+    @action(detail=True, methods=['get'])
+    @replica_reads
+    def voyages(self, request, pk=None):
+        """Voyages segmented from the position history, newest first"""
+        voyages = self.get_object().voyages.order_by('-departure')[:50]
+        return Response(VoyageSerializer(voyages, many=True).data)
+
+    def _simplified_history(self, vessel, params, start, end):
+        method = params.get('simplify')
+        if method == 'dp':
+            if params.get('tolerance'):
+                parameter = float(params['tolerance'])
+                if parameter > 0:
+                    parameter = max(round(parameter, 1), MIN_TOLERANCE)
+            else:
+                latitude = float(vessel.last_position_lat or 0)
+                parameter = zoom_tolerance(int(params.get('zoom', 12)), latitude)
+        elif method == 'time':
+            parameter = int(params.get('bucket', 300))
+        else:
+            raise ValueError("simplify must be 'dp' or 'time'")
+        if parameter <= 0:
+            raise ValueError('Simplification parameter must be positive')
+        relay.poll()
+        track = simplified_track(vessel.pk, method, parameter, start, end)
+        return Response({
+            'next': None,
+            'simplify': method,
+            'parameter': parameter,
+            'input_points': track['input_points'],
+            'results': track['results'],
+        })
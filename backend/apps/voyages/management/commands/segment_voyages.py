@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.voyages.segmentation import DEFAULT_BATCH_SIZE, segment_voyages
+
+
+class Command(BaseCommand):
+    help = 'Fold positions stored since the last run into Voyage records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        stats = segment_voyages(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['positions']} positions of {stats['vessels']} vessels: "
+            f"{stats['opened']} voyages opened, {stats['closed']} closed, "
+            f"{stats['replayed']} vessels replayed for late reports"
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Voyage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vessel_name', models.CharField(max_length=255)),
+                ('departure', models.DateTimeField()),
+                ('arrival', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_vessels(apps, schema_editor):
+    """Attach existing voyages to the vessel whose name they carry."""
+    Voyage = apps.get_model('voyages', 'Voyage')
+    Vessel = apps.get_model('vessels', 'Vessel')
+    vessels = {}
+    for vessel_id, name in Vessel.objects.order_by('-id').values_list('id', 'name'):
+        vessels[name.upper()] = vessel_id
+    for voyage in Voyage.objects.filter(vessel__isnull=True):
+        vessel_id = vessels.get(voyage.vessel_name.upper())
+        if vessel_id is not None:
+            Voyage.objects.filter(pk=voyage.pk).update(vessel_id=vessel_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vessels', '0007_position_cell'),
+        ('voyages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoyageCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('last_lat', models.FloatField(blank=True, null=True)),
+                ('last_lon', models.FloatField(blank=True, null=True)),
+                ('moving', models.BooleanField(blank=True, null=True)),
+                ('slow_since', models.DateTimeField(blank=True, null=True)),
+                ('slow_lat', models.FloatField(blank=True, null=True)),
+                ('slow_lon', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='voyage',
+            name='destination_port',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='voyage',
+            name='origin_port',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='voyage',
+            name='vessel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='voyages', to='vessels.vessel'),
+        ),
+        migrations.AddIndex(
+            model_name='voyage',
+            index=models.Index(fields=['vessel', '-departure'], name='voyages_voy_vessel__c92288_idx'),
+        ),
+        migrations.AddField(
+            model_name='voyagecheckpoint',
+            name='vessel',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='voyage_checkpoint', to='vessels.vessel'),
+        ),
+        migrations.AddField(
+            model_name='voyagecheckpoint',
+            name='voyage',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='voyages.voyage'),
+        ),
+        migrations.RunPython(link_vessels, migrations.RunPython.noop),
+    ]
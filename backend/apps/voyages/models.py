@@ -1,6 +1,29 @@
 from django.db import models
+from apps.vessels.models import Vessel
 
 class Voyage(models.Model):
+    vessel = models.ForeignKey(Vessel, on_delete=models.CASCADE, related_name='voyages', blank=True, null=True)
     vessel_name = models.CharField(max_length=255)
     departure = models.DateTimeField()
     arrival = models.DateTimeField(null=True, blank=True)
+    origin_port = models.CharField(max_length=255, blank=True, default='')
+    destination_port = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vessel', '-departure']),
+        ]
+
+class VoyageCheckpoint(models.Model):
+    """Per-vessel state of voyage segmentation after the last fix it consumed (see segmentation.py)."""
+    vessel = models.OneToOneField(Vessel, on_delete=models.CASCADE, related_name='voyage_checkpoint')
+    last_timestamp = models.DateTimeField(blank=True, null=True)
+    last_lat = models.FloatField(blank=True, null=True)
+    last_lon = models.FloatField(blank=True, null=True)
+    # None until the track has shown either a stop or movement.
+    moving = models.BooleanField(blank=True, null=True)
+    slow_since = models.DateTimeField(blank=True, null=True)
+    slow_lat = models.FloatField(blank=True, null=True)
+    slow_lon = models.FloatField(blank=True, null=True)
+    voyage = models.ForeignKey(Voyage, on_delete=models.SET_NULL, related_name='+', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
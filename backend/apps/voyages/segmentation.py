@@ -0,0 +1,187 @@
+"""
+Voyage segmentation from the VesselPosition stream.
+
+A vessel is stopped once it has stayed at or below STOPPED_KNOTS for
+VOYAGE_MIN_STOP; a voyage runs from the first faster fix after a stop to
+the start of the next stop. Ports are named from the geofence port index
+around where the stops happened. A track that starts at sea opens a voyage
+at its first fix, with no origin port.
+
+Each run walks only positions inserted since the last run (by id, from a
+RetentionCheckpoint row) and advances every affected vessel's
+VoyageCheckpoint, which holds that vessel's state after its newest fix.
+A fix older than that newest fix rewinds only its own vessel: voyages that
+departed after the late fix are dropped, the voyage it belongs to is
+reopened, and that vessel's fixes from that departure on are replayed.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.vessels.bulk import update_rows
+from apps.vessels.geo import haversine_nm
+from apps.vessels.geofence import STOPPED_KNOTS, anchorage_radius_nm, geofence
+from apps.vessels.models import RetentionCheckpoint, Vessel, VesselPosition
+
+from .models import Voyage, VoyageCheckpoint
+
+CHECKPOINT_NAME = 'voyages'
+DEFAULT_BATCH_SIZE = 50_000
+DEFAULT_MIN_STOP = timedelta(minutes=30)
+STATE_FIELDS = ['last_timestamp', 'last_lat', 'last_lon', 'moving', 'slow_since', 'slow_lat', 'slow_lon', 'voyage_id']
+
+
+def _port_name(lat, lon):
+    if lat is None or lon is None:
+        return ''
+    index = geofence.index()
+    port, _ = index.nearest([lat], [lon], anchorage_radius_nm())
+    return index.names[port[0]] if port[0] >= 0 else ''
+
+
+class Segmenter:
+    """Runs one vessel's fixes through its checkpoint, in timestamp order."""
+
+    def __init__(self, checkpoint, vessel_name, min_stop):
+        self.checkpoint = checkpoint
+        self.vessel_name = vessel_name
+        self.min_stop = min_stop
+        self.voyages = {}
+
+    def _save(self, voyage):
+        self.voyages[id(voyage)] = voyage
+
+    def feed(self, timestamp, lat, lon, speed):
+        state = self.checkpoint
+        if speed is None and state.last_lat is not None and timestamp > state.last_timestamp:
+            hours = (timestamp - state.last_timestamp).total_seconds() / 3600.0
+            speed = haversine_nm(state.last_lat, state.last_lon, lat, lon) / hours
+        state.last_timestamp, state.last_lat, state.last_lon = timestamp, lat, lon
+        if speed is None:
+            return
+
+        if speed <= STOPPED_KNOTS:
+            if state.slow_since is None:
+                state.slow_since, state.slow_lat, state.slow_lon = timestamp, lat, lon
+            if timestamp - state.slow_since >= self.min_stop and state.moving is not False:
+                if state.voyage is not None:
+                    state.voyage.arrival = state.slow_since
+                    state.voyage.destination_port = _port_name(state.slow_lat, state.slow_lon)
+                    self._save(state.voyage)
+                    state.voyage = None
+                state.moving = False
+            return
+
+        if state.voyage is None:
+            origin = _port_name(state.slow_lat, state.slow_lon) if state.moving is False else ''
+            state.voyage = Voyage(
+                vessel_id=state.vessel_id, vessel_name=self.vessel_name, departure=timestamp, origin_port=origin,
+            )
+            self._save(state.voyage)
+        state.moving = True
+        state.slow_since = state.slow_lat = state.slow_lon = None
+
+    def flush(self):
+        for voyage in self.voyages.values():
+            voyage.save()
+        self.voyages = {}
+
+
+def _rewind(checkpoint, late):
+    """
+    Reset `checkpoint` to the departure of the vessel's last voyage that
+    left before `late` (or to nothing) and drop the voyages after it.
+    Returns the timestamp the vessel's fixes must be replayed after.
+    """
+    voyages = Voyage.objects.filter(vessel_id=checkpoint.vessel_id)
+    anchor = voyages.filter(departure__lt=late).order_by('-departure').first()
+    for name in STATE_FIELDS:
+        setattr(checkpoint, name, None)
+    checkpoint.voyage = None
+    if anchor is None:
+        voyages.delete()
+        return None
+    voyages.filter(departure__gt=anchor.departure).delete()
+    anchor.arrival = None
+    anchor.destination_port = ''
+    anchor.save()
+    checkpoint.moving = True
+    checkpoint.voyage = anchor
+    checkpoint.last_timestamp = anchor.departure
+    return anchor.departure
+
+
+def _replay_rows(vessel_id, after):
+    positions = VesselPosition.objects.filter(vessel_id=vessel_id)
+    if after is not None:
+        positions = positions.filter(timestamp__gt=after)
+    return positions.order_by('timestamp', 'id').values_list('timestamp', 'latitude', 'longitude', 'speed')
+
+
+def segment_voyages(batch_size=DEFAULT_BATCH_SIZE, min_stop=None):
+    """
+    Fold positions stored since the last run into Voyage rows; returns
+    {'positions', 'vessels', 'replayed', 'opened', 'closed'}.
+    """
+    min_stop = min_stop or getattr(settings, 'VOYAGE_MIN_STOP', DEFAULT_MIN_STOP)
+    stats = {'positions': 0, 'vessels': 0, 'replayed': 0, 'opened': 0, 'closed': 0}
+    cursor, _ = RetentionCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    while True:
+        rows = list(
+            VesselPosition.objects.filter(id__gt=cursor.last_position_id).order_by('id')
+            .values_list('id', 'vessel_id', 'timestamp', 'latitude', 'longitude', 'speed')[:batch_size]
+        )
+        if not rows:
+            break
+        with transaction.atomic():
+            _segment_batch(rows, min_stop, stats)
+            cursor.last_position_id = rows[-1][0]
+            cursor.save()
+        stats['positions'] += len(rows)
+        if len(rows) < batch_size:
+            break
+    return stats
+
+
+def _segment_batch(rows, min_stop, stats):
+    by_vessel = {}
+    for _, vessel_id, timestamp, lat, lon, speed in rows:
+        by_vessel.setdefault(vessel_id, []).append((timestamp, lat, lon, speed))
+    checkpoints = {
+        checkpoint.vessel_id: checkpoint
+        for checkpoint in VoyageCheckpoint.objects.filter(vessel_id__in=list(by_vessel)).select_related('voyage')
+    }
+    names = dict(Vessel.objects.filter(pk__in=list(by_vessel)).values_list('id', 'name'))
+
+    created, changed = [], []
+    for vessel_id, fixes in by_vessel.items():
+        if vessel_id not in names:
+            continue
+        checkpoint = checkpoints.get(vessel_id)
+        if checkpoint is None:
+            checkpoint = VoyageCheckpoint(vessel_id=vessel_id)
+            created.append(checkpoint)
+        else:
+            changed.append(checkpoint)
+        fixes.sort(key=lambda fix: fix[0])
+        if checkpoint.last_timestamp is not None and fixes[0][0] < checkpoint.last_timestamp:
+            # The new fixes are already stored, so the replay picks them up too.
+            fixes = _replay_rows(vessel_id, _rewind(checkpoint, fixes[0][0]))
+            stats['replayed'] += 1
+
+        segmenter = Segmenter(checkpoint, names[vessel_id], min_stop)
+        for timestamp, lat, lon, speed in fixes:
+            segmenter.feed(timestamp, float(lat), float(lon), None if speed is None else float(speed))
+        stats['opened'] += sum(1 for voyage in segmenter.voyages.values() if voyage.pk is None)
+        stats['closed'] += sum(1 for voyage in segmenter.voyages.values() if voyage.arrival is not None)
+        segmenter.flush()
+        stats['vessels'] += 1
+
+    for checkpoint in created + changed:
+        # Voyages opened in this batch only got their ids on flush.
+        checkpoint.voyage = checkpoint.voyage
+    VoyageCheckpoint.objects.bulk_create(created)
+    update_rows(VoyageCheckpoint, STATE_FIELDS, [
+        [getattr(checkpoint, name) for name in STATE_FIELDS] + [checkpoint.pk] for checkpoint in changed
+    ])
@@ -0,0 +1,7 @@
+from rest_framework import serializers
+from .models import Voyage
+
+class VoyageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Voyage
+        fields = ['id', 'vessel', 'vessel_name', 'origin_port', 'destination_port', 'departure', 'arrival']
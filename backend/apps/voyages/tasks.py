@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .segmentation import segment_voyages
+
+
+@shared_task
+def segment_voyages_task():
+    """Periodic entry point scheduled by django_celery_beat."""
+    return segment_voyages()
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.ports.models import Port
+from apps.vessels.geofence import geofence
+from apps.vessels.models import Vessel, VesselPosition
+from apps.voyages.models import Voyage
+from apps.voyages.segmentation import segment_voyages
+
+MINUTE = timedelta(minutes=1)
+
+
+class VoyageSegmentationTests(TestCase):
+    def setUp(self):
+        geofence.invalidate()
+        self.addCleanup(geofence.invalidate)
+        Port.objects.create(name='Alpha', code='AAA', country='PA', location_lat=0, location_lon=0)
+        Port.objects.create(name='Bravo', code='BBB', country='PA', location_lat=0, location_lon=1)
+        self.vessel = Vessel.objects.create(name='Runner', imo=9_400_000, mmsi=240_000_000, vessel_type='bulk', flag='PA')
+        self.started = (timezone.now() - timedelta(days=1)).replace(microsecond=0)
+        # At Alpha for 50 minutes, under way from minute 60 to 300, at Bravo from minute 330.
+        self.track = (
+            [(minute, 0.0, 0.0) for minute in range(0, 60, 10)]
+            + [(minute, (minute - 60) / 300, 12.0) for minute in range(60, 330, 30)]
+            + [(minute, 1.0, 0.0) for minute in range(330, 400, 10)]
+        )
+
+    def store(self, fixes):
+        VesselPosition.objects.bulk_create([
+            VesselPosition(vessel=self.vessel, latitude=0, longitude=lon, speed=speed, timestamp=self.at(minute))
+            for minute, lon, speed in fixes
+        ])
+
+    def at(self, minute):
+        return self.started + minute * MINUTE
+
+    def test_stops_at_ports_bound_a_voyage(self):
+        self.store(self.track)
+        stats = segment_voyages()
+
+        voyage = Voyage.objects.get(vessel=self.vessel)
+        self.assertEqual((voyage.departure, voyage.arrival), (self.at(60), self.at(330)))
+        self.assertEqual((voyage.origin_port, voyage.destination_port), ('Alpha', 'Bravo'))
+        self.assertEqual((stats['opened'], stats['closed'], stats['replayed']), (1, 1, 0))
+
+    def test_runs_pick_up_where_the_last_one_stopped(self):
+        self.store(self.track[:9])
+        segment_voyages()
+        voyage = Voyage.objects.get(vessel=self.vessel)
+        self.assertIsNone(voyage.arrival)
+
+        self.store(self.track[9:])
+        segment_voyages()
+        voyage.refresh_from_db()
+        self.assertEqual((voyage.arrival, voyage.destination_port), (self.at(330), 'Bravo'))
+        self.assertEqual(Voyage.objects.filter(vessel=self.vessel).count(), 1)
+
+    def test_late_fix_rewinds_its_vessel(self):
+        departure = self.track[6]
+        self.store([fix for fix in self.track if fix is not departure])
+        segment_voyages()
+        self.assertEqual(Voyage.objects.get(vessel=self.vessel).departure, self.at(90))
+
+        self.store([departure])
+        stats = segment_voyages()
+        voyage = Voyage.objects.get(vessel=self.vessel)
+        self.assertEqual(stats['replayed'], 1)
+        self.assertEqual((voyage.departure, voyage.arrival), (self.at(60), self.at(330)))
+        self.assertEqual((voyage.origin_port, voyage.destination_port), ('Alpha', 'Bravo'))
@@ -0,0 +1,6 @@
+"""
+The Celery app lives in config.celery and is not imported here: web
+processes (config.settings_api in particular) would pay for Celery on every
+start without ever touching it. `celery -A config` finds config.celery on
+its own, and the code that queues tasks imports it first.
+"""
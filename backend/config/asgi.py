@@ -2,4 +2,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: the realtime endpoints need the app registry loaded.
+from apps.vessels.realtime import RealtimeRouter  # noqa: E402
+
+application = RealtimeRouter(django_application)
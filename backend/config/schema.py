@@ -0,0 +1,58 @@
+"""
+OpenAPI schema served from a prebuilt document.
+
+SpectacularAPIView walks every endpoint and serializer on each request,
+although the schema only changes with the code. It is instead built once:
+at deploy time into OPENAPI_SCHEMA_FILE with
+
+    python manage.py spectacular --format openapi-json --file openapi.json
+
+or, when that file is missing, on the first request of each process. The
+same bytes are then served with an ETag, so clients revalidating get a 304.
+drf_spectacular is only imported to generate, which lets the API-only
+settings profile serve a prebuilt file without the package installed.
+"""
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition, require_safe
+
+MEDIA_TYPE = 'application/vnd.oai.openapi+json'
+
+_lock = threading.Lock()
+_document = None
+
+
+def _generate():
+    from drf_spectacular.renderers import OpenApiJsonRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return OpenApiJsonRenderer().render(generator.get_schema(request=None, public=True), renderer_context={})
+
+
+def schema_document():
+    """(body, etag) of the schema, read or generated on first use."""
+    global _document
+    with _lock:
+        if _document is None:
+            path = getattr(settings, 'OPENAPI_SCHEMA_FILE', None)
+            body = Path(path).read_bytes() if path and Path(path).is_file() else _generate()
+            _document = (body, quote_etag(hashlib.md5(body).hexdigest()))
+        return _document
+
+
+def invalidate():
+    global _document
+    with _lock:
+        _document = None
+
+
+@require_safe
+@condition(etag_func=lambda request: schema_document()[1])
+def schema_view(request):
+    return HttpResponse(schema_document()[0], content_type=MEDIA_TYPE)
@@ -26,9 +26,12 @@ INSTALLED_APPS = [
     'apps.safety',
     'apps.voyages',
     'apps.notifications',
+    'apps.metrics',
+    'apps.analytics',
 ]
 
 MIDDLEWARE = [
+    'apps.metrics.middleware.QueryMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -59,12 +62,43 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# ingest writer; synchronous=NORMAL is durable across crashes in WAL mode.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA temp_store=MEMORY;'
+    'PRAGMA cache_size=-65536;'
+    'PRAGMA mmap_size=268435456;'
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS,
+            'timeout': 20,
+            # Writers take the lock up front instead of failing on lock upgrade.
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
 }
+# Heavy read paths run against this alias (see config/routers.py). By default
+# it is a second, query-only connection to the same file; point
+# DATABASE_REPLICA_NAME at a copy kept by sync_replica to test a lagging replica.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': os.environ.get('DATABASE_REPLICA_NAME', DATABASES['default']['NAME']),
+    'OPTIONS': {
+        'init_command': SQLITE_PRAGMAS + 'PRAGMA query_only=ON;',
+        'timeout': 20,
+    },
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['config.routers.PrimaryReplicaRouter']
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -95,17 +129,126 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.metrics.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_OBTAIN_SERIALIZER': 'apps.authentication.tokens.UsernameTokenObtainPairSerializer',
 }
 
+# Authenticated users are served from an in-process cache for this long. Other
+# processes only see a deactivation, password or role change once their entry
+# expires, so this is also how long a revoked user can keep authenticating.
+AUTH_USER_CACHE_TTL = 10
+AUTH_USER_CACHE_SIZE = 10000
+
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['ETag', 'X-Sync-Cursor']
 
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+
+AIS_INGEST_CHUNK_SIZE = 1000
+POSITION_RETENTION_DAYS = 30
+POSITION_ARCHIVE_DIR = BASE_DIR / 'archive'
+ETA_RECOMPUTE_NM = 1.0
+ETA_MAX_AGE = timedelta(hours=1)
+
+# 'local' runs ingest jobs on a thread in this process, without a broker.
+# Jobs run elsewhere (and the beat-scheduled tick) reach this process's live
+# bus, track cache and map indexes through apps.vessels.relay, which polls
+# for new positions at most every INGEST_RELAY_INTERVAL seconds.
+INGEST_EXECUTOR = os.environ.get('INGEST_EXECUTOR', 'celery')
+INGEST_SOURCE = 'apps.vessels.services.MockAISProvider'
+INGEST_INTERVAL_SECONDS = 10
+INGEST_TICK_DEADLINE_MS = 5000
+INGEST_RELAY_INTERVAL = 2
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'ingest-ais': {
+        'task': 'apps.vessels.tasks.ingest_tick',
+        'schedule': INGEST_INTERVAL_SECONDS,
+    },
+    'segment-voyages': {
+        'task': 'apps.voyages.tasks.segment_voyages_task',
+        'schedule': 300,
+    },
+    'reconcile-analytics': {
+        'task': 'apps.analytics.tasks.reconcile_rollups',
+        'schedule': 3600,
+    },
+    'expire-notifications': {
+        'task': 'apps.notifications.tasks.expire_read_notifications',
+        'schedule': 3600,
+    },
+    'build-fleet-snapshots': {
+        'task': 'apps.vessels.tasks.build_fleet_snapshots',
+        'schedule': 300,
+    },
+    'update-route-etas': {
+        'task': 'apps.vessels.tasks.update_route_etas',
+        'schedule': 60,
+    },
+    'apply-retention': {
+        'task': 'apps.vessels.tasks.apply_retention',
+        'schedule': 3600,
+    },
+}
+# Used when INGEST_SOURCE = 'apps.vessels.simulator.SimulatedAISProvider'.
+SIMULATOR_VESSELS = 1000
+SIMULATOR_SEED = 0
+
+# Share of requests recorded by QueryMetricsMiddleware; 0 turns metrics and timers off.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '0.05'))
+METRICS_N_PLUS_ONE_THRESHOLD = 10
+# Bearer token for the Prometheus scraper; without it only staff users' JWTs can read /api/metrics/.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Default radius and half-window of a SafetyEvent for proximity queries (apps.safety.proximity).
+SAFETY_EVENT_RADIUS_NM = 10.0
+SAFETY_EVENT_WINDOW = timedelta(hours=6)
+
+# A vessel at or below the geofence's stopped speed for this long ends a voyage.
+VOYAGE_MIN_STOP = timedelta(minutes=30)
+
+# Rows fetched and rendered per chunk by the streaming position export.
+EXPORT_CHUNK_SIZE = 5000
+
+NOTIFICATION_UNREAD_CACHE_TTL = 30
+NOTIFICATION_READ_RETENTION = timedelta(days=30)
+
+# Seconds between full reloads of the map cluster index (apps.vessels.tiles).
+TILE_INDEX_TTL = 60
+# Most vessels a zoomed-in map viewport lists; above it the viewport is clustered.
+TILE_MAX_VESSELS = 2000
+
+# Live position store (apps.vessels.live). With write-behind, ingest advances
+# it in memory and flushes changed vessels to Vessel at most every
+# LIVE_POSITION_FLUSH_INTERVAL seconds; only turn it on when exactly one
+# process ingests.
+LIVE_POSITION_WRITE_BEHIND = False
+LIVE_POSITION_FLUSH_INTERVAL = 5
+LIVE_POSITION_TTL = 60
+
+# Prebuilt OpenAPI document served at /api/schema/ (see config.schema); without
+# it the schema is generated once per process.
+OPENAPI_SCHEMA_FILE = BASE_DIR / 'openapi.json'
+
+# Spacing of the fleet snapshot checkpoints (apps.vessels.snapshots): an as-of
+# query reads one checkpoint plus at most this much position history.
+SNAPSHOT_INTERVAL = timedelta(hours=1)
+# Longest ?from=&to= range one snapshot playback may cover.
+SNAPSHOT_PLAYBACK_MAX_SPAN = timedelta(days=1)
+
+# How far behind a ?since= cursor vessel deltas re-read (apps.vessels.sync),
+# for rows whose updated_at was stamped before a slower write committed. Keep
+# it above the database busy timeout.
+SYNC_CURSOR_OVERLAP = timedelta(seconds=30)
@@ -0,0 +1,48 @@
+"""
+API-only settings for workers that serve nothing but /api/.
+
+    DJANGO_SETTINGS_MODULE=config.settings_api gunicorn config.wsgi
+
+The same project without the admin, sessions, messages, static files, the
+browsable API, drf_spectacular or django_celery_beat, and without the
+middleware that only those need: requests authenticate with JWTs through
+DRF, so nothing reads a session. /api/schema/ is served from
+OPENAPI_SCHEMA_FILE, which must be built (with config.settings) beforehand;
+migrations, the admin, celery beat and /api/docs/ keep using config.settings.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, TEMPLATES
+
+API_EXCLUDED_APPS = {
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'drf_spectacular',
+    'django_celery_beat',
+}
+API_EXCLUDED_MIDDLEWARE = {
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_EXCLUDED_APPS]
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in API_EXCLUDED_MIDDLEWARE]
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        'context_processors': [
+            processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if processor != 'django.contrib.messages.context_processors.messages'
+        ],
+    },
+}]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ('apps.metrics.renderers.TimedJSONRenderer',),
+}
@@ -1,11 +1,24 @@
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+from config.schema import schema_view
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/auth/', include('apps.authentication.urls')),
     path('api/vessels/', include('apps.vessels.urls')),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    path('api/safety/', include('apps.safety.urls')),
+    path('api/analytics/', include('apps.analytics.urls')),
+    path('api/notifications/', include('apps.notifications.urls')),
+    path('api/metrics/', include('apps.metrics.urls')),
+    path('api/schema/', schema_view, name='schema'),
 ]
+
+# Left out by the API-only profile (config.settings_api).
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+if apps.is_installed('drf_spectacular'):
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    urlpatterns.append(path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'))
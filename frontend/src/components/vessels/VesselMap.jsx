@@ -1,8 +1,10 @@
-import { MapContainer, TileLayer, Marker, Popup } from 'react-leaflet';
+import { useState, useEffect, useCallback, useRef } from 'react';
+import { MapContainer, TileLayer, Marker, Popup, useMapEvents } from 'react-leaflet';
 import 'leaflet/dist/leaflet.css';
 import L from 'leaflet';
 import icon from 'leaflet/dist/images/marker-icon.png';
 import iconShadow from 'leaflet/dist/images/marker-shadow.png';
+import api from '../../api/axios';
 
 // Fix for default marker icon in React Leaflet
 let DefaultIcon = L.icon({
@@ -14,6 +16,74 @@ let DefaultIcon = L.icon({
 
 L.Marker.prototype.options.icon = DefaultIcon;
 
+const clusterIcon = (count) => {
+    const size = count < 10 ? 30 : count < 100 ? 36 : count < 1000 ? 44 : 52;
+    return L.divIcon({
+        html: `<div style="width:${size}px;height:${size}px;line-height:${size}px" class="rounded-full bg-blue-600 bg-opacity-80 text-white text-xs font-bold text-center border-2 border-white shadow">${count}</div>`,
+        className: '',
+        iconSize: [size, size],
+        iconAnchor: [size / 2, size / 2]
+    });
+};
+
+// Fetches clusters (or individual vessels when zoomed in) for the visible area
+const ViewportClusters = ({ refreshKey }) => {
+    const [data, setData] = useState({ clusters: [], vessels: [] });
+    const request = useRef(0);
+
+    const fetchClusters = useCallback(async (map) => {
+        const bounds = map.getBounds();
+        const bbox = [bounds.getSouth(), bounds.getWest(), bounds.getNorth(), bounds.getEast()]
+            .map(value => value.toFixed(5)).join(',');
+        const id = ++request.current;
+        try {
+            const response = await api.get('/vessels/clusters/', { params: { bbox, zoom: map.getZoom() } });
+            // Ignore responses to viewports the user has already moved away from
+            if (id === request.current) setData(response.data);
+        } catch (error) {
+            console.error("Error fetching clusters:", error);
+        }
+    }, []);
+
+    const map = useMapEvents({
+        moveend: () => fetchClusters(map),
+    });
+
+    useEffect(() => {
+        fetchClusters(map);
+    }, [map, fetchClusters, refreshKey]);
+
+    return (
+        <>
+            {data.clusters.map(cluster => (
+                <Marker
+                    key={cluster.tile.join('/')}
+                    position={[cluster.lat, cluster.lon]}
+                    icon={clusterIcon(cluster.count)}
+                    eventHandlers={{ click: () => map.setView([cluster.lat, cluster.lon], map.getZoom() + 2) }}
+                />
+            ))}
+            {data.vessels.map(vessel => (
+                <Marker
+                    key={vessel.id}
+                    position={[vessel.lat, vessel.lon]}
+                >
+                    <Popup>
+                        <div className="p-2">
+                            <h3 className="font-bold text-lg">{vessel.name}</h3>
+                            <p className="text-sm">Type: {vessel.vessel_type}</p>
+                            <p className="text-sm">Flag: {vessel.flag}</p>
+                            <p className="text-sm">Speed: {vessel.speed} kn</p>
+                            <p className="text-sm">Status: {vessel.status}</p>
+                            <p className="text-xs text-gray-500 mt-1">Last Updated: {new Date(vessel.updated).toLocaleString()}</p>
+                        </div>
+                    </Popup>
+                </Marker>
+            ))}
+        </>
+    );
+};
+
 const VesselMap = ({ vessels }) => {
     const center = [35.6895, 139.6917]; // Tokyo as default center
 
@@ -23,25 +93,8 @@ const VesselMap = ({ vessels }) => {
                 attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
                 url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
             />
-            {vessels.map(vessel => (
-                vessel.last_position_lat && vessel.last_position_lon && (
-                    <Marker
-                        key={vessel.id}
-                        position={[vessel.last_position_lat, vessel.last_position_lon]}
-                    >
-                        <Popup>
-                            <div className="p-2">
-                                <h3 className="font-bold text-lg">{vessel.name}</h3>
-                                <p className="text-sm">Type: {vessel.vessel_type}</p>
-                                <p className="text-sm">Flag: {vessel.flag}</p>
-                                <p className="text-sm">Speed: {vessel.last_speed} kn</p>
-                                <p className="text-sm">Status: {vessel.status}</p>
-                                <p className="text-xs text-gray-500 mt-1">Last Updated: {new Date(vessel.last_position_update).toLocaleString()}</p>
-                            </div>
-                        </Popup>
-                    </Marker>
-                )
-            ))}
+            {/* Markers are served per viewport; the vessel list only signals when to refresh */}
+            <ViewportClusters refreshKey={vessels} />
         </MapContainer>
     );
 };
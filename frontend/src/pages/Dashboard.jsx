@@ -1,4 +1,4 @@
-import { useState, useEffect, useContext } from 'react';
+import { useState, useEffect, useContext, useRef } from 'react';
 import AuthContext from '../context/AuthContext';
 import VesselMap from '../components/vessels/VesselMap';
 import VesselList from '../components/vessels/VesselList';
@@ -10,12 +10,29 @@ const Dashboard = () => {
     const [selectedVessel, setSelectedVessel] = useState(null);
     const [loading, setLoading] = useState(true);
 
+    const syncCursor = useRef(null);
+
     const fetchVessels = async () => {
         try {
-            const response = await api.get('/vessels/');
-            // Ensure response.data.results exists for pagination, or response.data if list
-            const data = response.data.results ? response.data.results : response.data;
-            setVessels(data);
+            if (syncCursor.current) {
+                // Delta sync: only vessels changed since the last cursor, plus deleted ids
+                const response = await api.get('/vessels/', { params: { since: syncCursor.current } });
+                const { cursor, full, changed, deleted } = response.data;
+                setVessels(prev => {
+                    if (full) return changed;
+                    const gone = new Set(deleted);
+                    const byId = new Map(prev.filter(v => !gone.has(v.id)).map(v => [v.id, v]));
+                    changed.forEach(v => byId.set(v.id, v));
+                    return Array.from(byId.values());
+                });
+                syncCursor.current = cursor;
+            } else {
+                const response = await api.get('/vessels/');
+                // Ensure response.data.results exists for pagination, or response.data if list
+                const data = response.data.results ? response.data.results : response.data;
+                setVessels(data);
+                syncCursor.current = response.headers['x-sync-cursor'] || null;
+            }
             setLoading(false);
         } catch (error) {
             console.error("Error fetching vessels:", error);
@@ -25,7 +42,13 @@ const Dashboard = () => {
 
     const syncMockData = async () => {
         try {
-            await api.post('/vessels/sync_mock_data/');
+            // Ingestion runs as a background job; wait for it before refreshing.
+            const response = await api.post('/vessels/sync_mock_data/');
+            let job = response.data.job;
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 500));
+                job = (await api.get('/vessels/ingest_status/', { params: { job: job.id } })).data;
+            }
             fetchVessels();
         } catch (error) {
             console.error("Error syncing mock data:", error);